@@ -35,9 +35,11 @@ __license__ = "Apache License, Version 2.0"
 """ The license for the module """
 
 from . import api
+from . import asgi
 from . import async
 from . import base
 from . import cache
+from . import codec
 from . import compress
 from . import config
 from . import controller
@@ -57,22 +59,28 @@ from . import observer
 from . import part
 from . import redisdb
 from . import request
+from . import router
 from . import scheduler
 from . import serialize
 from . import session
 from . import settings
 from . import smtp
+from . import static
 from . import structures
 from . import typesf
 from . import util
 from . import validation
 
 from .api import Api, OAuthApi, OAuth1Api, OAuth2Api
-from .async import AsyncManager, SimpleManager, QueueManager
+from .asgi import ASGIApp
+from .async import AsyncManager, SimpleManager, QueueManager, PoolManager, ProcessManager,\
+    DurableManager
 from .base import APP, LEVEL, NAME, VERSION, PLATFORM, API_VERSION, BUFFER_SIZE, MAX_LOG_SIZE,\
     MAX_LOG_COUNT, App, APIApp, WebApp, get_app, get_name, get_base_path, get_request,\
     get_session, get_model, get_controller, get_adapter, get_manager, get_logger, get_level, is_devel, is_safe
-from .cache import Cache, MemoryCache
+from .cache import POLICIES, SHARED_MAGIC, SHARED_HEADER, SLOT_HEADER, Cache, MemoryCache,\
+    BoundedCache, SharedCache, RedisCache
+from .codec import CODEC, CODECS, JSONCodec, OrjsonCodec, get_codec, set_codec, new_codec
 from .compress import Compress
 from .config import conf, conf_prefix, conf_s
 from .controller import Controller
@@ -82,7 +90,7 @@ from .defines import ITERABLES, MOBILE_REGEX, MOBILE_PREFIX_REGEX, BODY_REGEX, T
 from .exceptions import AppierException, OperationalError, SecurityError, AssertionError,\
     ValidationError, NotFoundError, NotImplementedError, BaseInternalError, ValidationInternalError,\
     ValidationMultipleError, HTTPError, APIError, APIAccessError, OAuthAccessError
-from .export import ExportManager, MongoEncoder
+from .export import ExportManager
 from .geo import GeoResolver
 from .git import Git
 from .http import get, post, put, delete
@@ -94,12 +102,16 @@ from .observer import Observable
 from .part import Part
 from .redisdb import Redis
 from .request import CODE_STRINGS, Request, MockRequest
+from .router import MAX_GROUPS, Router, Binder
 from .scheduler import Scheduler
 from .serialize import serialize_csv, serialize_ics, build_encoder
-from .session import Session, MockSession, MemorySession, FileSession, RedisSession, ClientSession
+from .session import Session, MockSession, MemorySession, FileSession, RedisSession, ClientSession,\
+    SqliteSession, SERIALIZERS, Serializer, PickleSerializer, JSONSerializer, new_serializer
 from .settings import DEBUG, USERNAME, PASSWORD
 from .smtp import message, message_base, message_netius, smtp_engine, multipart, plain,\
     html, header
+from .static import STAT_INTERVAL, STAT_SIZE, FILE_LIMIT, MMAP_SIZE, Resource, StatCache, FileCache,\
+    FileRange
 from .structures import OrderedDict
 from .typesf import Type, File, Files, ImageFile, ImageFiles, image, images, Reference,\
     reference, References, references
@@ -109,7 +121,7 @@ from .util import is_iterable, is_mobile, email_parts, email_mime, email_name, e
     unquote, base_name, base_name_m, parse_cookie, parse_multipart, decode_params, load_form,\
     check_login, ensure_login, dict_merge, private, ensure, delayed, route, error_handler,\
     exception_handler, before_request, after_request, is_detached, sanitize, verify, execute,\
-    ctx_locale, FileTuple, BaseThread, JSONEncoder
+    ctx_locale, is_lazy, iter_multipart, FileTuple, BaseThread, JSONEncoder, JSONStream
 from .validation import validate, validate_b, validate_e, safe, eq, gt, gte, lt, lte, not_null,\
     not_empty, not_false, is_in, is_simple, is_email, is_url, is_regex, field_eq, field_gt,\
     field_gte, field_lt, field_lte, string_gt, string_lt, string_eq, equals, not_past, not_duplicate,\
@@ -0,0 +1,141 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Hive Appier Framework
+# Copyright (c) 2008-2016 Hive Solutions Lda.
+#
+# This file is part of Hive Appier Framework.
+#
+# Hive Appier Framework is free software: you can redistribute it and/or modify
+# it under the terms of the Apache License as published by the Apache
+# Foundation, either version 2.0 of the License, or (at your option) any
+# later version.
+#
+# Hive Appier Framework is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# Apache License for more details.
+#
+# You should have received a copy of the Apache License along with
+# Hive Appier Framework. If not, see <http://www.apache.org/licenses/>.
+
+__author__ = "João Magalhães <joamag@hive.pt>"
+""" The author(s) of the module """
+
+__version__ = "1.0.0"
+""" The version of the module """
+
+__revision__ = "$LastChangedRevision$"
+""" The revision number of the module """
+
+__date__ = "$LastChangedDate$"
+""" The last change date of the module """
+
+__copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
+""" The copyright for the module """
+
+__license__ = "Apache License, Version 2.0"
+""" The license for the module """
+
+from . import legacy
+
+if legacy.PYTHON_ASYNC: from .asgi_neo import ASGIBase, sequence #@UnusedImport
+else: ASGIBase = object; sequence = None
+
+class ASGIApp(ASGIBase):
+    """
+    Mixin class that provides the ASGI (asynchronous server gateway
+    interface) entry point for the application, allowing it to be
+    served by an asyncio based server alongside the WSGI one.
+
+    Note that the ASGI infra-structure is only available for python
+    interpreters that support the native coroutine syntax (async/await)
+    for older interpreters this is an empty mixin.
+    """
+
+    def asgi_environ(self, scope, body = b"", input = None):
+        """
+        Converts the provided ASGI (http) scope and the body of the
+        request into a WSGI compliant environment map, so that the
+        complete WSGI request handling infra-structure may be re-used.
+
+        :type scope: Dictionary
+        :param scope: The ASGI connection scope for the http request.
+        :type body: String
+        :param body: The complete body (as bytes) of the request, used
+        in case no input is provided.
+        :type input: File
+        :param input: The file like object from which the body of the
+        request is read (as requested), the content length is then
+        the one provided in the headers (if any).
+        :rtype: Dictionary
+        :return: The WSGI environment map for the request.
+        """
+
+        # unpacks the various values from the provided scope (using sensible
+        # defaults for the optional ones) and converts the path and the root
+        # path into the "latin-1" strings that are expected under WSGI
+        path = scope["path"].encode("utf-8").decode("latin-1")
+        root_path = scope.get("root_path", "").encode("utf-8").decode("latin-1")
+        query = scope.get("query_string", b"").decode("latin-1")
+        server = scope.get("server", None) or ("localhost", 80)
+        client = scope.get("client", None) or ("", 0)
+
+        # creates the base environment map with the complete set of values
+        # required by the WSGI specification, in case no input is provided
+        # the body is used as a memory based file so that it may be read
+        is_body = input == None
+        if is_body: input = legacy.BytesIO(body)
+        environ = {
+            "REQUEST_METHOD" : scope["method"],
+            "SCRIPT_NAME" : root_path,
+            "PATH_INFO" : path,
+            "QUERY_STRING" : query,
+            "SERVER_NAME" : server[0],
+            "SERVER_PORT" : str(server[1]),
+            "SERVER_PROTOCOL" : "HTTP/" + scope.get("http_version", "1.1"),
+            "REMOTE_ADDR" : client[0],
+            "wsgi.version" : (1, 0),
+            "wsgi.url_scheme" : scope.get("scheme", "http"),
+            "wsgi.input" : input,
+            "wsgi.multithread" : False,
+            "wsgi.multiprocess" : False,
+            "wsgi.run_once" : False,
+            "asgi.scope" : scope
+        }
+        if is_body: environ["CONTENT_LENGTH"] = str(len(body))
+
+        # iterates over the complete set of headers to convert them into
+        # the WSGI notation, note that multiple headers with the same name
+        # are joined using the comma separator (as defined in specification)
+        for name, value in scope.get("headers", ()):
+            name = name.decode("latin-1").upper().replace("-", "_")
+            value = value.decode("latin-1")
+            if name == "CONTENT_LENGTH" and is_body: continue
+            if not name in ("CONTENT_TYPE", "CONTENT_LENGTH"): name = "HTTP_" + name
+            if name in environ: value = environ[name] + "," + value
+            environ[name] = value
+
+        # returns the final environment map to the caller method so
+        # that it may be used in the request handling
+        return environ
+
+def run_sync(awaitable):
+    """
+    Runs the provided awaitable (eg: coroutine) to completion in
+    a newly created event loop, returning its result.
+
+    This should be used to run coroutine based action methods under
+    synchronous contexts (eg: WSGI or the async manager threads).
+
+    :type awaitable: Awaitable
+    :param awaitable: The awaitable object that is going to be run
+    until it's completed.
+    :rtype: Object
+    :return: The result of the awaitable execution.
+    """
+
+    import asyncio
+    loop = asyncio.new_event_loop()
+    try: return loop.run_until_complete(awaitable)
+    finally: loop.close()
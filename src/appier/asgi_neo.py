@@ -0,0 +1,283 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Hive Appier Framework
+# Copyright (c) 2008-2016 Hive Solutions Lda.
+#
+# This file is part of Hive Appier Framework.
+#
+# Hive Appier Framework is free software: you can redistribute it and/or modify
+# it under the terms of the Apache License as published by the Apache
+# Foundation, either version 2.0 of the License, or (at your option) any
+# later version.
+#
+# Hive Appier Framework is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# Apache License for more details.
+#
+# You should have received a copy of the Apache License along with
+# Hive Appier Framework. If not, see <http://www.apache.org/licenses/>.
+
+__author__ = "João Magalhães <joamag@hive.pt>"
+""" The author(s) of the module """
+
+__version__ = "1.0.0"
+""" The version of the module """
+
+__revision__ = "$LastChangedRevision$"
+""" The revision number of the module """
+
+__date__ = "$LastChangedDate$"
+""" The last change date of the module """
+
+__copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
+""" The copyright for the module """
+
+__license__ = "Apache License, Version 2.0"
+""" The license for the module """
+
+import asyncio
+import threading
+
+from . import legacy
+from . import exceptions
+
+class ASGIBase(object):
+
+    async def application_asgi(self, scope, receive, send):
+        # retrieves the type of the scope and uses it to decide on the
+        # proper handler for the connection, note that only the lifespan
+        # and the http types are currently supported by appier
+        type = scope["type"]
+        if type == "lifespan": return await self._asgi_lifespan(scope, receive, send)
+        if not type == "http": raise exceptions.OperationalError(
+            message = "Not supported ASGI scope type '%s'" % type
+        )
+
+        # runs the http request handling under an isolated version of the
+        # request state, so that concurrent requests in the event loop do not
+        # override each other's state (as they share the same thread)
+        return await ContextAwaitable(self, self._asgi_http(scope, receive, send))
+
+    async def _asgi_lifespan(self, scope, receive, send):
+        while True:
+            message = await receive()
+            type = message["type"]
+            if type == "lifespan.startup":
+                try: self.start()
+                except BaseException as exception:
+                    await send(dict(
+                        type = "lifespan.startup.failed",
+                        message = legacy.UNICODE(exception)
+                    ))
+                else:
+                    await send(dict(type = "lifespan.startup.complete"))
+            elif type == "lifespan.shutdown":
+                self.stop()
+                await send(dict(type = "lifespan.shutdown.complete"))
+                return
+
+    async def _asgi_http(self, scope, receive, send):
+        # builds the WSGI environment map, that is used as the base for the
+        # request, with an input that reads the body from the receive channel
+        # as it's requested (up to the maximum allowed size of the body)
+        loop = asyncio.get_event_loop()
+        input = ASGIInput(receive, loop, limit = self.body_max)
+        environ = self.asgi_environ(scope, input = input)
+
+        self.prepare()
+        try:
+            # starts the handling of the request, creating the request object
+            # from the environment and running the initial handlers, note that
+            # the synchronous parts of the handling run in the executor
+            await self._asgi_run(self._application_start, environ)
+
+            try:
+                # handles the current request and in case the returned value is
+                # an awaitable (action method is a coroutine) awaits for it, note
+                # that in case the value is a generator its first value is the size
+                result = await self._asgi_run(self._asgi_handle)
+                if legacy.is_awaitable(result):
+                    result = await result
+                    result = await self._asgi_run(self.handle_result, result)
+                result, is_generator, first = await self._asgi_run(self._asgi_first, result)
+            except BaseException as exception:
+                is_generator = False
+                first = None
+                result = self._application_error(exception)
+            finally:
+                await self._asgi_run(self._application_flush)
+
+            # finishes the handling of the request and sends the resulting
+            # status, headers and body chunks through the ASGI channel
+            code_s, headers, result = await self._asgi_run(
+                self._application_end, result, is_generator, first
+            )
+            await self._asgi_send(send, code_s, headers, result)
+        finally:
+            self.restore()
+
+    async def _asgi_run(self, method, *args):
+        # runs the (synchronous) method in the executor of the loop so that
+        # it does not block it, binding the request state of the current
+        # coroutine to the worker thread while the method runs, and then
+        # bringing back the changes made to such state (eg: new request)
+        loop = asyncio.get_event_loop()
+        state = dict(self._local.__dict__)
+
+        def run():
+            local = self._local.__dict__
+            local.clear()
+            local.update(state)
+            try: return method(*args)
+            finally:
+                state.clear()
+                state.update(local)
+                local.clear()
+
+        try: return await loop.run_in_executor(None, run)
+        finally:
+            local = self._local.__dict__
+            local.clear()
+            local.update(state)
+
+    def _asgi_handle(self):
+        # handles the request and in case the action is a coroutine (that runs
+        # in the event loop) loads the data of the request, as the body can't
+        # be read from the event loop thread (the read would block it)
+        result = self.handle()
+        if legacy.is_awaitable(result): self.request.load_stage("data")
+        return result
+
+    def _asgi_first(self, result):
+        is_generator = legacy.is_generator(result)
+        if is_generator: first = next(result)
+        else: first = None
+        result = self._json_prime(result)
+        return result, is_generator, first
+
+    async def _asgi_send(self, send, code_s, headers, result):
+        code = int(code_s.split(" ", 1)[0])
+        headers = [
+            (legacy.bytes(name), legacy.bytes(legacy.UNICODE(value), encoding = "utf-8"))\
+            for name, value in headers
+        ]
+        await send(dict(
+            type = "http.response.start",
+            status = code,
+            headers = headers
+        ))
+        # iterates over the chunks of the body retrieving each of them in
+        # the executor, as they may be read from a file or generated by the
+        # (synchronous) code of the action (eg: generators and json streams)
+        iterator = iter(result)
+        try:
+            while True:
+                chunk = await self._asgi_run(next, iterator, None)
+                if chunk == None: break
+                if not chunk: continue
+                await send(dict(
+                    type = "http.response.body",
+                    body = chunk,
+                    more_body = True
+                ))
+        finally:
+            if hasattr(result, "close"): result.close()
+        await send(dict(
+            type = "http.response.body",
+            body = b"",
+            more_body = False
+        ))
+
+class ASGIInput(object):
+    """
+    File like object that reads the body of an ASGI request from
+    the receive channel as it's requested, to be used as the WSGI
+    input of the request (eg: parsing of multipart uploads).
+
+    The reads must be performed outside of the event loop thread
+    (eg: executor) as they wait for the messages of the channel.
+    """
+
+    def __init__(self, receive, loop, limit = None):
+        self.receive = receive
+        self.loop = loop
+        self.limit = limit
+        self.thread = threading.current_thread()
+        self.buffer = b""
+        self.received = 0
+        self.finished = False
+
+    def read(self, size = -1):
+        # receives messages from the channel until the requested amount of
+        # data is available or the body is finished, note that no more data
+        # is received once the limit is exceeded, (the body is too large)
+        while not self.finished and (size < 0 or len(self.buffer) < size):
+            if self.limit and self.received > self.limit: break
+            self._receive()
+
+        if size < 0: size = len(self.buffer)
+        data = self.buffer[:size]
+        self.buffer = self.buffer[size:]
+        return data
+
+    def _receive(self):
+        if threading.current_thread() == self.thread:
+            raise exceptions.OperationalError(
+                message = "Request body can't be read from the event loop"
+            )
+        future = asyncio.run_coroutine_threadsafe(self.receive(), self.loop)
+        message = future.result()
+        if message["type"] == "http.disconnect": self.finished = True; return
+        body = message.get("body", b"")
+        self.buffer += body
+        self.received += len(body)
+        if not message.get("more_body", False): self.finished = True
+
+class ContextAwaitable(object):
+    """
+    Awaitable wrapper that runs the provided coroutine using its
+    own (isolated) version of the owner's thread local state.
+
+    This emulates the behavior of context variables so that multiple
+    requests handled concurrently by the same event loop (same thread)
+    do not override each other's request state.
+    """
+
+    def __init__(self, owner, coroutine):
+        self.owner = owner
+        self.coroutine = coroutine
+        self.state = dict()
+
+    def __await__(self):
+        iterator = self.coroutine.__await__()
+        local = self.owner._local.__dict__
+        value, error = None, None
+
+        while True:
+            # swaps the thread local state with the state of the coroutine,
+            # runs a step of it, and then restores the previous state, saving
+            # the (possibly changed) state of the coroutine for the next step
+            saved = dict(local)
+            local.clear()
+            local.update(self.state)
+            try:
+                if error == None: item = iterator.send(value)
+                else: item = iterator.throw(error)
+            except StopIteration as exception:
+                return exception.value
+            finally:
+                self.state = dict(local)
+                local.clear()
+                local.update(saved)
+
+            # yields the item (eg: future) to the event loop and waits for the
+            # value (or error) that is going to be sent to the coroutine
+            try: value, error = (yield item), None
+            except BaseException as exception: value, error = None, exception
+
+async def sequence(awaitables):
+    result = None
+    for awaitable in awaitables: result = await awaitable
+    return result
@@ -37,10 +37,40 @@ __copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
 __license__ = "Apache License, Version 2.0"
 """ The license for the module """
 
+import os
+import time
+import sqlite3
 import threading
+import collections
+import multiprocessing
+
+from . import codec
+from . import common
+from . import config
+from . import legacy
+from . import exceptions
+
+PICKLE_PROTOCOL = 2
+""" The protocol version to be used in the pickling of the items
+that are sent to other processes, the oldest protocol supported
+by both python 2 and python 3 interpreters """
+
+POOL_POLL = 0.5
+""" The maximum number of seconds an idle worker of the pool
+waits for an item before checking if it should stop """
+
+DURABLE_RETENTION = 86400
+""" The number of seconds for which the completed items are kept
+in the persistent store of the durable manager, before being
+removed from it (at start time) """
 
 class AsyncManager(object):
 
+    remote = False
+    """ If the manager runs the items remotely (eg: other process)
+    meaning that the items are not able to access the state of
+    the current process (eg: closures and the current request) """
+
     def __init__(self, owner):
         object.__init__(self)
         self.owner = owner
@@ -54,6 +84,9 @@ class AsyncManager(object):
     def add(self, method, args, kwargs, request = None, mid = None):
         pass
 
+    def info(self):
+        return dict(name = self.__class__.__name__)
+
 class SimpleManager(AsyncManager):
 
     def add(self, method, args, kwargs, request = None, mid = None):
@@ -68,16 +101,27 @@ class SimpleManager(AsyncManager):
 
 class QueueManager(AsyncManager):
 
+    def __init__(self, owner, timeout = 1.0):
+        AsyncManager.__init__(self, owner)
+        self.timeout = timeout
+        self.thread = None
+        self.queue = collections.deque()
+        self.condition = threading.Condition()
+        self.running = False
+
     def start(self):
         self.thread = threading.Thread(target = self.handler)
-        self.queue = []
-        self.condition = threading.Condition()
         self.running = True
         self.thread.daemon = True
         self.thread.start()
 
     def stop(self):
-        self.running = False
+        self.condition.acquire()
+        try:
+            self.running = False
+            self.condition.notify_all()
+        finally:
+            self.condition.release()
 
     def add(self, method, args, kwargs, request = None, mid = None):
         if request: kwargs["request"] = request
@@ -90,12 +134,24 @@ class QueueManager(AsyncManager):
         finally:
             self.condition.release()
 
+    def info(self):
+        info = AsyncManager.info(self)
+        info["depth"] = len(self.queue)
+        return info
+
     def handler(self):
-        while self.running:
+        while True:
+            # waits (with a timeout) for an item to be available in the queue
+            # so that the loop is able to stop in case the manager is stopped
             self.condition.acquire()
-            while not self.queue: self.condition.wait()
-            try: item = self.queue.pop(0)
-            finally: self.condition.release()
+            try:
+                while self.running and not self.queue:
+                    self.condition.wait(self.timeout)
+                if not self.running: break
+                item = self.queue.popleft()
+            finally:
+                self.condition.release()
+
             method, args, kwargs = item
             try: method(*args, **kwargs)
             except BaseException as exception:
@@ -103,3 +159,657 @@ class QueueManager(AsyncManager):
                     exception,
                     message = "Problem handling async item: %s"
                 )
+
+class PoolManager(AsyncManager):
+    """
+    Async manager based on a fixed size pool of worker threads
+    that consume the items from a bounded queue.
+
+    In case the queue is full the add operation either blocks
+    (waiting for space, up to the timeout) or rejects the item
+    right away, according to the defined policy.
+    """
+
+    def __init__(
+        self,
+        owner,
+        workers = None,
+        size = None,
+        policy = None,
+        timeout = None,
+        stop_timeout = None
+    ):
+        AsyncManager.__init__(self, owner)
+        self.workers = workers or config.conf("POOL_WORKERS", 4, cast = int)
+        self.size = size or config.conf("POOL_SIZE", 1024, cast = int)
+        self.policy = policy or config.conf("POOL_POLICY", "block")
+        self.timeout = timeout or config.conf("POOL_TIMEOUT", None, cast = float)
+        self.stop_timeout = stop_timeout or config.conf("POOL_STOP_TIMEOUT", 10.0, cast = float)
+        self.threads = []
+        self.queue = legacy.queue.Queue(maxsize = self.size)
+        self.event = threading.Event()
+        self.lock = threading.RLock()
+        self.running = False
+        self.reset()
+
+    def start(self):
+        if self.running: return
+        self.running = True
+        self.start_time = time.time()
+        self.event = threading.Event()
+        self.threads = []
+        for _index in range(self.workers):
+            thread = threading.Thread(target = self.handler, args = (self.event,))
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self):
+        if not self.running: return
+        self.running = False
+
+        # signals the current workers that they should stop once the queue
+        # is empty, no (sentinel) item is added to the queue as that would
+        # block with a full queue, and then waits for the workers up to the
+        # stop timeout (the workers are daemons, not blocking the exit)
+        self.event.set()
+        limit = time.time() + self.stop_timeout
+        for thread in self.threads: thread.join(max(limit - time.time(), 0.0))
+        self.threads = []
+
+    def add(self, method, args, kwargs, request = None, mid = None):
+        if request: kwargs["request"] = request
+        if mid: kwargs["mid"] = mid
+        item = (method, args, kwargs, time.time())
+
+        # tries to add the item to the queue according to the policy, note
+        # that for the reject policy the operation does not block and in case
+        # the queue is full an error (service unavailable) is raised
+        block = not self.policy == "reject"
+        try: self.queue.put(item, block = block, timeout = self.timeout)
+        except legacy.queue.Full:
+            self._count("rejected")
+            raise exceptions.OperationalError(
+                message = "Async queue is full (%d items)" % self.size,
+                code = 503
+            )
+        self._count("submitted")
+
+    def reset(self):
+        self.start_time = time.time()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.wait_time = 0.0
+        self.run_time = 0.0
+
+    def info(self):
+        info = AsyncManager.info(self)
+        finished = self.completed + self.failed
+        uptime = time.time() - self.start_time
+        info.update(
+            workers = self.workers,
+            size = self.size,
+            policy = self.policy,
+            depth = self.queue.qsize(),
+            submitted = self.submitted,
+            completed = self.completed,
+            failed = self.failed,
+            rejected = self.rejected,
+            wait_avg = self.wait_time / finished if finished else 0.0,
+            run_avg = self.run_time / finished if finished else 0.0,
+            throughput = finished / uptime if uptime else 0.0
+        )
+        return info
+
+    def handler(self, event = None):
+        event = event or self.event
+        while True:
+            # retrieves the next item from the queue, waiting for it only for
+            # a limited amount of time so that the stop event is checked, note
+            # that the worker only stops once the queue is empty
+            try: item = self.queue.get(timeout = POOL_POLL)
+            except legacy.queue.Empty:
+                if event.is_set(): break
+                continue
+
+            # unpacks the item and runs the method measuring both the time
+            # the item has been waiting in the queue and the running time
+            method, args, kwargs, queued = item
+            start = time.time()
+            try: method(*args, **kwargs)
+            except BaseException as exception:
+                self._count("failed", queued, start)
+                self.owner.log_error(
+                    exception,
+                    message = "Problem handling async item: %s"
+                )
+            else:
+                self._count("completed", queued, start)
+
+    def _count(self, name, queued = None, start = None):
+        self.lock.acquire()
+        try:
+            setattr(self, name, getattr(self, name) + 1)
+            if queued == None: return
+            end = time.time()
+            self.wait_time += start - queued
+            self.run_time += end - start
+        finally:
+            self.lock.release()
+
+class ProcessManager(AsyncManager):
+    """
+    Async manager based on a pool of worker processes, to be used
+    for CPU bound items that would otherwise be serialized by the
+    global interpreter lock, slowing down the other requests.
+
+    The method is sent to the worker processes by reference (app or
+    controller and the name of the method) together with the pickled
+    arguments, and the result is delivered back to the current process
+    through the callback, note that the worker processes are forked
+    from the current one so that the app is available in them.
+    """
+
+    remote = True
+
+    def __init__(self, owner, workers = None):
+        AsyncManager.__init__(self, owner)
+        self.workers = workers or config.conf("PROCESS_WORKERS", None, cast = int)
+        self.pool = None
+        self.lock = threading.RLock()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+
+    def start(self):
+        if self.pool: return
+        self.pool = multiprocessing.Pool(processes = self.workers)
+
+    def stop(self):
+        if not self.pool: return
+        self.pool.close()
+        self.pool.join()
+        self.pool = None
+
+    def add(self, method, args, kwargs, request = None, mid = None, callback = None):
+        # sets the message identifier in the keyword arguments, note that
+        # the request is never sent as it's bound to the current process
+        if mid: kwargs["mid"] = mid
+
+        # packs the method (as a reference that may be resolved in the worker
+        # process) and the arguments, raising an error in case any of the
+        # elements of the item is not picklable (not possible to send it)
+        payload = pack(self.owner, method, args, kwargs)
+
+        def handler(result):
+            self._handle(result, callback, mid)
+
+        def error_handler(exception):
+            self._handle(dict(
+                result = "error",
+                name = exception.__class__.__name__,
+                message = legacy.UNICODE(exception),
+                code = 500
+            ), callback, mid)
+
+        # in case the pool is not yet started starts it and then sends the
+        # item to it, the handler is called in the current process once the
+        # result is available (error handler only available in python 3)
+        if not self.pool: self.start()
+        kwargs = dict(error_callback = error_handler) if legacy.PYTHON_3 else dict()
+        self.pool.apply_async(execute, (payload,), callback = handler, **kwargs)
+        self._count("submitted")
+
+    def info(self):
+        info = AsyncManager.info(self)
+        info.update(
+            workers = self.workers or multiprocessing.cpu_count(),
+            submitted = self.submitted,
+            completed = self.completed,
+            failed = self.failed,
+            pending = self.submitted - self.completed - self.failed
+        )
+        return info
+
+    def _handle(self, result, callback, mid):
+        # counts the result according to its status and delivers it to the
+        # callback url, logging any problem that occurs, as the handler runs
+        # in the pool's result thread and an exception would break the pool
+        is_error = result.get("result", None) == "error"
+        self._count("failed" if is_error else "completed")
+        try:
+            if is_error and not callback: self.owner.logger.warning(
+                "Problem handling async item: %s" % result.get("message", None)
+            )
+            self.owner._async_callback(result, callback, mid)
+        except BaseException as exception:
+            self.owner.log_error(
+                exception,
+                message = "Problem handling async result: %s"
+            )
+
+    def _count(self, name):
+        self.lock.acquire()
+        try: setattr(self, name, getattr(self, name) + 1)
+        finally: self.lock.release()
+
+class DurableManager(AsyncManager):
+    """
+    Async manager backed by a local (SQLite) persistent store, where
+    every item is recorded by its message identifier (mid), so that
+    the pending items survive restarts (and crashes) of the process.
+
+    The items are recovered on start and the delivery of the result
+    to the callback url is retried with an exponential backoff, note
+    that the changes to the store are committed (and synced) in batches
+    so that the add operation remains cheap, meaning that a crash may
+    lose the items added in the last flush interval.
+
+    As the store may be shared by multiple processes, every item is
+    claimed by the manager (owner) handling it under a lease that is
+    renewed while the manager is running, so that only the items from
+    stopped (or crashed) managers are recovered by the other ones.
+    """
+
+    remote = True
+
+    def __init__(
+        self,
+        owner,
+        file_path = None,
+        workers = None,
+        flush = None,
+        retries = None,
+        backoff = None,
+        lease = None
+    ):
+        AsyncManager.__init__(self, owner)
+        base_path = config.conf("APPIER_BASE_PATH", "")
+        default_path = os.path.join(base_path, "async.sqlite")
+        self.file_path = file_path or config.conf("DURABLE_PATH", default_path)
+        self.workers = workers or config.conf("DURABLE_WORKERS", 1, cast = int)
+        self.flush = flush or config.conf("DURABLE_FLUSH", 0.05, cast = float)
+        self.retries = retries or config.conf("DURABLE_RETRIES", 5, cast = int)
+        self.backoff = backoff or config.conf("DURABLE_BACKOFF", 1.0, cast = float)
+        self.lease = lease or config.conf("DURABLE_LEASE", 60.0, cast = float)
+        self.identifier = common.util().gen_token()
+        self.renewed = 0.0
+        self.connection = None
+        self.lock = threading.RLock()
+        self.condition = threading.Condition()
+        self.event = threading.Event()
+        self.queue = collections.deque()
+        self.threads = []
+        self.dirty = False
+        self.running = False
+
+    def start(self):
+        if self.running: return
+        self.open()
+        self.running = True
+        self.event.clear()
+        self.recover()
+        self.threads = []
+        for _index in range(self.workers):
+            self.threads.append(threading.Thread(target = self.handler))
+        self.threads.append(threading.Thread(target = self.flusher))
+        for thread in self.threads:
+            thread.daemon = True
+            thread.start()
+
+    def stop(self):
+        if not self.running: return
+        self.condition.acquire()
+        try:
+            self.running = False
+            self.condition.notify_all()
+        finally:
+            self.condition.release()
+        self.event.set()
+        for thread in self.threads: thread.join()
+        self.threads = []
+        self.close()
+
+    def open(self):
+        self.lock.acquire()
+        try:
+            if self.connection: return
+            self.connection = sqlite3.connect(
+                self.file_path,
+                check_same_thread = False
+            )
+            self.connection.execute("pragma journal_mode = wal")
+            self.connection.execute("pragma synchronous = full")
+            self.connection.execute(
+                "create table if not exists jobs (" +\
+                "mid text primary key, payload blob, callback text, " +\
+                "status text, result text, attempts integer, " +\
+                "next_time real, created real, updated real, owner text, lease real)"
+            )
+            self.connection.execute(
+                "create index if not exists jobs_status on jobs (status, next_time)"
+            )
+            self.connection.execute(
+                "delete from jobs where status = 'done' and updated < ?",
+                (time.time() - DURABLE_RETENTION,)
+            )
+            self.connection.commit()
+        finally:
+            self.lock.release()
+
+    def close(self):
+        self.lock.acquire()
+        try:
+            if not self.connection: return
+            self.connection.execute(
+                "update jobs set owner = null, lease = null where owner = ?",
+                (self.identifier,)
+            )
+            self.connection.commit()
+            self.connection.close()
+            self.connection = None
+            self.dirty = False
+        finally:
+            self.lock.release()
+
+    def commit(self):
+        self.lock.acquire()
+        try:
+            if not self.dirty: return
+            self.connection.commit()
+            self.dirty = False
+        finally:
+            self.lock.release()
+
+    def add(self, method, args, kwargs, request = None, mid = None, callback = None):
+        # sets the message identifier in the keyword arguments (if defined)
+        # and generates a new one (for the store) in case it's not defined
+        if mid: kwargs["mid"] = mid
+        mid = mid or common.util().gen_token()
+
+        # packs the method and the arguments and records the item in the
+        # store (claimed by this manager), note that the change is only
+        # committed in the next flush
+        payload = pack(self.owner, method, args, kwargs)
+        current = time.time()
+        self._execute(
+            "insert or replace into jobs values (?, ?, ?, 'pending', null, 0, null, ?, ?, ?, ?)",
+            (
+                mid,
+                sqlite3.Binary(payload),
+                callback,
+                current,
+                current,
+                self.identifier,
+                current + self.lease
+            )
+        )
+        self._push(mid, "run")
+        return mid
+
+    def recover(self):
+        # claims (in a single statement) the items that were pending when
+        # their manager was stopped (or crashed), meaning the ones with no
+        # owner or with an expired lease, and marks the items with such a
+        # delivery in progress to be retried immediately (by the flusher)
+        current = time.time()
+        self.lock.acquire()
+        try:
+            self._execute(
+                "update jobs set owner = ?, lease = ? where status = 'pending' " +\
+                "and (owner is null or lease < ?)",
+                (self.identifier, current + self.lease, current)
+            )
+            self._execute(
+                "update jobs set next_time = ? where status = 'callback' " +\
+                "and next_time is null and (owner is null or lease < ?)",
+                (current, current)
+            )
+            self.commit()
+        finally:
+            self.lock.release()
+
+        # re-schedules the items claimed by this manager, skipping the
+        # ones that have already been scheduled (added before the start)
+        rows = self._execute(
+            "select mid from jobs where status = 'pending' and owner = ? order by created",
+            (self.identifier,),
+            fetch = True
+        )
+        queued = set(mid for mid, _kind in self.queue)
+        for row in rows:
+            if row[0] in queued: continue
+            self._push(row[0], "run")
+
+    def info(self):
+        info = AsyncManager.info(self)
+        rows = self._execute(
+            "select status, count(*) from jobs group by status",
+            fetch = True
+        )
+        info.update(
+            workers = self.workers,
+            depth = len(self.queue),
+            pending = 0,
+            callback = 0,
+            done = 0,
+            failed = 0
+        )
+        for status, count in rows: info[status] = count
+        return info
+
+    def handler(self):
+        while True:
+            # waits for an item to be available in the (memory) queue so
+            # that the loop is able to stop in case the manager is stopped
+            self.condition.acquire()
+            try:
+                while self.running and not self.queue:
+                    self.condition.wait(self.flush)
+                if not self.running: break
+                mid, kind = self.queue.popleft()
+            finally:
+                self.condition.release()
+
+            try: self._process(mid, kind)
+            except BaseException as exception:
+                self.owner.log_error(
+                    exception,
+                    message = "Problem handling async item: %s"
+                )
+
+    def flusher(self):
+        while self.running:
+            self.event.wait(self.flush)
+            try:
+                self.commit()
+                self._renew()
+                self._retry()
+            except BaseException as exception:
+                self.owner.log_error(
+                    exception,
+                    message = "Problem flushing async items: %s"
+                )
+
+    def _process(self, mid, kind):
+        rows = self._execute(
+            "select payload, callback, result, attempts from jobs where mid = ?",
+            (mid,),
+            fetch = True
+        )
+        if not rows: return
+        payload, callback, result, attempts = rows[0]
+
+        # in case the item should be run unpacks it and runs the method using
+        # the app infra-structure (error handling), storing its result
+        if kind == "run":
+            def call():
+                method, args, kwargs = unpack(self.owner, legacy.BYTES(payload))
+                return method(*args, **kwargs)
+
+            result = self.owner._async_call(call, (), dict())
+            self._execute(
+                "update jobs set status = ?, result = ?, updated = ? where mid = ?",
+                ("callback" if callback else "done", self._dumps(result), time.time(), mid)
+            )
+        else:
+            result = codec.loads(result)
+
+        # in case there's no callback url there's nothing remaining to be done
+        # otherwise tries to deliver the result to it, scheduling a new delivery
+        # (with exponential backoff) in case it fails, up until the limit
+        if not callback: return
+        try: success = self.owner._async_callback(result, callback, mid)
+        except BaseException as exception:
+            self.owner.log_error(
+                exception,
+                message = "Problem delivering async result: %s"
+            )
+            success = False
+        attempts += 1
+        if success: status, next_time = "done", None
+        elif attempts >= self.retries: status, next_time = "failed", None
+        else: status, next_time = "callback", time.time() + self.backoff * 2 ** (attempts - 1)
+        self._execute(
+            "update jobs set status = ?, attempts = ?, next_time = ?, updated = ? where mid = ?",
+            (status, attempts, next_time, time.time(), mid)
+        )
+
+    def _renew(self):
+        # extends the lease of the items claimed by this manager, so that
+        # they are not recovered by other managers while it's running
+        current = time.time()
+        if current - self.renewed < self.lease / 2.0: return
+        self.renewed = current
+        self._execute(
+            "update jobs set lease = ? where owner = ? and status in ('pending', 'callback')",
+            (current + self.lease, self.identifier)
+        )
+        self.commit()
+
+    def _retry(self):
+        # retrieves the items whose delivery should be retried and claims
+        # them marking them as in progress (unset next time), the claim is
+        # conditional so that an item claimed by other manager (sharing the
+        # store) in the meantime is skipped, then schedules their delivery
+        claimed = []
+        current = time.time()
+        self.lock.acquire()
+        try:
+            rows = self._execute(
+                "select mid from jobs where status = 'callback' and next_time <= ?",
+                (current,),
+                fetch = True
+            )
+            for row in rows:
+                count = self._execute(
+                    "update jobs set next_time = null, owner = ?, lease = ? " +\
+                    "where mid = ? and status = 'callback' and next_time <= ?",
+                    (self.identifier, current + self.lease, row[0], current)
+                )
+                if count: claimed.append(row[0])
+            if claimed: self.commit()
+        finally:
+            self.lock.release()
+        for mid in claimed: self._push(mid, "callback")
+
+    def _push(self, mid, kind):
+        self.condition.acquire()
+        try:
+            self.queue.append((mid, kind))
+            self.condition.notify()
+        finally:
+            self.condition.release()
+
+    def _execute(self, query, args = (), fetch = False):
+        self.lock.acquire()
+        try:
+            if not self.connection: self.open()
+            cursor = self.connection.execute(query, args)
+            if fetch: return cursor.fetchall()
+            self.dirty = True
+            return cursor.rowcount
+        finally:
+            self.lock.release()
+
+    def _dumps(self, result):
+        try: return codec.dumps(result)
+        except (TypeError, ValueError): return codec.dumps(result, default = str)
+
+def execute(payload):
+    """
+    Runs the async item represented by the provided (pickled) payload
+    under the worker process, this function is sent to the worker
+    processes of the process manager.
+
+    :type payload: String
+    :param payload: The pickled tuple containing the reference to the
+    method and the positional and keyword arguments for the call.
+    :rtype: Dictionary
+    :return: The (picklable) result of the execution of the method.
+    """
+
+    app = common.base().APP
+
+    def call():
+        method, args, kwargs = unpack(app, payload)
+        return method(*args, **kwargs)
+
+    # runs the call using the app infra-structure (error handling) and
+    # then makes sure that the result is picklable (to be sent back)
+    result = app._async_call(call, (), dict())
+    try: legacy.cPickle.dumps(result, PICKLE_PROTOCOL)
+    except Exception as exception:
+        result = dict(
+            result = "error",
+            name = exception.__class__.__name__,
+            message = "Not possible to send async result to parent (%s)" % exception,
+            code = 500
+        )
+    return result
+
+def pack(owner, method, args, kwargs):
+    """
+    Packs the provided method and arguments into a pickled payload
+    that may be sent to other processes or persisted, the method is
+    converted into a reference (app or controller and method name)
+    that may be resolved latter using the app.
+
+    :type owner: App
+    :param owner: The app that owns the method (or its controller).
+    :type method: Function
+    :param method: The method that is going to be packed.
+    :type args: List
+    :param args: The positional arguments for the method call.
+    :type kwargs: Dictionary
+    :param kwargs: The keyword arguments for the method call.
+    :rtype: String
+    :return: The pickled payload for the method call.
+    """
+
+    name = getattr(method, "__name__", None)
+    context = getattr(method, "__self__", None)
+    controllers = getattr(owner, "controllers", {})
+    context_n = context.__class__.__name__
+    if context == None: reference = ("object", None, method)
+    elif context is owner: reference = ("app", None, name)
+    elif controllers.get(context_n, None) is context:
+        reference = ("controller", context_n, name)
+    else: reference = ("object", None, method)
+
+    try: return legacy.cPickle.dumps((reference, args, kwargs), PICKLE_PROTOCOL)
+    except Exception as exception:
+        raise exceptions.OperationalError(
+            message = "Not possible to pack async item '%s' (%s)" %\
+                (name or method, exception)
+        )
+
+def unpack(app, payload):
+    reference, args, kwargs = legacy.cPickle.loads(payload)
+    kind, name, value = reference
+    if kind == "app": method = getattr(app, value)
+    elif kind == "controller": method = getattr(app.controllers[name], value)
+    else: method = value
+    return method, args, kwargs
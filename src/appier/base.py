@@ -43,8 +43,9 @@ import sys
 import imp
 import time
 import json
+import zlib
 import uuid
-import locale
+import hashlib
 import inspect
 import datetime
 import itertools
@@ -62,13 +63,16 @@ from . import data
 from . import smtp
 from . import async
 from . import cache
+from . import codec
 from . import model
 from . import config
 from . import legacy
 from . import session
+from . import router
+from . import asgi
 from . import request
-from . import defines
 from . import compress
+from . import static
 from . import settings
 from . import observer
 from . import controller
@@ -196,6 +200,40 @@ EMPTY_METHODS = (
 """ Sequence containing the complete set of http methods, that
 should have an empty body as defined by http specification """
 
+CACHE_METHODS = (
+    "GET",
+    "HEAD"
+)
+""" Sequence containing the http methods for which the responses
+of the routes may be cached (read only methods) """
+
+CACHE_TTL = 60.0
+""" The default number of seconds for which the cached response
+of a route is considered valid (when not provided) """
+
+ETAG_MAX = 1048576
+""" The default maximum size in bytes of a dynamic response for which
+an (automatic) etag is computed, larger ones are not hashed """
+
+JSON_STREAM = 10000
+""" The default minimum number of items of a map or list result for
+it to be serialized incrementally (streamed) as JSON """
+
+BODY_MAX = 0
+""" The default maximum size in bytes of the body of a request, larger
+requests are rejected (413 code), zero means no limit """
+
+MULTIPART_SPOOL = 1048576
+""" The default size in bytes above which the files of the multipart
+uploads are spooled into temporary files (instead of memory) """
+
+CACHE_EVENTS = (
+    "post_save",
+    "post_delete"
+)
+""" The events of the models (used as tags of cached routes) that
+invalidate the cached responses associated with them """
+
 BASE_HEADERS = (
     ("X-Powered-By", "%s/%s" % (NAME, VERSION)),
 )
@@ -203,11 +241,6 @@ BASE_HEADERS = (
 and that are going to be applied to all of the requests received
 by the appier framework (water marking each of the requests) """
 
-REQUEST_LOCK = threading.RLock()
-""" The lock to be used in the application handling of request
-so that no two request get handled at the same time for the current
-app instance, as that would create some serious problems """
-
 CASTERS = {
     list : lambda v: [y for y in itertools.chain(*[x.split(",") for x in v])],
     bool : lambda v: v if type(v) == bool else\
@@ -229,7 +262,8 @@ class App(
     legacy.with_meta(
         meta.Indexed,
         observer.Observable,
-        compress.Compress
+        compress.Compress,
+        asgi.ASGIApp
     )
 ):
     """
@@ -274,8 +308,9 @@ class App(
         safe = False,
         payload = False,
         cache_s = 604800,
-        cache_c = cache.MemoryCache,
-        session_c = session.FileSession
+        cache_c = cache.BoundedCache,
+        session_c = session.FileSession,
+        etag = False
     ):
         observer.Observable.__init__(self)
         compress.Compress.__init__(self)
@@ -288,16 +323,24 @@ class App(
         self.cache_s = cache_s
         self.cache_c = cache_c
         self.session_c = session_c
+        self.etag = etag
+        self.etag_max = ETAG_MAX
+        self.json_stream = JSON_STREAM
+        self.body_max = BODY_MAX
+        self.multipart_spool = MULTIPART_SPOOL
         self.description = self._description()
         self.server = None
         self.host = None
         self.port = None
         self.ssl = False
         self.local_url = None
-        self.cache_d = self.cache_c()
+        self.cache_d = None
         self.adapter = data.MongoAdapter()
         self.manager = async.QueueManager(self)
+        self.stat_cache = static.StatCache()
+        self.file_cache = static.FileCache()
         self.routes_v = None
+        self.router = None
         self.tid = None
         self.type = "default"
         self.status = STOPPED
@@ -317,6 +360,10 @@ class App(
         self._locale_d = locales[0]
         self._user_routes = None
         self._core_routes = None
+        self._local = threading.local()
+        self._routes_lock = threading.RLock()
+        self._cache_models = {}
+        self._jinja_envs = {}
         self._own = self
         self._set_global()
         self._load_paths()
@@ -324,9 +371,14 @@ class App(
         self._load_logging(level)
         self._load_settings()
         self._load_handlers(handlers)
+        self._load_cache()
         self._load_session()
         self._load_adapter()
         self._load_manager()
+        self._load_static()
+        self._load_etag()
+        self._load_json()
+        self._load_body()
         self._load_request()
         self._load_context()
         self._load_bundles()
@@ -353,9 +405,7 @@ class App(
 
     @property
     def request(self):
-        if not self.safe: return self._request
-        if self.is_main(): return self._request
-        return self.mock
+        return self._request
 
     @property
     def mock(self):
@@ -363,9 +413,26 @@ class App(
 
     @property
     def own(self):
-        if not self.safe: return self._own
-        if self.is_main(): return self._own
-        return self
+        return self._own
+
+    @property
+    def _request(self):
+        # retrieves the request associated with the current thread, this
+        # is the request being handled by it or the mock request in case
+        # the thread is not handling any request (eg: background thread)
+        return getattr(self._local, "request", self._mock)
+
+    @_request.setter
+    def _request(self, value):
+        self._local.request = value
+
+    @property
+    def _own(self):
+        return getattr(self._local, "own", self)
+
+    @_own.setter
+    def _own(self, value):
+        self._local.own = value
 
     @staticmethod
     def load():
@@ -395,7 +462,15 @@ class App(
         App._CUSTOM_HANDLERS[key] = custom_handlers
 
     @staticmethod
-    def norm_route(method, expression, function, async = False, json = False, context = None):
+    def norm_route(
+        method,
+        expression,
+        function,
+        async = False,
+        json = False,
+        context = None,
+        cache = None
+    ):
         # creates the list that will hold the various parameters (type and
         # name tuples) and the map that will map the name of the argument
         # to the string representing the original expression of it so that
@@ -415,6 +490,7 @@ class App(
             base = expression,
             param_t = param_t,
             names_t = names_t,
+            cache = App.norm_cache(cache)
         )
 
         # creates a new match based iterator to try to find all the parameter
@@ -452,7 +528,36 @@ class App(
         expression = expression.replace("?P[", "?P<")
         return [method, re.compile(expression, re.UNICODE), function, context, opts]
 
+    @staticmethod
+    def norm_cache(cache):
+        """
+        Normalizes the provided cache definition of a route into a map
+        containing the time to live, the vary sequence (request values
+        that are part of the key) and the (invalidation) tags.
+
+        The definition may be a boolean (default values), a number (the
+        time to live in seconds) or a map with any of the values.
+
+        :type cache: Object
+        :param cache: The cache definition of the route to be normalized.
+        :rtype: Dictionary
+        :return: The normalized cache map or an invalid value in case
+        no caching is meant to be used for the route.
+        """
+
+        if not cache: return None
+        if type(cache) == bool: cache = dict()
+        elif not isinstance(cache, dict): cache = dict(ttl = cache)
+        tags = cache.get("tags", ())
+        return dict(
+            ttl = cache.get("ttl", CACHE_TTL),
+            vary = tuple(cache.get("vary", ())),
+            tags = tuple(tag if type(tag) in legacy.STRINGS else tag.__name__ for tag in tags),
+            models = tuple(tag for tag in tags if hasattr(tag, "bind_g"))
+        )
+
     def unload(self):
+        self._unload_cache()
         self._unload_models()
         self._unload_logging()
 
@@ -668,6 +773,27 @@ class App(
         server = GunicornApplication(self.application, options)
         server.run()
 
+    def serve_uvicorn(self, host, port, **kwargs):
+        """
+        Starts the serving of the current application using the
+        python based uvicorn (ASGI) server in the provided host and
+        port as requested, this requires an interpreter that supports
+        the native coroutines syntax (async/await).
+
+        For more information on the uvicorn http server please
+        refer to https://www.uvicorn.org.
+
+        :type host: String
+        :param host: The host name of ip address to bind the server
+        to, this value should be represented as a string.
+        :type port: int
+        :param port: The tcp port for the bind operation of the
+        server (listening operation).
+        """
+
+        import uvicorn
+        uvicorn.run(self.application_asgi, host = host, port = port)
+
     def load_jinja(self, **kwargs):
         try: import jinja2
         except: self.jinja = None; return
@@ -694,6 +820,9 @@ class App(
 
         for name, value in self.context.items(): self.add_global(value, name)
 
+        self.jinja.autoescape = self._autoescape_jinja
+        self._jinja_envs = {}
+
     def add_filter(self, method, name = None, context = False):
         """
         Adds a filter to the current context in the various template
@@ -778,9 +907,14 @@ class App(
         Method responsible for the preparation of the application state
         into the typical structure expected at the start of the handling
         of request received from the top level server infra-structure.
+
+        Note that the request state is stored in thread local storage
+        so no locking is required, and multiple requests may be handled
+        concurrently by the same application instance.
         """
 
-        REQUEST_LOCK.acquire()
+        self._request = self._mock
+        self._own = self
 
     def restore(self):
         """
@@ -792,11 +926,76 @@ class App(
         so that the application behavior remains static.
         """
 
-        self._request = self._mock
-        self._own = self
-        REQUEST_LOCK.release()
+        self._local.__dict__.clear()
 
     def application_l(self, environ, start_response):
+        # starts the handling of the request, creating the request object
+        # from the wsgi environment and running the initial handlers
+        self._application_start(environ)
+
+        try:
+            # handles the currently defined request and in case there's an
+            # exception triggered by the underlying action methods, handles
+            # it with the proper error handler so that a proper result value
+            # is returned indicating the exception
+            result = self.handle()
+
+            # in case the action method is a coroutine (async) it must be run
+            # to completion (in a local loop) as this is a synchronous context
+            if legacy.is_awaitable(result): result = self.handle_result(asgi.run_sync(result))
+
+            # "extracts" the data type for the result value coming from the handle
+            # method, in case the value is a generator extracts the first value from
+            # it so that it may be used  for length evaluation (protocol definition)
+            # at this stage it's possible to have an exception raised for a non
+            # existent file or any other pre validation based problem
+            is_generator = legacy.is_generator(result)
+            if is_generator: first = next(result)
+            else: first = None
+
+            # starts the encoding of the json stream (if that's the case) so that
+            # the failures in its initial part (eg: the query of the lazy iterable)
+            # are handled as errors, as it's done for the generators
+            result = self._json_prime(result)
+        except BaseException as exception:
+            # resets the values associated with the generator based strategy so
+            # that the error/exception is handled in the proper (non generator)
+            # way and no interference exists for such situation, otherwise some
+            # compatibility problems would occur
+            is_generator = False
+            first = None
+
+            # handles the exception (logging it) so that the resulting value
+            # represents the exception with either a map or a string
+            result = self._application_error(exception)
+        finally:
+            # flushes the request information (eg: session) and closes
+            # the request releasing its resources (eg: spooled files)
+            self._application_flush()
+
+        # finishes the handling of the request building the status code, the
+        # headers and the result (iterable) value then starts the response
+        # with the status and headers and returns the result to wsgi
+        code_s, headers, result = self._application_end(result, is_generator, first)
+        result = self._application_stream(environ, result)
+        start_response(code_s, headers)
+        return result
+
+    def _application_stream(self, environ, result):
+        # in case the result is not a generator or no file range has been
+        # registered as the stream of the request there's nothing to be done
+        stream = self.request.stream
+        if not stream or not legacy.is_generator(result): return result
+
+        # in case the server provides a file wrapper (eg: sendfile support)
+        # and the range can be handled by it the generator is dropped (it has
+        # not started the sending of the file) and the wrapper is used instead
+        wrapper = environ.get("wsgi.file_wrapper", None)
+        if not wrapper or not stream.wrappable(): return result
+        result.close()
+        return stream.wrap(wrapper)
+
+    def _application_start(self, environ):
         # unpacks the various fields provided by the wsgi layer
         # in order to use them in the current request handling
         method = environ["REQUEST_METHOD"]
@@ -804,6 +1003,7 @@ class App(
         query = environ["QUERY_STRING"]
         script_name = environ["SCRIPT_NAME"]
         content_length = environ.get("CONTENT_LENGTH")
+        content_type = environ.get("CONTENT_TYPE", "")
         address = environ.get("REMOTE_ADDR")
         input = environ.get("wsgi.input")
         scheme = environ.get("wsgi.url_scheme")
@@ -853,73 +1053,60 @@ class App(
         params = util.decode_params(params)
         self.request.set_params(params)
 
-        # reads the data from the input stream file and then tries
-        # to load the data appropriately handling all normal cases
-        # (eg json, form data, etc.)
-        data = None if method in BODYLESS_METHODS else input.read(content_length_i)
+        # verifies if the body of the request is a multipart one (eg: file
+        # uploads) in which case it's not read at once but parsed (in chunks)
+        # directly from the input stream, the same happens for a body larger
+        # than the maximum allowed size, that is rejected on handling
+        is_body = not method in BODYLESS_METHODS
+        is_large = self.body_max and content_length_i > self.body_max
+        is_stream = is_body and content_type.startswith("multipart/form-data")
+
+        # reads the data from the input stream file and sets it in the
+        # request, note that the parsing of the data (eg json, form data,
+        # etc.), the loading of the session and the resolution of the
+        # locale (with the setting of the global operative system locale)
+        # are deferred until the first access to them (lazy loading)
+        is_read = is_body and not is_large and not is_stream
+        data = input.read(content_length_i) if is_read else None
+        if is_read and content_length_i < 0: content_length_i = len(data)
+        self.request.set_input(input if is_stream else None, length = content_length_i)
         self.request.set_data(data)
-        self.request.load_base()
-        self.request.load_locale(self.locales)
-
-        # resolves the secret based params so that their content
-        # is correctly decrypted according to the currently set secret
-        self.request.resolve_params()
-
-        # sets the global (operative system) locale for according to the
-        # current value of the request, this value should be set while
-        # the request is being handled after that it should be restored
-        # back to the original (unset) value
-        self._set_locale()
 
         # calls the before request handler method, indicating that the
         # request is going to be handled in the next few logic steps
         self.before_request()
 
-        try:
-            # handles the currently defined request and in case there's an
-            # exception triggered by the underlying action methods, handles
-            # it with the proper error handler so that a proper result value
-            # is returned indicating the exception
-            result = self.handle()
-
-            # "extracts" the data type for the result value coming from the handle
-            # method, in case the value is a generator extracts the first value from
-            # it so that it may be used  for length evaluation (protocol definition)
-            # at this stage it's possible to have an exception raised for a non
-            # existent file or any other pre validation based problem
-            is_generator = legacy.is_generator(result)
-            if is_generator: first = next(result)
-            else: first = None
-        except BaseException as exception:
-            # resets the values associated with the generator based strategy so
-            # that the error/exception is handled in the proper (non generator)
-            # way and no interference exists for such situation, otherwise some
-            # compatibility problems would occur
-            is_generator = False
-            first = None
-
-            # verifies if the current error to be handled is a soft one (not severe)
-            # meaning that it's expected under some circumstances, for that kind of
-            # situations a less verbose logging operation should be performed
-            is_soft = type(exception) in (exceptions.NotFoundError,)
+    def _application_error(self, exception):
+        # verifies if the current error to be handled is a soft one (not severe)
+        # meaning that it's expected under some circumstances, for that kind of
+        # situations a less verbose logging operation should be performed
+        is_soft = type(exception) in (exceptions.NotFoundError,)
+
+        # handles the raised exception with the proper behavior so that the
+        # resulting value represents the exception with either a map or a
+        # string based value (properly encoded with the default encoding)
+        result = self.handle_error(exception)
+        if is_soft: self.log_warning(exception)
+        else: self.log_error(exception)
+        return result
 
-            # handles the raised exception with the proper behavior so that the
-            # resulting value represents the exception with either a map or a
-            # string based value (properly encoded with the default encoding)
-            result = self.handle_error(exception)
-            if is_soft: self.log_warning(exception)
-            else: self.log_error(exception)
-        finally:
-            # performs the flush operation in the request so that all the
-            # stream oriented operation are completely performed, this should
-            # include things like session flushing (into cookie)
-            self.request.flush()
+    def _application_flush(self):
+        # performs the flush operation in the request so that all the
+        # stream oriented operation are completely performed, this should
+        # include things like session flushing (into cookie), and then closes
+        # it releasing its resources (eg: spooled files of multipart uploads),
+        # note that as this runs after the handling of the request a failure
+        # in the flush (eg: session backend) can only be logged
+        try: self.request.flush()
+        except Exception as exception: self.log_error(
+            exception, message = "Problem flushing request: %s"
+        )
+        self.request.close()
 
-            # resets the locale so that the value gets restored to the original
-            # value as it is expected by the current systems behavior, note that
-            # this is only done in case the safe flag is active (would create some
-            # serious performance problems otherwise)
-            if self.safe: self._reset_locale()
+    def _application_end(self, result, is_generator, first):
+        # retrieves the method of the request, that is going to be used
+        # to determine if the response should be empty
+        method = self.request.method
 
         # in case the current method required empty responses/result the result
         # is "forced" to be empty so that no specification is
@@ -935,6 +1122,7 @@ class App(
         # such situations the single result value is set with success
         is_map = result_t == dict
         is_list = result_t in (list, tuple)
+        is_lazy = result_t == util.JSONStream
         if is_map and not result: result["result"] = "success"
 
         # retrieves the complete set of warning "posted" during the handling
@@ -951,19 +1139,31 @@ class App(
         # verifies if the current response is meant to be serialized as a json message
         # this is the case for both the map type of response and the list type type
         # of response as both of them represent a json message to be serialized
-        is_json = is_map or is_list
+        is_json = is_map or is_list or is_lazy
 
         # retrieves the name of the encoding that is going to be used in case the
         # the resulting data need to be converted from unicode
         encoding = self.request.get_encoding()
 
+        # verifies if the json result is meant to be streamed, this is the case
+        # for lazy iterables and large maps and lists, for which the result is
+        # turned into a generator of the incrementally encoded chunks, sent
+        # without a content length (chunked transfer encoding)
+        is_large = (is_map or is_list) and self.json_stream and len(result) >= self.json_stream
+        is_stream = is_lazy or is_large
+        is_primed = is_lazy and result.encoded
+        if is_stream and not is_primed: result = self._json_chunks(result, encoding)
+        if is_primed: result = iter(result)
+        if is_stream: is_generator = True; first = None
+
         # dumps the result using the json serializer and retrieves the resulting
         # string value from it as the final message to be sent to the client, then
         # validates that the value is a string value in case it's not casts it as
         # a string using the default "serializer" structure
-        result_s = json.dumps(result) if is_json else result
+        result_s = codec.dumps(result) if is_json and not is_stream else result
         result_t = type(result_s)
-        if result_t == legacy.UNICODE: result_s = result_s.encode(encoding)
+        if is_stream: result_s = b""
+        elif result_t == legacy.UNICODE: result_s = result_s.encode(encoding)
         elif not result_t == legacy.BYTES: result_s = legacy.bytes(str(result_s))
 
         # calculates the final size of the resulting message in bytes so that
@@ -983,31 +1183,76 @@ class App(
         # modifications on the request/response to be sent to the client
         self.after_request()
 
+        # in case the result is not a generator (those handle their own encoding,
+        # except for the json streams) and no encoding has been defined, negotiates
+        # the content encoding for the result with the client, so that it's taken
+        # into account in the etag, note that the size of a stream is unknown
+        content_type = self.request.get_content_type() or "text/plain"
+        is_encoded = (is_generator and not is_stream) or\
+            "Content-Encoding" in self.request.out_headers
+        content_encoding = None if is_encoded else\
+            self.negotiate_encoding(content_type, result_l)
+
+        # in case the response of the route is meant to be cached (cache miss)
+        # stores the serialized response, note that this may turn the response
+        # into a not modified one (in case the etag matches the client's one)
+        is_cache = self.request.cache_key and self.request.method == "GET"
+        if is_cache and not is_generator and self.request.is_success():
+            result_s = self._cache_store(result_s, content_type, encoding = content_encoding)
+            result_l = len(result_s)
+            is_empty = self.request.is_empty() and result_l == 0
+
+        # in case the automatic etag mode is enabled and the response is a
+        # (successful) dynamic one without etag, hashes its contents to create
+        # the etag, turning the response into a not modified one on match
+        is_etag = self.etag and not is_generator and self.request.method == "GET"
+        if is_etag and self.request.is_success() and not "Etag" in self.request.out_headers:
+            result_s = self._etag_result(result_s, encoding = content_encoding)
+            result_l = len(result_s)
+            is_empty = self.request.is_empty() and result_l == 0
+
+        # compresses the data using the negotiated encoding, unless the response
+        # has been turned into a not modified one (no contents to be compressed),
+        # the json streams are compressed incrementally (as they're generated)
+        if content_encoding and is_stream:
+            result = self.encode_chunks(result, content_encoding)
+            self.request.set_header("Content-Encoding", content_encoding)
+        elif content_encoding and not self.request.code == 304:
+            result_s = self.encode(result_s, content_encoding)
+            result_l = len(result_s)
+            self.request.set_header("Content-Encoding", content_encoding)
+        if not is_encoded and self.is_compressible(content_type):
+            self.request.set_header("Vary", "Accept-Encoding")
+
         # retrieves the (output) headers defined in the current request and extends
         # them with the current content type (json) then calls starts the response
         # method so that the initial header is set to the client
         headers = self.request.get_headers() or []
-        content_type = self.request.get_content_type() or "text/plain"
         code_s = self.request.get_code_s()
         headers.extend([("Content-Type", content_type)])
-        if not is_empty: headers.append(("Content-Length", str(result_l)))
+        if not is_empty and not result_l == None: headers.append(("Content-Length", str(result_l)))
         headers.extend(BASE_HEADERS)
-        start_response(code_s, headers)
 
-        # determines the proper result value to be returned to the wsgi infra-structure
+        # determines the proper result value to be returned to the server infra-structure
         # in case the current result object is a generator it's returned to the caller
         # method, otherwise a the proper set of chunks is "yield" for the result string
         result = result if is_generator else self.chunks(result_s)
-        return result
+        return code_s, headers, result
 
     def handle(self):
+        # verifies that the size of the body of the request is within the
+        # maximum allowed one, rejecting the request otherwise (not read)
+        self._check_body()
+
         # in case the request is considered to be already handled (by the middleware)
         # the result is considered to be the one cached in the request, otherwise runs
         # the "typical" routing process that should use the loaded routes to retrieve
         # actions methods that are then used to handle the request
         if self.request.handled: result = self.request.result
         else: result = self.route()
+        return self.handle_result(result)
 
+    def handle_result(self, result):
         # returns the result defaulting to an empty map in case no value was
         # returned from the handling method (fallback strategy) note that this
         # strategy is only applied in case the request is considered to be a
@@ -1030,7 +1275,8 @@ class App(
             exception.headers or None
         errors = hasattr(exception, "errors") and\
             exception.errors or None
-        session = self.request.session
+        session = self.request.session if\
+            self.request.is_loaded("session") else None
         sid = session and session.sid
         scope = self.request.context.__class__
 
@@ -1141,17 +1387,18 @@ class App(
         used in the handling of the current request.
         """
 
-        # retrieves the currently defined set of routes, this should be
-        # handled using a lazy loading strategy, where only the first call
-        # will trigger a loading process, the following ones are cached
-        routes = self._routes()
+        # makes sure that the currently defined set of routes is loaded
+        # (and the router compiled), this should be handled using a lazy
+        # loading strategy, where only the first call will trigger a
+        # loading process, the following ones are cached
+        self._routes()
 
         # unpacks the various element from the request, this values are
         # going to be used along the routing process
         method = self.request.method
         path = self.request.path
         params = self.request.params
-        data_j = self.request.data_j
+        data_j = self.request.data_j if self.request.data else None
 
         # runs the unquoting of the path as this is required for a proper
         # routing of the request (extra values must be correctly processed)
@@ -1171,107 +1418,117 @@ class App(
         mid = mid[0] if mid else None
         callback = callback[0] if callback else None
 
-        # iterates over the complete set of routing items that are
-        # going to be verified for matching (complete regex collision)
-        # and runs the match operation, handling the request with the
-        # proper action method associated
-        for route in routes:
-            # unpacks the current item into the http method, regex and
-            # action method and then tries to match the current path
-            # against the current regex in case there's a valid match and
-            # the current method is valid in the current item continues
-            # the current logic (method handing)
-            methods_i, regex_i, method_i = route[:3]
-            match = regex_i.match(path_u)
-            if not method in methods_i or not match: continue
-
-            # verifies if there's a definition of an options map for the current
-            # routes in case there's not defines an empty one (fallback)
-            item_l = len(route)
-            opts_i = route[3] if item_l > 3 else {}
-
-            # tries to retrieve the payload attribute for the current item in case
-            # a json data value is defined otherwise default to single value (simple
-            # message handling)
-            if data_j: payload = data_j["payload"] if "payload" in data_j else [data_j]
-            else: payload = [data_j]
-
-            # retrieves the number of messages to be processed in the current context
-            # this value will have the same number as the callbacks calls for the async
-            # type of message processing (as defined under specification)
-            mcount = len(payload)
-
-            # sets the initial (default) return value from the action method as unset,
-            # this value should be overriden by the various actions methods
-            return_v = None
-
-            # updates the value of the json (serializable) request taking into account
-            # the value of the json option for the request to be handled, this value
-            # will be used in the serialization of errors so that the error gets properly
-            # serialized even in template based events (forced serialization)
-            self.request.json = opts_i.get("json", False)
-
-            # tries to retrieve the parameters tuple from the options in the item in
-            # case it does not exists defaults to an empty list (as defined in spec)
-            param_t = opts_i.get("param_t", [])
-
-            # iterates over all the items in the payload to handle them in sequence
-            # as defined in the payload list (first come, first served)
-            for payload_i in payload:
-                # retrieves the method specification for both the "unnamed" arguments and
-                # the named ones (keyword based) so that they may be used to send the correct
-                # parameters to the action methods
-                method_a = legacy.getargspec(method_i)[0]
-                method_kw = legacy.getargspec(method_i)[2]
-
-                # retrieves the various matching groups for the regex and uses them as the first
-                # arguments to be sent to the method then adds the json data to it, after that
-                # the keyword arguments are "calculated" using the provided "get" parameters but
-                # filtering the ones that are not defined in the method signature
-                groups = match.groups()
-                groups = [value_t(value) for value, (value_t, _value_n) in zip(groups, param_t)]
-                args = list(groups) + ([] if payload_i == None or not self.payload else [payload_i])
-                kwargs = dict([(key, value[0]) for key, value in params.items() if key in method_a or method_kw])
-
-                # in case the current route is meant to be as handled asynchronously
-                # runs the logic so that the return is immediate and the handling is
-                # deferred to a different thread execution logic
-                is_async = opts_i.get("async", False)
-                if is_async:
-                    mid = self.run_async(
-                        method_i,
-                        callback,
-                        mid = mid,
-                        args = args,
-                        kwargs = kwargs
-                    )
-                    return_v = dict(
-                        result = "async",
-                        mid = mid,
-                        mcount = mcount
-                    )
-                # otherwise the request is synchronous and should be handled immediately
-                # in the current workflow logic, thread execution may block for a while
-                else:
-                    has_context = hasattr(method_i, "__self__")
-                    context = method_i.__self__ if has_context else self
-                    self._own = context
-                    self.request.context = context
-                    self.request.method_i = method_i
-                    return_v = method_i(*args, **kwargs)
-
-            # returns the currently defined return value, for situations where
-            # multiple call have been handled this value may contain only the
-            # result from the last call
-            return return_v
-
-        # raises a runtime error as if the control flow as reached this place
-        # no regular expression/method association has been matched
-        raise exceptions.NotFoundError(
+        # uses the compiled router to find the route that matches the current
+        # method and path (if any), the router buckets the routes by method and
+        # first path segment and combines their regexes, so that the cost of the
+        # matching is not proportional to the number of routes in the app
+        route, groups = self.router.match(method, path_u)
+
+        # in case no route has been matched raises a not found error as the
+        # control flow should not continue (no action method is available)
+        if not route: raise exceptions.NotFoundError(
             message = "Request %s '%s' not handled" % (method, path_u),
             code = 404
         )
 
+        # unpacks the current item into the http method, regex and
+        # action method, these values are going to be used in the
+        # handling of the request by the proper action method
+        _methods_i, _regex_i, method_i = route[:3]
+
+        # verifies if there's a definition of an options map for the current
+        # routes in case there's not defines an empty one (fallback)
+        item_l = len(route)
+        opts_i = route[3] if item_l > 3 else {}
+
+        # tries to retrieve the payload attribute for the current item in case
+        # a json data value is defined otherwise default to single value (simple
+        # message handling)
+        if data_j: payload = data_j["payload"] if "payload" in data_j else [data_j]
+        else: payload = [data_j]
+
+        # retrieves the number of messages to be processed in the current context
+        # this value will have the same number as the callbacks calls for the async
+        # type of message processing (as defined under specification)
+        mcount = len(payload)
+
+        # sets the initial (default) return value from the action method as unset,
+        # this value should be overriden by the various actions methods, and
+        # creates the list that is going to store the awaitable return values
+        return_v = None
+        awaitables = []
+
+        # updates the value of the json (serializable) request taking into account
+        # the value of the json option for the request to be handled, this value
+        # will be used in the serialization of errors so that the error gets properly
+        # serialized even in template based events (forced serialization)
+        self.request.json = opts_i.get("json", False)
+
+        # in case the route is cacheable and the request is a read only one tries
+        # to retrieve the (serialized) response from the cache, returning it
+        # immediately in case it's valid (the action method is not called)
+        cache_o = opts_i.get("cache", None)
+        if cache_o and method in CACHE_METHODS:
+            cached = self._cache_route(cache_o)
+            if not cached == None: return cached
+
+        # retrieves the binder for the action method (created at load time) or
+        # creates a new one in case it's not available (eg: route added latter)
+        # and then uses it to cast the various matching groups for the regex
+        binder = opts_i.get("binder", None)
+        if not binder: binder = opts_i["binder"] = self._binder(route)
+        groups = binder.cast(groups)
+
+        # iterates over all the items in the payload to handle them in sequence
+        # as defined in the payload list (first come, first served)
+        for payload_i in payload:
+            # uses the casted groups as the first arguments to be sent to the method
+            # then adds the json data to it, after that the keyword arguments are bound
+            # using the provided "get" parameters but filtering the ones that are not
+            # defined in the method signature (using the precomputed binder)
+            args = groups + ([] if payload_i == None or not self.payload else [payload_i])
+            kwargs = binder.bind(params)
+
+            # in case the current route is meant to be as handled asynchronously
+            # runs the logic so that the return is immediate and the handling is
+            # deferred to a different thread execution logic
+            is_async = opts_i.get("async", False)
+            if is_async:
+                mid = self.run_async(
+                    method_i,
+                    callback,
+                    mid = mid,
+                    args = args,
+                    kwargs = kwargs
+                )
+                return_v = dict(
+                    result = "async",
+                    mid = mid,
+                    mcount = mcount
+                )
+            # otherwise the request is synchronous and should be handled immediately
+            # in the current workflow logic, thread execution may block for a while
+            else:
+                has_context = hasattr(method_i, "__self__")
+                context = method_i.__self__ if has_context else self
+                self._own = context
+                self.request.context = context
+                self.request.method_i = method_i
+                return_v = method_i(*args, **kwargs)
+
+            # in case the action method is a coroutine (async) the return value is
+            # an awaitable that is going to be awaited by the caller (entry point)
+            if legacy.is_awaitable(return_v): awaitables.append(return_v)
+
+        # in case there are multiple awaitables (multiple messages) they are
+        # "chained" so that they are awaited in sequence (by the caller)
+        if len(awaitables) > 1: return_v = asgi.sequence(awaitables)
+
+        # returns the currently defined return value, for situations where
+        # multiple call have been handled this value may contain only the
+        # result from the last call
+        return return_v
+
     def run_async(self, method, callback, mid = None, args = [], kwargs = {}):
         # generates a new token to be used as the message identifier in case
         # the mid was not passed to the method (generated on client side)
@@ -1279,42 +1536,10 @@ class App(
         mid = mid or util.gen_token()
 
         def async_method(*args, **kwargs):
-            # calls the proper method reference (base object) with the provided
-            # arguments and keyword based arguments, in case an exception occurs
-            # while handling the request the error should be properly serialized
-            # suing the proper error handler method for the exception
-            try: result = method(*args, **kwargs)
-            except BaseException as exception:
-                result = self.handle_error(exception)
-
-            # verifies if a result dictionary has been created and creates a new
-            # one in case it has not, then verifies if the result value is set
-            # in the result if not sets it as success (fallback value)
-            result = result or dict()
-            if not "result" in result: result["result"] = "success"
-
-            try:
-                # in case the callback url is defined sends a post request to
-                # the callback url containing the result as the json based payload
-                # this value should with the result for the operation
-                callback and http.post(callback, data_j = result, params = {
-                    "mid" : mid
-                })
-            except legacy.HTTPError as error:
-                data = error.read()
-                try:
-                    data_s = json.loads(data)
-                    message = data_s.get("message", "")
-                    lines = data_s.get("traceback", [])
-                except:
-                    message = data
-                    lines = []
-
-                # logs the information about the callback call error, this should
-                # include both the main message description but also the complete
-                # set of traceback lines for the handling
-                self.logger.warning("Async callback (remote) error: %s" % message)
-                for line in lines: self.logger.info(line)
+            # runs the method and delivers the result to the callback url
+            # (if defined) as part of the same async execution unit
+            result = self._async_call(method, args, kwargs)
+            self._async_callback(result, callback, mid)
 
         # in case no queueing manager is defined it's not possible to queue
         # the current request and so an error must be raised indicating the
@@ -1322,12 +1547,64 @@ class App(
         if not self.manager:
             raise exceptions.OperationalError(message = "No queue manager defined")
 
+        # in case the manager runs the items remotely (eg: other process) the
+        # original method is sent to the manager together with the callback
+        # url, as the async method is local (closure) and the manager is then
+        # responsible for the delivery of the result to the callback url
+        if self.manager.remote:
+            self.manager.add(method, args, kwargs, mid = mid, callback = callback)
+            return mid
+
         # adds the current async method and request to the queue manager this
         # method will be called latter, notice that the mid is passed to the
         # manager as this is required for a proper insertion of work
         self.manager.add(async_method, args, kwargs, mid = mid, request = self.request)
         return mid
 
+    def _async_call(self, method, args, kwargs):
+        # calls the proper method reference (base object) with the provided
+        # arguments and keyword based arguments, in case an exception occurs
+        # while handling the request the error should be properly serialized
+        # suing the proper error handler method for the exception
+        try:
+            result = method(*args, **kwargs)
+            if legacy.is_awaitable(result): result = asgi.run_sync(result)
+        except BaseException as exception:
+            result = self.handle_error(exception)
+
+        # verifies if a result dictionary has been created and creates a new
+        # one in case it has not, then verifies if the result value is set
+        # in the result if not sets it as success (fallback value)
+        result = result or dict()
+        if not "result" in result: result["result"] = "success"
+        return result
+
+    def _async_callback(self, result, callback, mid):
+        try:
+            # in case the callback url is defined sends a post request to
+            # the callback url containing the result as the json based payload
+            # this value should with the result for the operation
+            callback and http.post(callback, data_j = result, params = {
+                "mid" : mid
+            })
+            return True
+        except legacy.HTTPError as error:
+            data = error.read()
+            try:
+                data_s = codec.loads(data)
+                message = data_s.get("message", "")
+                lines = data_s.get("traceback", [])
+            except:
+                message = data
+                lines = []
+
+            # logs the information about the callback call error, this should
+            # include both the main message description but also the complete
+            # set of traceback lines for the handling
+            self.logger.warning("Async callback (remote) error: %s" % message)
+            for line in lines: self.logger.info(line)
+            return False
+
     def before_request(self):
         # runs the "sslify" operation that ensures that proper ssl
         # is defined for the current request, redirecting the request
@@ -1525,17 +1802,21 @@ class App(
         locale = None,
         **kwargs
     ):
-        _cache = self.jinja.cache
-        extension = self._extension(template)
+        # builds the search path for the template and retrieves the (render)
+        # environment for it, this environment is never changed during the
+        # render so that multiple templates may be rendered concurrently
         search_path = [templates_path]
         for part in self.parts: search_path.append(part.templates_path)
-        self.jinja.autoescape = self._extension_in(extension, ESCAPE_EXTENSIONS)
-        self.jinja.cache = _cache if cache else None
-        self.jinja.loader.searchpath = search_path
-        self.jinja.locale = locale
-        template = self.jinja.get_template(template)
-        self.jinja.cache = _cache
-        return template.render(kwargs)
+        environment = self._jinja_env(search_path, cache = cache)
+        template = environment.get_template(template)
+
+        # sets the locale of the render under the current thread's context
+        # (restoring the previous one at the end, as renders may be nested)
+        # and runs the render of the template with the provided arguments
+        _locale = getattr(self._local, "locale", None)
+        self._local.locale = locale
+        try: return template.render(kwargs)
+        finally: self._local.locale = _locale
 
     def template_args(self, kwargs):
         import appier
@@ -1632,8 +1913,7 @@ class App(
         )
 
     def send_file(self, contents, content_type = None, etag = None):
-        _etag = self.request.get_header("If-None-Match", None)
-        not_modified = etag == _etag and not etag == None
+        not_modified = self._etag_match(etag)
         if content_type: self.content_type(content_type)
         if not_modified: self.request.set_code(304); return ""
         if etag: self.request.set_header("Etag", etag)
@@ -1651,9 +1931,14 @@ class App(
         if os.name == "nt" and not file_path.startswith("\\\\?\\"):
             file_path = "\\\\?\\" + file_path
 
+        # retrieves the (cached) metadata of the resource, this includes the
+        # stat information, the mime type and the etag of it, so that in case
+        # the cache entry is still valid no system call is performed
+        resource = self.stat_cache.get(file_path, url_path)
+
         # verifies if the resource exists and in case it does not raises
         # an exception about the problem (going to be serialized)
-        if not os.path.exists(file_path):
+        if not resource.exists:
             raise exceptions.NotFoundError(
                 message = "Resource '%s' does not exist" % url_path,
                 code = 404
@@ -1661,60 +1946,88 @@ class App(
 
         # checks if the path refers a directory and in case it does raises
         # an exception because no directories are valid for static serving
-        if os.path.isdir(file_path):
+        if resource.is_dir:
             raise exceptions.NotFoundError(
                 message = "Resource '%s' refers a directory" % url_path,
                 code = 404
             )
 
-        # tries to use the current mime sub system to guess the mime type
-        # for the file to be returned in the request and then uses this type
-        # to update the request object content type value, note that in case
-        # there's a compress operation to be used the proper type is resolved
-        type, _encoding = mimetypes.guess_type(
-            url_path, strict = True
-        )
+        # uses the mime type guessed for the file to update the request object
+        # content type value, note that in case there's a compress operation
+        # to be used the proper type is resolved
+        type = resource.type
         if compress:
             has_type = hasattr(self, "type_" + compress)
             type = getattr(self, "type_" + compress)() if has_type else type
         self.request.content_type = type
 
-        # retrieves the last modified timestamp for the file path and
-        # uses it to create the etag for the resource to be served
-        modified = os.path.getmtime(file_path)
-        etag = "appier-%.2f" % modified
-
-        # retrieves the provided etag for verification and checks if the
-        # etag remains the same if that's the case the file has not been
-        # modified and the response should indicate exactly that
-        _etag = self.request.get_header("If-None-Match", None)
-        not_modified = etag == _etag
+        # negotiates the content encoding (gzip or deflate) that is going to
+        # be used for the file, note that no encoding is used for partial
+        # requests or when an explicit compress operation is requested
+        range_s = self.request.get_header("Range", None)
+        encoding = None if compress or range_s else\
+            self.negotiate_encoding(resource.type, resource.size)
+
+        # in case the gzip encoding is to be used tries to find a gzip file
+        # (pre-compressed) side by side with the original file that is up-to-date,
+        # if that's not possible the file is encoded on the fly (and the result
+        # kept in memory) but only if it's not larger than the maximum size,
+        # otherwise the file is sent as is (through the zero copy path)
+        encoded = None
+        if encoding == "gzip":
+            _resource = self.stat_cache.get(file_path + ".gz", url_path + ".gz")
+            is_valid = _resource.exists and not _resource.is_dir
+            if is_valid and _resource.modified >= resource.modified: encoded = _resource
+        if encoding and not encoded and resource.size > self.gzip_max: encoding = None
+
+        # retrieves the etag for the resource to be served (created from
+        # the last modified timestamp of the file), in case the contents are
+        # encoded the name of the encoding is appended to the etag so that
+        # both representations are cached independently by the client
+        etag = self._etag_encoding(resource.etag, encoding)
+
+        # verifies if the etag matches one of the etags provided by the client
+        # if that's the case the file has not been modified and the response
+        # should indicate exactly that
+        not_modified = self._etag_match(etag)
 
         # in case the file has not been modified a not modified response
         # must be returned inside the response to the client
         if not_modified: self.request.set_code(304); yield 0; return
 
-        # tries to use the current mime sub system to guess the mime type
-        # for the file to be returned in the request
-        file_type, _encoding = mimetypes.guess_type(
-            url_path, strict = True
-        )
-
-        # retrieves the value of the range header value and updates the
-        # is partial flag value with the proper boolean value in case the
+        # uses the (previously retrieved) value of the range header to update
+        # the is partial flag value with the proper boolean value in case the
         # header exists or not (as expected by specification)
-        range_s = self.request.get_header("Range", None)
         is_partial = True if range_s else False
 
         # retrieves the size of the resource file in bytes, this value is
         # going to be used in the computation of the range values, note that
         # this retrieval takes into account the compressor to be used
-        if compress: file_size, file = self.compress(file_path, method = compress)
-        else: file_size = os.path.getsize(file_path); file = None
+        if compress:
+            file_size, file = self.compress(
+                file_path,
+                modified = resource.modified,
+                method = compress
+            )
+        else: file_size = resource.size; file = None
+
+        # in case there's a content encoding to be used either the (previously
+        # found) pre-compressed file is used or the file is encoded on the fly
+        modified = resource.modified
+        if encoded:
+            file_path = encoded.file_path
+            file_size = encoded.size
+            modified = encoded.modified
+        elif encoding:
+            file_size, file = self.encode_file(
+                file_path,
+                modified = resource.modified,
+                method = encoding
+            )
 
         # updates the current request in handling so that the proper file
         # content type is set in with (notifies the user agent for display)
-        self.request.content_type = file_type
+        self.request.content_type = resource.type
 
         # convert the current string based representation of the range
         # into a tuple based presentation otherwise creates the default
@@ -1731,26 +2044,19 @@ class App(
         # going to be returned to the client in the current request
         content_range_s = "bytes %d-%d/%d" % (range[0], range[1], file_size)
 
-        # retrieves the current date value and increments the cache overflow value
-        # to it so that the proper expire value is set, then formats the date as
-        # a string based value in order to be set in the headers
-        current = datetime.datetime.utcnow()
-        target = current + self.cache
-        with util.ctx_locale(): target_s = target.strftime("%a, %d %b %Y %H:%M:%S GMT")
-
-        # creates the cache string that will be used to populate the cache control
-        # header in case there's a valid cache value for the current request
-        cache_s = "public, max-age=%d" % self.cache_s
-
         # sets the complete set of headers expected for the current request
         # this is done before the field yielding operation so that the may
-        # be correctly sent as the first part of the message sending
-        self.request.set_header("Etag", etag)
-        if cache: self.request.set_header("Expires", target_s)
-        if cache: self.request.set_header("Cache-Control", cache_s)
-        else: self.request.set_header("Cache-Control", "no-cache, must-revalidate")
+        # be correctly sent as the first part of the message sending, note
+        # that the (pre-built) headers of the resource are used and that the
+        # expires value is formatted once per second (locale independent)
+        for name, value in resource.headers(cache, self.cache_s):
+            self.request.set_header(name, value)
+        if cache: self.request.set_header("Expires", self.stat_cache.expires(self.cache_s))
         if is_partial: self.request.set_header("Content-Range", content_range_s)
         if not is_partial: self.request.set_header("Accept-Ranges", "bytes")
+        if encoding: self.request.set_header("Etag", etag)
+        if encoding: self.request.set_header("Content-Encoding", encoding)
+        if self.is_compressible(resource.type): self.request.set_header("Vary", "Accept-Encoding")
 
         # in case the current request is a partial request the status code
         # must be set to the appropriate one (partial content)
@@ -1761,34 +2067,32 @@ class App(
         # yields this result because its going to be used by the upper layer
         # of the framework to "know" the correct content length to be sent
         data_size = range[1] - range[0] + 1
-        yield data_size
 
-        # opens the file for binary reading this is going to be used for the
-        # complete reading of the contents, suing a generator based approach
-        # this way static file serving may be fast and memory efficient
-        if file == None: file = open(file_path, "rb")
+        # in case the resource is cacheable (and small enough) its contents are
+        # retrieved from the (in memory) file cache, avoiding the reading of the
+        # file from the disk on every request (only for files served as is)
+        is_memory = cache and file == None and self.file_cache.accepts(file_size)
+        data = self.file_cache.get(file_path, modified) if is_memory else None
+
+        # creates the range object for the file (opened only when required) and
+        # registers it as the stream of the request, so that the upper layer is
+        # able to hand it to the server (zero copy) instead of iterating over it
+        stream = static.FileRange(
+            file_path,
+            range[0],
+            data_size,
+            total = file_size,
+            file = file,
+            data = data,
+            buffer_size = BUFFER_SIZE
+        )
+        self.request.stream = stream
+        yield data_size
 
-        try:
-            # seeks the file to the initial target position so that the reading
-            # starts on the requested starting point as expected
-            file.seek(range[0])
-
-            # iterates continuously reading a series of chunks from the
-            # the file until no value is returned (end of file) this chunks
-            # are going to be yield to the parent method to be sent in a
-            # recursive fashion (avoid memory problems)
-            while True:
-                if not data_size: break
-                size = data_size if BUFFER_SIZE > data_size else BUFFER_SIZE
-                data = file.read(size)
-                if not data: break
-                data_l = len(data)
-                data_size -= data_l
-                yield data
-        finally:
-            # in case there's an exception in the middle of the reading the
-            # file must be correctly, in order to avoid extra leak problems
-            file.close()
+        # iterates over the complete set of chunks of the file range, that are
+        # going to be yield to the parent method to be sent in a recursive
+        # fashion (avoid memory problems), the file is closed by the range
+        for data in stream: yield data
 
     def content_type(self, content_type):
         self.request.content_type = str(content_type)
@@ -2000,8 +2304,11 @@ class App(
         self.cache_d[key] = value
 
     def try_cache(self, key, flag, default = None):
-        if not key in self.cache_d: return default
-        _flag, value = self.cache_d[key]
+        # retrieves the entry in a single operation, as the entry may expire
+        # (or be evicted) at any time, and verifies that its flag is valid
+        entry = self.cache_d.get(key, None)
+        if entry == None: return default
+        _flag, value = entry
         if not _flag == flag: return default
         return value
 
@@ -2011,6 +2318,23 @@ class App(
     def flush_cache(self):
         self.cache_d.flush()
 
+    def invalidate_cache(self, *tags):
+        """
+        Invalidates the cached responses of the routes associated with
+        any of the provided tags (strings or model classes).
+
+        The invalidation is performed by changing the version of the tags
+        (stored in the cache), so that it's shared among processes in case
+        a shared cache is being used.
+
+        :type tags: List
+        :param tags: The sequence of tags to be invalidated.
+        """
+
+        for tag in tags:
+            name = tag if type(tag) in legacy.STRINGS else tag.__name__
+            self.cache_d["tag:" + name] = time.time()
+
     def get_uptime(self):
         current_date = datetime.datetime.utcnow()
         delta = current_date - self.start_date
@@ -2057,10 +2381,10 @@ class App(
         return value
 
     def dumps(self, value):
-        return json.dumps(value)
+        return codec.dumps(value)
 
     def loads(self, value):
-        return json.loads(value)
+        return codec.loads(value)
 
     def typeof(self, value):
         return type(value)
@@ -2138,7 +2462,7 @@ class App(
         return value
 
     def to_locale_jinja(self, eval_ctx, value):
-        locale = eval_ctx.environment.locale
+        locale = getattr(self._local, "locale", None)
         return self.to_locale(value, locale)
 
     def nl_to_br_jinja(self, eval_ctx, value):
@@ -2266,6 +2590,12 @@ class App(
             status = self.status,
             uptime = self.get_uptime_s(),
             routes = len(self._routes()),
+            manager = self.manager.info() if self.manager else None,
+            cache = self.cache_d.info() if hasattr(self.cache_d, "info") else None,
+            static = dict(
+                stat = self.stat_cache.info(),
+                files = self.file_cache.info()
+            ),
             configs = len(config.CONFIGS),
             libraries = self.get_libraries(map = True),
             platform = PLATFORM,
@@ -2496,6 +2826,25 @@ class App(
             if not handler: continue
             self.logger.addHandler(handler)
 
+    def _load_cache(self):
+        # tries to retrieve the value of the cache configuration and in case
+        # it's defined uses it to resolve the class of the cache from the cache
+        # module (as done for the session), ignoring it in case it's not found
+        cache_s = config.conf("CACHE", None)
+        if cache_s: cache_s = cache_s.capitalize() + "Cache"
+        if cache_s and hasattr(cache, cache_s): self.cache_c = getattr(cache, cache_s)
+
+        # creates the (global) cache of the application using the resolved
+        # class, this is the cache used for the compression results
+        self.cache_d = self.cache_c()
+
+    def _unload_cache(self):
+        # unbinds the invalidation handlers of the cached routes from the
+        # events of the models, so that no reference to the app is kept
+        for model, handler in legacy.iteritems(self._cache_models):
+            for event in CACHE_EVENTS: model.unbind_g(event, handler)
+        self._cache_models.clear()
+
     def _load_session(self):
         # tries to retrieve the value of the session configuration and in
         # case it's not defined returns to the caller immediately
@@ -2534,7 +2883,42 @@ class App(
         # in case the class is not found returns immediately
         manager_s = manager_s.capitalize() + "Manager"
         if not hasattr(async, manager_s): return
-        self.manager = getattr(async, manager_s)()
+        self.manager = getattr(async, manager_s)(self)
+
+    def _load_static(self):
+        # retrieves the interval (in seconds) for the revalidation of the
+        # metadata of the static resources and creates the cache with it
+        interval = config.conf("STATIC_INTERVAL", static.STAT_INTERVAL, cast = float)
+        self.stat_cache = static.StatCache(interval = interval)
+
+        # re-loads the settings of the encoding (compression) of the responses
+        # as the configuration files are only loaded after the mixin creation
+        self._load_encoding()
+
+        # retrieves the limits of the (in memory) cache of the contents of the
+        # static files, the total size of it defaults to zero (disabled)
+        size = config.conf("STATIC_CACHE_SIZE", 0, cast = int)
+        limit = config.conf("STATIC_CACHE_FILE", static.FILE_LIMIT, cast = int)
+        self.file_cache = static.FileCache(size = size, limit = limit)
+
+    def _load_etag(self):
+        # retrieves the configuration of the automatic etag generation for
+        # the dynamic responses (disabled by default) and the maximum size
+        # of the responses to be hashed (zero means no limit)
+        self.etag = config.conf("ETAG", self.etag, cast = bool)
+        self.etag_max = config.conf("ETAG_MAX", self.etag_max, cast = int)
+
+    def _load_json(self):
+        # retrieves the minimum number of items of a map or list result for
+        # it to be serialized incrementally (zero disables the streaming)
+        self.json_stream = config.conf("JSON_STREAM", self.json_stream, cast = int)
+
+    def _load_body(self):
+        # retrieves the maximum size of the body of the requests (zero means
+        # no limit) and the size above which the files of the multipart uploads
+        # are spooled into temporary files, instead of being kept in memory
+        self.body_max = config.conf("BODY_MAX", self.body_max, cast = int)
+        self.multipart_spool = config.conf("MULTIPART_SPOOL", self.multipart_spool, cast = int)
 
     def _load_request(self):
         # creates a new mock request and sets it under the currently running
@@ -2592,7 +2976,7 @@ class App(
             try: data = file.read(); data = data.decode("utf-8")
             except: continue
             finally: file.close()
-            try: data_j = json.loads(data)
+            try: data_j = codec.loads(data)
             except: continue
 
             # unpacks the current path in iteration into the base name,
@@ -2916,27 +3300,6 @@ class App(
         if self.locales: return self.locales[0]
         return fallback
 
-    def _set_locale(self):
-        # normalizes the current locale string by converting the
-        # last part of the locale string to an uppercase representation
-        # and then re-joining the various components of it
-        values = self.request.locale.split("_", 1)
-        if len(values) > 1: values[1] = values[1].upper()
-        locale_n = "_".join(values)
-        locale_n = str(locale_n)
-
-        # in case the current operative system is windows based an
-        # extra locale conversion operation must be performed, after
-        # than the proper setting of the os locale is done with the
-        # fallback for exception being silent (non critical)
-        if os.name == "nt": locale_n = defines.WINDOWS_LOCALE.get(locale_n, "")
-        else: locale_n += ".utf8"
-        try: locale.setlocale(locale.LC_ALL, locale_n)
-        except: pass
-
-    def _reset_locale(self):
-        locale.setlocale(locale.LC_ALL, "")
-
     def _sslify(self):
         """
         Runs the sslify process on the current request, meaning that if the
@@ -2989,10 +3352,22 @@ class App(
         if is_async: self.request.code = 280
 
     def _routes(self):
+        # in case the routes are already loaded returns them immediately
+        # otherwise acquires the lock and loads them, note that the routes
+        # value is only set after the router is built so that concurrent
+        # requests never use a partially loaded set of routes
         if self.routes_v: return self.routes_v
-        self._proutes()
-        self._pcore()
-        self.routes_v = self.all_routes()
+        self._routes_lock.acquire()
+        try:
+            if self.routes_v: return self.routes_v
+            self._proutes()
+            self._pcore()
+            routes_v = self.all_routes()
+            self.router = router.Router(routes_v)
+            self._bind_cache(routes_v)
+            self.routes_v = routes_v
+        finally:
+            self._routes_lock.release()
         return self.routes_v
 
     def _proutes(self):
@@ -3022,6 +3397,7 @@ class App(
 
             opts = route[3] if len(route) > 3 else {}
             opts["name"] = name
+            opts["binder"] = self._binder(route, name = name)
 
         self._no_duplicates(App._BASE_ROUTES)
 
@@ -3072,6 +3448,223 @@ class App(
 
             opts = route[3] if len(route) > 3 else {}
             opts["name"] = name
+            opts["binder"] = self._binder(route, name = name)
+
+    def _bind_cache(self, routes):
+        # iterates over the complete set of routes to bind the events of the
+        # models used as tags of cached routes to the invalidation of such tags
+        # (only once per model), so that any change invalidates the responses
+        for route in routes:
+            opts = route[3] if len(route) > 3 else {}
+            cache_o = opts.get("cache", None)
+            if not cache_o: continue
+            for model in cache_o["models"]:
+                if model in self._cache_models: continue
+                handler = self._cache_handler(model.__name__)
+                for event in CACHE_EVENTS: model.bind_g(event, handler)
+                self._cache_models[model] = handler
+
+    def _cache_handler(self, name):
+        def handler(*args, **kwargs): self.invalidate_cache(name)
+        return handler
+
+    def _cache_route(self, cache_o):
+        # builds the key of the cached response from the path and query of
+        # the request and the values of the request the response varies on
+        vary = [self._cache_vary(name) for name in cache_o["vary"]]
+        key = "route:%s?%s" % (self.request.path, self.request.query)
+        if vary: key += "|" + "|".join(legacy.UNICODE(value) for value in vary)
+
+        # retrieves the cached entry and verifies that it's still valid, both
+        # in terms of expiration and of the versions of its tags, in case it's
+        # not the key and versions are stored so that the response is cached
+        # (the versions are the ones from before the action is run)
+        entry = self.cache_d.get(key, None)
+        versions = tuple(self._cache_version(tag) for tag in cache_o["tags"])
+        is_valid = entry and entry[0] >= time.time() and entry[5] == versions
+        if entry and not is_valid: self._cache_remove(key)
+        if not is_valid:
+            self.request.cache_key = key
+            self.request.cache_route = (cache_o, versions)
+            return None
+
+        # restores the content type and headers of the cached response and in
+        # case the etag of it (for the encoding to be used) matches the one of
+        # the client returns a not modified response, otherwise returns the
+        # (serialized) contents, to be encoded as for a non cached response
+        _expires, etag, content_type, headers, data, _versions = entry
+        encoding = self.negotiate_encoding(content_type, len(data))
+        etag = self._etag_encoding(etag, encoding)
+        self.request.content_type = content_type
+        for name, value in headers: self.request.set_header(name, value)
+        self.request.set_header("Etag", etag)
+        if self._etag_match(etag): self.request.set_code(304); return b""
+        return data
+
+    def _cache_store(self, data, content_type, encoding = None):
+        # computes the (strong) etag of the response from its contents and
+        # stores the response in the cache, together with its content type
+        # and headers (cookies excluded) and the versions of its tags
+        cache_o, versions = self.request.cache_route
+        etag = "\"%s\"" % hashlib.md5(data).hexdigest()
+        headers = [(name, value) for name, value in legacy.iteritems(self.request.out_headers)\
+            if not name in ("Set-Cookie", "Etag")]
+        expires = time.time() + cache_o["ttl"]
+        self.cache_d.set(
+            self.request.cache_key,
+            (expires, etag, content_type, headers, data, versions),
+            ttl = cache_o["ttl"]
+        )
+
+        # sets the etag of the response (for the encoding to be used) and in
+        # case it matches one of the client turns the response into a not
+        # modified one (empty contents)
+        etag = self._etag_encoding(etag, encoding)
+        self.request.set_header("Etag", etag)
+        if not self._etag_match(etag): return data
+        self.request.set_code(304)
+        return b""
+
+    def _cache_version(self, tag):
+        # retrieves the version of the tag, in case it's not set (never
+        # invalidated or evicted from the cache) a new version is created
+        # so that no entry cached with a previous version is considered valid
+        key = "tag:" + tag
+        version = self.cache_d.get(key, None)
+        if version: return version
+        version = time.time()
+        self.cache_d[key] = version
+        return version
+
+    def _cache_remove(self, key):
+        try: del self.cache_d[key]
+        except KeyError: pass
+
+    def _check_body(self):
+        # in case the body of the request is larger than the maximum allowed
+        # size unsets the input stream of it, so that it's never parsed (eg:
+        # on error handling) and then raises the proper exception
+        if not self.body_max: return
+        if self.request.length <= self.body_max: return
+        self.request.set_input(None, length = self.request.length)
+        raise exceptions.OperationalError(
+            message = "Request body too large",
+            code = 413
+        )
+
+    def _json_prime(self, result):
+        # in case the result is not a (not yet encoded) json stream there's
+        # nothing to be done, otherwise encodes its first chunk in the context
+        # of the request, which runs the initial part of the lazy iterable
+        if not type(result) == util.JSONStream or result.encoded: return result
+        encoding = self.request.get_encoding()
+        chunks = self._json_chunks(result, encoding)
+        first = next(chunks, None)
+        chunks = self._json_bound(chunks, first, self.request, self._own)
+        return util.JSONStream(chunks, encoded = True)
+
+    def _json_bound(self, chunks, first, request, own):
+        # yields the already encoded first chunk and then the remaining ones,
+        # binding the request (and the context) while each of them is encoded,
+        # as the iteration occurs after the handling of the request, and then
+        # restoring the previous (thread local) state of the application
+        local = self._local.__dict__
+        try:
+            if not first == None: yield first
+            while True:
+                saved = dict(local)
+                self._request = request
+                self._own = own
+                try: chunk = next(chunks)
+                except StopIteration: return
+                finally: local.clear(); local.update(saved)
+                yield chunk
+        finally:
+            chunks.close()
+
+    def _json_chunks(self, result, encoding):
+        # incrementally encodes the result using the json encoder with the
+        # configured codec (so that the streamed value is the same as the
+        # buffered one), converting each of the (unicode) chunks into the
+        # encoding of the request
+        encoder = util.JSONEncoder()
+        for chunk in encoder.iterencode_l(result, codec = codec.get_codec()):
+            yield chunk.encode(encoding) if legacy.is_unicode(chunk) else chunk
+
+    def _etag_result(self, data, encoding = None):
+        # verifies that the size of the data is within the limit for hashing
+        # and if that's the case computes the etag using a fast (non crypto)
+        # checksum of the contents together with their size, suffixed by
+        # the encoding so that each representation has its own etag
+        if self.etag_max and len(data) > self.etag_max: return data
+        etag = "\"%08x-%x\"" % (zlib.crc32(data) & 0xffffffff, len(data))
+        etag = self._etag_encoding(etag, encoding)
+
+        # sets the etag in the response and verifies if it matches one of
+        # the ones provided by the client, in which case the contents are dropped
+        self.request.set_header("Etag", etag)
+        if not self._etag_match(etag): return data
+        self.request.set_code(304)
+        return b""
+
+    def _etag_encoding(self, etag, encoding):
+        # adds the name of the content encoding to the (possibly quoted) etag
+        # so that the encoded and the identity representations are distinct
+        if not encoding: return etag
+        if etag.endswith("\""): return "%s-%s\"" % (etag[:-1], encoding)
+        return "%s-%s" % (etag, encoding)
+
+    def _etag_match(self, etag):
+        # verifies if the provided etag matches any of the etags of the if
+        # none match header of the client, the header may contain a list of
+        # (weak or strong) etags or the wildcard and the weak comparison is
+        # used as defined by the specification for this header
+        value = self.request.get_header("If-None-Match", None)
+        if not value or not etag: return False
+        if value.strip() == "*": return True
+        etag = self._etag_opaque(etag)
+        for _etag in value.split(","):
+            if self._etag_opaque(_etag) == etag: return True
+        return False
+
+    def _etag_opaque(self, etag):
+        etag = etag.strip()
+        if etag.startswith("W/"): etag = etag[2:]
+        return etag.strip("\"")
+
+    def _cache_vary(self, name):
+        if name == "locale": return self.request.locale
+        if name == "user": return self.request.session.get("username", None)
+        return self.request.get_header(name, None)
+
+    def _binder(self, route, name = None):
+        # creates the binder object for the action method of the route
+        # so that the introspection of its signature (and validation) is
+        # only performed once, instead of once per request
+        method = route[2]
+        opts = route[3] if len(route) > 3 else {}
+        param_t = opts.get("param_t", [])
+        return router.Binder(method, param_t = param_t, name = name)
+
+    def _jinja_env(self, search_path, cache = True):
+        # tries to retrieve the (overlay) environment for the provided search
+        # path and cache mode, in case it does not exists creates a new one
+        # from the base environment, with its own loader, note that there's
+        # a benign race condition in the creation (double creation)
+        key = (tuple(search_path), cache)
+        environment = self._jinja_envs.get(key, None)
+        if environment: return environment
+        import jinja2
+        loader = jinja2.FileSystemLoader(search_path)
+        if cache: environment = self.jinja.overlay(loader = loader)
+        else: environment = self.jinja.overlay(loader = loader, cache_size = 0)
+        self._jinja_envs[key] = environment
+        return environment
+
+    def _autoescape_jinja(self, name):
+        if not name: return False
+        extension = self._extension(name)
+        return self._extension_in(extension, ESCAPE_EXTENSIONS)
 
     def _resolve(self, function, context_s = None):
         function_name = function.__name__
@@ -3349,6 +3942,7 @@ class App(
             line for line in lines]
 
     def _sid(self):
+        if not self.request.is_loaded("session"): return None
         session = self.request.session
         sid = session and session.sid
         return sid
@@ -3414,7 +4008,8 @@ class WebApp(App):
             exception.headers or None
         errors = hasattr(exception, "errors") and\
             exception.errors or None
-        session = self.request.session
+        session = self.request.session if\
+            self.request.is_loaded("session") else None
         sid = session and session.sid
         scope = self.request.context.__class__
 
@@ -37,6 +37,40 @@ __copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
 __license__ = "Apache License, Version 2.0"
 """ The license for the module """
 
+import os
+import sys
+import mmap
+import time
+import struct
+import hashlib
+import threading
+import collections
+
+from . import config
+from . import legacy
+from . import redisdb
+from . import exceptions
+
+try: import fcntl
+except ImportError: fcntl = None
+
+POLICIES = ("lru", "lfu")
+""" The eviction policies supported by the bounded cache, the least
+recently used and the least frequently used """
+
+SHARED_MAGIC = b"APSC"
+""" The magic string that identifies the files used as the storage
+of the shared cache, used to validate existing files """
+
+SHARED_HEADER = struct.Struct(">4sIII")
+""" The structure of the header of the shared cache file, containing
+the magic string, the number of slots, their size and the ways """
+
+SLOT_HEADER = struct.Struct(">QddHI")
+""" The structure of the header of each slot of the shared cache, with
+the hash of the key, the last access and expiration timestamps and
+the lengths of both the key and the (serialized) value """
+
 class Cache(object):
 
     def __init__(self, name = "cache"):
@@ -68,6 +102,13 @@ class Cache(object):
     def new(cls, *args, **kwargs):
         return cls(*args, **kwargs)
 
+    def get(self, key, default = None):
+        try: return self[key]
+        except KeyError: return default
+
+    def set(self, key, value, ttl = None):
+        self[key] = value
+
     def flush(self):
         self.mark(dirty = False)
 
@@ -94,3 +135,521 @@ class MemoryCache(Cache):
 
     def __contains__(self, item):
         return self.data.__contains__(item)
+
+class BoundedCache(Cache):
+    """
+    Thread safe in memory cache bounded both by the number of entries
+    and by the (estimated) number of bytes of the values, evicting the
+    entries using either a least recently used or a least frequently
+    used policy, with all the operations running in (amortized) constant
+    time.
+
+    The entries may have a time to live after which they are considered
+    expired (lazily removed), note that unlike the other caches the flush
+    operation completely clears the cache.
+    """
+
+    def __init__(
+        self,
+        name = "cache",
+        size = None,
+        bytes = None,
+        policy = None,
+        ttl = None,
+        *args,
+        **kwargs
+    ):
+        Cache.__init__(self, name = name, *args, **kwargs)
+        if size == None: size = config.conf("CACHE_SIZE", 1000, cast = int)
+        if bytes == None: bytes = config.conf("CACHE_BYTES", 0, cast = int)
+        if policy == None: policy = config.conf("CACHE_POLICY", "lru")
+        if ttl == None: ttl = config.conf("CACHE_TTL", 0, cast = float)
+        self.size = size
+        self.bytes = bytes
+        self.policy = policy.lower()
+        self.ttl = ttl
+        self.used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.minimum = 0
+        self.entries = dict()
+        self.buckets = dict()
+        self.lock = threading.RLock()
+        if not self.policy in POLICIES: raise exceptions.OperationalError(
+            message = "Invalid cache policy '%s'" % policy
+        )
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __getitem__(self, key):
+        self.lock.acquire()
+        try:
+            entry = self._entry(key)
+            if not entry: self.misses += 1; raise KeyError(key)
+            self.hits += 1
+            self._touch(key, entry)
+            return entry[0]
+        finally:
+            self.lock.release()
+
+    def __setitem__(self, key, value):
+        self.set(key, value)
+
+    def __delitem__(self, key):
+        self.lock.acquire()
+        try:
+            if not key in self.entries: raise KeyError(key)
+            self._remove(key)
+            self.mark()
+        finally:
+            self.lock.release()
+
+    def __contains__(self, item):
+        self.lock.acquire()
+        try: return True if self._entry(item) else False
+        finally: self.lock.release()
+
+    def get(self, key, default = None):
+        try: return self[key]
+        except KeyError: return default
+
+    def set(self, key, value, ttl = None):
+        """
+        Sets the value for the provided key in the cache, evicting the
+        required entries so that the limits of the cache are respected.
+
+        :type key: Object
+        :param key: The (hashable) key of the entry to be set.
+        :type value: Object
+        :param value: The value to be associated with the key.
+        :type ttl: float
+        :param ttl: The number of seconds for which the entry is valid,
+        in case it's not provided the default one of the cache is used.
+        """
+
+        ttl = self.ttl if ttl == None else ttl
+        expires = time.time() + ttl if ttl else None
+        size = self._size(value) if self.bytes else 0
+
+        self.lock.acquire()
+        try:
+            if key in self.entries: self._remove(key)
+            if self.bytes and size > self.bytes: return
+            while self.entries and self._full(size): self._evict()
+            self.entries[key] = [value, size, expires, 0]
+            self.used += size
+            self._bucket(0)[key] = True
+            self.minimum = 0
+            self.mark()
+        finally:
+            self.lock.release()
+
+    def flush(self):
+        self.clear()
+        Cache.flush(self)
+
+    def clear(self):
+        self.lock.acquire()
+        try:
+            self.entries.clear()
+            self.buckets.clear()
+            self.minimum = 0
+            self.used = 0
+        finally:
+            self.lock.release()
+
+    def info(self):
+        return dict(
+            entries = len(self.entries),
+            used = self.used,
+            size = self.size,
+            bytes = self.bytes,
+            policy = self.policy,
+            hits = self.hits,
+            misses = self.misses,
+            evictions = self.evictions,
+            expirations = self.expirations
+        )
+
+    def _entry(self, key):
+        entry = self.entries.get(key, None)
+        if not entry: return None
+        expires = entry[2]
+        if expires == None or expires > time.time(): return entry
+        self._remove(key)
+        self.expirations += 1
+        return None
+
+    def _touch(self, key, entry):
+        # in the least recently used policy all the entries live in a single
+        # bucket, so that touching means moving the key to its end, for the
+        # frequency based one the key is promoted to the next frequency bucket
+        count = entry[3]
+        bucket = self.buckets[count]
+        del bucket[key]
+        if self.policy == "lru": bucket[key] = True; return
+        if not bucket:
+            del self.buckets[count]
+            if self.minimum == count: self.minimum = count + 1
+        entry[3] = count + 1
+        self._bucket(count + 1)[key] = True
+
+    def _remove(self, key):
+        entry = self.entries.pop(key)
+        count = entry[3]
+        bucket = self.buckets[count]
+        del bucket[key]
+        if not bucket: del self.buckets[count]
+        self.used -= entry[1]
+
+    def _full(self, size):
+        if self.size and len(self.entries) >= self.size: return True
+        if self.bytes and self.used + size > self.bytes: return True
+        return False
+
+    def _evict(self):
+        # in case the bucket of the minimum frequency is no longer available
+        # (removal of entries) the minimum is re-computed from the buckets,
+        # then the oldest entry of that bucket is the one to be evicted
+        if not self.minimum in self.buckets: self.minimum = min(self.buckets)
+        bucket = self.buckets[self.minimum]
+        key = next(iter(bucket))
+        self._remove(key)
+        self.evictions += 1
+
+    def _bucket(self, count):
+        bucket = self.buckets.get(count, None)
+        if bucket == None: bucket = self.buckets[count] = collections.OrderedDict()
+        return bucket
+
+    def _size(self, value):
+        if isinstance(value, legacy.BYTES): return len(value)
+        if isinstance(value, legacy.UNICODE): return len(value) * 2
+        if isinstance(value, (list, tuple)):
+            return sum(self._size(item) for item in value)
+        return sys.getsizeof(value)
+
+class SharedCache(Cache):
+    """
+    Cache shared by the multiple processes (workers) running on the
+    same host, stored in a memory mapped file divided into fixed size
+    slots that are grouped in sets indexed by the hash of the key (set
+    associative) with least recently used eviction inside each set.
+
+    The values are serialized (pickled) and the ones that do not fit
+    in a slot are not cached at all, the access to the file is serialized
+    among processes using a file lock (where available).
+    """
+
+    def __init__(
+        self,
+        name = "cache",
+        file_path = None,
+        slots = None,
+        slot_size = None,
+        ways = None,
+        ttl = None,
+        *args,
+        **kwargs
+    ):
+        Cache.__init__(self, name = name, *args, **kwargs)
+        base_path = config.conf("APPIER_BASE_PATH", "")
+        default_path = os.path.join(base_path, "cache.shared")
+        self.file_path = file_path or config.conf("CACHE_PATH", default_path)
+        self.slots = slots or config.conf("CACHE_SLOTS", 1024, cast = int)
+        self.slot_size = slot_size or config.conf("CACHE_SLOT_SIZE", 65536, cast = int)
+        self.ways = ways or config.conf("CACHE_WAYS", 8, cast = int)
+        if ttl == None: ttl = config.conf("CACHE_TTL", 0, cast = float)
+        self.ttl = ttl
+        self.ways = min(self.ways, self.slots)
+        self.sets = self.slots // self.ways
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.fileno = None
+        self.mapping = None
+        self.pid = None
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        self._acquire()
+        try:
+            count = 0
+            for slot in range(self.sets * self.ways):
+                if self._header(self._offset(slot))[0]: count += 1
+            return count
+        finally:
+            self._release()
+
+    def __getitem__(self, key):
+        key_b, hash = self._hash(key)
+        self._acquire()
+        try:
+            offset = self._find(key_b, hash)
+            if offset == None: self.misses += 1; raise KeyError(key)
+            _hash, _access, expires, key_l, value_l = self._header(offset)
+            self._write(offset, (hash, time.time(), expires, key_l, value_l))
+            start = offset + SLOT_HEADER.size + key_l
+            data = self.mapping[start:start + value_l]
+            self.hits += 1
+        finally:
+            self._release()
+        return legacy.cPickle.loads(data)
+
+    def __setitem__(self, key, value):
+        self.set(key, value)
+
+    def __delitem__(self, key):
+        key_b, hash = self._hash(key)
+        self._acquire()
+        try:
+            offset = self._find(key_b, hash)
+            if offset == None: raise KeyError(key)
+            self._write(offset, (0, 0.0, 0.0, 0, 0))
+            self.mark()
+        finally:
+            self._release()
+
+    def __contains__(self, item):
+        key_b, hash = self._hash(item)
+        self._acquire()
+        try: return not self._find(key_b, hash) == None
+        finally: self._release()
+
+    def get(self, key, default = None):
+        try: return self[key]
+        except KeyError: return default
+
+    def set(self, key, value, ttl = None):
+        """
+        Sets the value for the provided key in the shared cache, replacing
+        the least recently used entry of the set in case it's full.
+
+        Values that (once serialized) do not fit in a slot are not stored
+        and any previous value for the key is removed.
+
+        :type key: String
+        :param key: The key of the entry to be set.
+        :type value: Object
+        :param value: The (picklable) value to be associated with the key.
+        :type ttl: float
+        :param ttl: The number of seconds for which the entry is valid,
+        in case it's not provided the default one of the cache is used.
+        """
+
+        ttl = self.ttl if ttl == None else ttl
+        expires = time.time() + ttl if ttl else 0.0
+        key_b, hash = self._hash(key)
+        data = legacy.cPickle.dumps(value, 2)
+        fits = SLOT_HEADER.size + len(key_b) + len(data) <= self.slot_size
+
+        self._acquire()
+        try:
+            offset = self._find(key_b, hash)
+            if not fits:
+                if not offset == None: self._write(offset, (0, 0.0, 0.0, 0, 0))
+                return
+            if offset == None: offset = self._victim(hash)
+            start = offset + SLOT_HEADER.size
+            self.mapping[start:start + len(key_b)] = key_b
+            self.mapping[start + len(key_b):start + len(key_b) + len(data)] = data
+            self._write(offset, (hash, time.time(), expires, len(key_b), len(data)))
+            self.mark()
+        finally:
+            self._release()
+
+    def clear(self):
+        self._acquire()
+        try:
+            for slot in range(self.sets * self.ways):
+                self._write(self._offset(slot), (0, 0.0, 0.0, 0, 0))
+        finally:
+            self._release()
+
+    def close(self):
+        self.lock.acquire()
+        try:
+            if self.mapping: self.mapping.close()
+            if not self.fileno == None: os.close(self.fileno)
+            self.mapping = None
+            self.fileno = None
+            self.pid = None
+        finally:
+            self.lock.release()
+
+    def info(self):
+        return dict(
+            file_path = self.file_path,
+            slots = self.slots,
+            slot_size = self.slot_size,
+            hits = self.hits,
+            misses = self.misses,
+            evictions = self.evictions,
+            expirations = self.expirations
+        )
+
+    def _open(self):
+        # opens (creating if required) the file that stores the cache and
+        # validates its header against the current geometry, re-initializing
+        # it in case it does not match (eg: changed configuration)
+        size = SHARED_HEADER.size + self.slots * self.slot_size
+        header = SHARED_HEADER.pack(SHARED_MAGIC, self.slots, self.slot_size, self.ways)
+        self.fileno = os.open(self.file_path, os.O_RDWR | os.O_CREAT, 0o600)
+        self.pid = os.getpid()
+        self._lock_file()
+        try:
+            current = os.read(self.fileno, SHARED_HEADER.size)
+            if not current == header or not os.fstat(self.fileno).st_size == size:
+                os.ftruncate(self.fileno, 0)
+                os.ftruncate(self.fileno, size)
+                os.lseek(self.fileno, 0, os.SEEK_SET)
+                os.write(self.fileno, header)
+            self.mapping = mmap.mmap(self.fileno, size)
+        finally:
+            self._unlock_file()
+
+    def _acquire(self):
+        # acquires the (local) lock and then, in case the current process is
+        # not the one that opened the file (forked worker) the file is opened
+        # again, so that the file lock is not shared among processes
+        self.lock.acquire()
+        try:
+            if not self.pid == os.getpid():
+                if self.mapping: self.mapping.close()
+                if not self.fileno == None: os.close(self.fileno)
+                self._open()
+            self._lock_file()
+        except:
+            self.lock.release()
+            raise
+
+    def _release(self):
+        try: self._unlock_file()
+        finally: self.lock.release()
+
+    def _lock_file(self):
+        if not fcntl: return
+        fcntl.flock(self.fileno, fcntl.LOCK_EX)
+
+    def _unlock_file(self):
+        if not fcntl: return
+        fcntl.flock(self.fileno, fcntl.LOCK_UN)
+
+    def _hash(self, key):
+        if isinstance(key, legacy.UNICODE): key_b = key.encode("utf-8")
+        elif isinstance(key, legacy.BYTES): key_b = key
+        else: key_b = legacy.bytes(str(key))
+        digest = hashlib.md5(key_b).digest()
+        hash = struct.unpack(">Q", digest[:8])[0] | 1
+        return key_b, hash
+
+    def _offset(self, slot):
+        return SHARED_HEADER.size + slot * self.slot_size
+
+    def _header(self, offset):
+        return SLOT_HEADER.unpack_from(self.mapping, offset)
+
+    def _write(self, offset, header):
+        SLOT_HEADER.pack_into(self.mapping, offset, *header)
+
+    def _find(self, key_b, hash):
+        # iterates over the slots of the set associated with the hash to
+        # try to find the one that contains the key, removing it in case
+        # it's found but expired (lazy expiration)
+        base = (hash % self.sets) * self.ways
+        for slot in range(base, base + self.ways):
+            offset = self._offset(slot)
+            _hash, _access, expires, key_l, _value_l = self._header(offset)
+            if not _hash == hash: continue
+            start = offset + SLOT_HEADER.size
+            if not self.mapping[start:start + key_l] == key_b: continue
+            if expires and expires <= time.time():
+                self._write(offset, (0, 0.0, 0.0, 0, 0))
+                self.expirations += 1
+                return None
+            return offset
+        return None
+
+    def _victim(self, hash):
+        # selects the slot of the set to be used for a new entry, an empty
+        # one if available or otherwise the least recently accessed one
+        base = (hash % self.sets) * self.ways
+        victim = None
+        victim_access = None
+        for slot in range(base, base + self.ways):
+            offset = self._offset(slot)
+            _hash, access, _expires, _key_l, _value_l = self._header(offset)
+            if not _hash: return offset
+            if victim == None or access < victim_access:
+                victim = offset
+                victim_access = access
+        self.evictions += 1
+        return victim
+
+class RedisCache(Cache):
+    """
+    Cache backed by a redis server (shared by every process connected
+    to it), the values are pickled and stored under prefixed keys, so
+    that multiple caches may co-exist in the same database.
+    """
+
+    def __init__(
+        self,
+        name = "cache",
+        prefix = None,
+        ttl = None,
+        redis = None,
+        *args,
+        **kwargs
+    ):
+        Cache.__init__(self, name = name, *args, **kwargs)
+        self.prefix = prefix or config.conf("CACHE_PREFIX", "appier:cache:")
+        if ttl == None: ttl = config.conf("CACHE_TTL", 0, cast = float)
+        self.ttl = ttl
+        self.redis = redis
+
+    def __len__(self):
+        return len(list(self._keys()))
+
+    def __getitem__(self, key):
+        data = self._redis().get(self.prefix + key)
+        if data == None: raise KeyError(key)
+        return legacy.cPickle.loads(data)
+
+    def __setitem__(self, key, value):
+        self.set(key, value)
+
+    def __delitem__(self, key):
+        result = self._redis().delete(self.prefix + key)
+        if not result: raise KeyError(key)
+        self.mark()
+
+    def __contains__(self, item):
+        return True if self._redis().exists(self.prefix + item) else False
+
+    def get(self, key, default = None):
+        try: return self[key]
+        except KeyError: return default
+
+    def set(self, key, value, ttl = None):
+        ttl = self.ttl if ttl == None else ttl
+        data = legacy.cPickle.dumps(value, 2)
+        ex = max(int(ttl), 1) if ttl else None
+        self._redis().set(self.prefix + key, data, ex = ex)
+        self.mark()
+
+    def clear(self):
+        keys = list(self._keys())
+        if keys: self._redis().delete(*keys)
+
+    def _keys(self):
+        return self._redis().scan_iter(match = self.prefix + "*")
+
+    def _redis(self):
+        if self.redis: return self.redis
+        self.redis = redisdb.get_connection()
+        return self.redis
@@ -0,0 +1,191 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Hive Appier Framework
+# Copyright (c) 2008-2016 Hive Solutions Lda.
+#
+# This file is part of Hive Appier Framework.
+#
+# Hive Appier Framework is free software: you can redistribute it and/or modify
+# it under the terms of the Apache License as published by the Apache
+# Foundation, either version 2.0 of the License, or (at your option) any
+# later version.
+#
+# Hive Appier Framework is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# Apache License for more details.
+#
+# You should have received a copy of the Apache License along with
+# Hive Appier Framework. If not, see <http://www.apache.org/licenses/>.
+
+__author__ = "João Magalhães <joamag@hive.pt>"
+""" The author(s) of the module """
+
+__version__ = "1.0.0"
+""" The version of the module """
+
+__revision__ = "$LastChangedRevision$"
+""" The revision number of the module """
+
+__date__ = "$LastChangedDate$"
+""" The last change date of the module """
+
+__copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
+""" The copyright for the module """
+
+__license__ = "Apache License, Version 2.0"
+""" The license for the module """
+import json
+
+from . import config
+from . import legacy
+from . import exceptions
+
+try: import bson
+except ImportError: bson = None
+
+try: import orjson
+except ImportError: orjson = None
+
+CODEC = "json"
+""" The name of the default JSON codec (backend) to be used, the
+standard library one is used by default for compatibility """
+
+class JSONCodec(object):
+    """
+    JSON codec based on the json module of the standard library,
+    used as the default backend and as fallback for the operations
+    that are not supported by the other (accelerated) backends.
+    """
+
+    name = "json"
+    """ The name of the codec, as used in the configuration """
+
+    separators = (", ", ": ")
+    """ The item and key separators used in the encoded values,
+    required for the (incremental) encoding of streamed values """
+
+    def __init__(self, permissive = True):
+        self.permissive = permissive
+        self.encoder = json.JSONEncoder(default = self.default)
+
+    def dumps(self, value, default = None, **kwargs):
+        """
+        Encodes the provided value as a JSON string, the values that
+        are not natively supported (eg: models, types and object ids)
+        are converted using the default method of the codec.
+
+        :type value: Object
+        :param value: The value to be encoded.
+        :type default: Function
+        :param default: Custom function used to convert the values that
+        are not serializable, overriding the default one of the codec.
+        :rtype: String
+        :return: The (unicode) JSON string for the value.
+        """
+
+        if not default and not kwargs: return self.encoder.encode(value)
+        return json.dumps(value, default = default or self.default, **kwargs)
+
+    def loads(self, data, **kwargs):
+        if legacy.PYTHON_3 and legacy.is_bytes(data): data = data.decode("utf-8")
+        return json.loads(data, **kwargs)
+
+    def default(self, obj):
+        if hasattr(obj, "json_v"): return obj.json_v()
+        if bson and isinstance(obj, bson.ObjectId): return str(obj)
+        if hasattr(obj, "__iter__") and not legacy.is_bytes(obj): return list(obj)
+        if self.permissive: return str(obj)
+        raise TypeError("Object of type '%s' is not serializable" % type(obj).__name__)
+
+class OrjsonCodec(JSONCodec):
+    """
+    Accelerated JSON codec based on the orjson library, the encoding
+    operations with extra (formatting) options and the values that are
+    not supported by it (eg: big integers) use the standard library.
+
+    The values natively supported by orjson but not by the standard
+    library (eg: dates) are passed through the default method so that
+    the output is the same for both codecs, the exception being the
+    non finite floats (eg: NaN) that are encoded as null by orjson.
+    """
+
+    name = "orjson"
+    """ The name of the codec, as used in the configuration """
+
+    separators = (",", ":")
+    """ The item and key separators used in the encoded values,
+    required for the (incremental) encoding of streamed values """
+
+    def __init__(self, *args, **kwargs):
+        JSONCodec.__init__(self, *args, **kwargs)
+        self.options = orjson.OPT_NON_STR_KEYS |\
+            orjson.OPT_PASSTHROUGH_DATETIME |\
+            orjson.OPT_PASSTHROUGH_DATACLASS
+
+    def dumps(self, value, default = None, **kwargs):
+        if kwargs: return JSONCodec.dumps(self, value, default = default, **kwargs)
+        try: data = orjson.dumps(value, default = default or self.default, option = self.options)
+        except TypeError: return JSONCodec.dumps(self, value, default = default)
+        return data.decode("utf-8")
+
+    def loads(self, data, **kwargs):
+        if kwargs: return JSONCodec.loads(self, data, **kwargs)
+        try: return orjson.loads(data)
+        except orjson.JSONDecodeError as exception: raise ValueError(str(exception))
+
+CODECS = dict(
+    json = JSONCodec,
+    orjson = OrjsonCodec
+)
+""" The map associating the name of the codecs with the classes
+that implement them, used for the resolution of the configuration """
+
+AVAILABLE = dict(
+    json = True,
+    orjson = True if orjson else False
+)
+""" The map that indicates if the (optional) library required by
+each of the codecs is available in the current environment """
+
+codec = None
+""" The global codec instance that is going to be used for the
+encoding and decoding of the JSON values (lazy loaded) """
+
+def get_codec():
+    global codec
+    if codec: return codec
+    name = config.conf("JSON_CODEC", CODEC)
+    if name == "auto": name = "orjson" if orjson else "json"
+    codec = new_codec(name)
+    return codec
+
+def set_codec(value):
+    """
+    Changes the global codec to the provided one, that may be either
+    the name of the codec or a codec instance.
+
+    :type value: String/JSONCodec
+    :param value: The name of the codec or the codec instance to be
+    used from now on, an unset value re-loads the configured one.
+    """
+
+    global codec
+    codec = new_codec(value) if type(value) in legacy.STRINGS else value
+
+def new_codec(name):
+    codec_c = CODECS.get(name, None)
+    if not codec_c: raise exceptions.OperationalError(
+        message = "Invalid JSON codec '%s'" % name
+    )
+    if not AVAILABLE[name]: raise exceptions.OperationalError(
+        message = "Library for JSON codec '%s' not available" % name
+    )
+    return codec_c()
+
+def dumps(value, *args, **kwargs):
+    return get_codec().dumps(value, *args, **kwargs)
+
+def loads(data, *args, **kwargs):
+    return get_codec().loads(data, *args, **kwargs)
@@ -49,5 +49,9 @@ def util():
     from . import util
     return util
 
+def codec():
+    from . import codec
+    return codec
+
 def is_devel():
     return base().is_devel()
@@ -38,14 +38,35 @@ __license__ = "Apache License, Version 2.0"
 """ The license for the module """
 
 import os
+import zlib
 
+from . import config
 from . import legacy
 from . import exceptions
 
+ENCODINGS = ("gzip", "deflate")
+""" The sequence of content encodings supported for the (transparent)
+compression of the responses, by order of preference """
+
+COMPRESSIBLE = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/x-javascript",
+    "application/xml",
+    "application/xhtml+xml",
+    "application/rss+xml",
+    "image/svg+xml"
+)
+""" The prefixes of the content types that are considered to be
+compressible, the remaining types (eg: images) are assumed to be
+already compressed and so are sent as is """
+
 class Compress(object):
 
     def __init__(self):
         self._load_compress()
+        self._load_encoding()
 
     def load_jsmin(self):
         try: import jsmin
@@ -117,6 +138,84 @@ class Compress(object):
         data = output.read()
         return data
 
+    def is_compressible(self, type):
+        if not self.gzip or not type: return False
+        return type.startswith(COMPRESSIBLE)
+
+    def negotiate_encoding(self, type, size, accept = None):
+        """
+        Negotiates the content encoding to be used for a response with
+        the provided content type and size, taking into account the
+        accept encoding header of the current request.
+
+        :type type: String
+        :param type: The content type of the response.
+        :type size: int
+        :param size: The size in bytes of the (plain) response, an
+        unset value means that the size is unknown (eg: streamed).
+        :type accept: String
+        :param accept: The value of the accept encoding header, in case
+        it's not provided the one from the current request is used.
+        :rtype: String
+        :return: The name of the content encoding to be used or an
+        invalid value in case no encoding should be used.
+        """
+
+        if not size == None and size < self.gzip_min: return None
+        if not self.is_compressible(type): return None
+        if accept == None: accept = self.request.get_header("Accept-Encoding", None)
+        if not accept: return None
+
+        # parses the accept encoding header value into a map associating
+        # the name of the encoding with the quality value (preference)
+        qualities = dict()
+        for part in accept.split(","):
+            name, _sep, params = part.partition(";")
+            name = name.strip().lower()
+            params = params.replace(" ", "")
+            try: quality = float(params[2:]) if params.startswith("q=") else 1.0
+            except ValueError: quality = 0.0
+            qualities[name] = quality
+
+        # selects the first of the supported encodings with a valid quality
+        # value (falling back to the wildcard one in case it's not defined)
+        default = qualities.get("*", 0.0)
+        for encoding in ENCODINGS:
+            if qualities.get(encoding, default) > 0.0: return encoding
+        return None
+
+    def encode(self, data, method):
+        compressor = self._compressor(method)
+        return compressor.compress(data) + compressor.flush()
+
+    def encode_chunks(self, chunks, method):
+        # incrementally encodes the provided sequence of chunks, yielding the
+        # compressed data as soon as it's available (not for every chunk) so
+        # that the complete (plain) contents are never kept in memory
+        compressor = self._compressor(method)
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            if data: yield data
+        yield compressor.flush()
+
+    def encode_file(self, file_path, modified = None, method = "gzip"):
+        # retrieves the modification data from the requested file and uses
+        # it to validate the cached encoded contents, in case there's a match
+        # the cached contents are returned immediately (no encoding)
+        modified = modified or os.path.getmtime(file_path)
+        key = "%s:%s" % (method, file_path)
+        result = self.try_cache(key, modified)
+        if result: return (len(result), legacy.BytesIO(result))
+
+        # reads the complete set of contents of the file and encodes them
+        # using the requested method, caching the result for the next usage
+        file = open(file_path, "rb")
+        try: data = file.read()
+        finally: file.close()
+        result = self.encode(data, method)
+        self.flag_cache(key, modified, result)
+        return (len(result), legacy.BytesIO(result))
+
     def compress_js(self, data):
         if self.jsmin: return self.compress_js_jsmin(data)
         return self.compress_fallback(data)
@@ -127,5 +226,15 @@ class Compress(object):
     def compress_fallback(self, data):
         return data
 
+    def _compressor(self, method):
+        if method == "gzip": return zlib.compressobj(self.gzip_level, zlib.DEFLATED, 31)
+        return zlib.compressobj(self.gzip_level)
+
     def _load_compress(self):
         self.load_jsmin()
+
+    def _load_encoding(self):
+        self.gzip = config.conf("GZIP", True, cast = bool)
+        self.gzip_min = config.conf("GZIP_MIN", 1024, cast = int)
+        self.gzip_level = config.conf("GZIP_LEVEL", 6, cast = int)
+        self.gzip_max = config.conf("GZIP_MAX", 1048576, cast = int)
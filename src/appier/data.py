@@ -92,7 +92,7 @@ class DataAdapter(object):
         try:
             token += struct.pack(">i", self._inc)[1:4]
             self._inc = (self._inc + 1) % 0xffffff
-        except:
+        finally:
             self._inc_lock.release()
         token_s = binascii.hexlify(token)
         token_s = legacy.str(token_s)
@@ -331,10 +331,15 @@ class TinyCollection(Collection):
         for name, value in legacy.iteritems(filter):
             if name.startswith("$"): continue
             query = tinydb.Query()
-            _condition = getattr(query, name).__eq__(value)
+            is_in = isinstance(value, dict) and "$in" in value
+            if is_in: _condition = getattr(query, name).test(self._in, tuple(value["$in"]))
+            else: _condition = getattr(query, name).__eq__(value)
             condition &= _condition
         return condition
 
+    def _in(self, value, values):
+        return value in values
+
     def _to_results(self, results, kwargs, build = True):
         sort = kwargs.get("sort", [])
         skip = kwargs.get("skip", 0)
@@ -37,8 +37,6 @@ __copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
 __license__ = "Apache License, Version 2.0"
 """ The license for the module """
 
-import json
-
 from . import common
 from . import legacy
 
@@ -293,7 +291,7 @@ class HTTPError(BaseInternalError):
         error = error or self.error
         data = self.read(error = error)
         if legacy.is_bytes(data): data = data.decode("utf-8")
-        try: data_j = json.loads(data)
+        try: data_j = common.codec().loads(data)
         except: data_j = None
         return data_j
 
@@ -38,15 +38,12 @@ __license__ = "Apache License, Version 2.0"
 """ The license for the module """
 
 import os
-import json
 import zipfile
 import tempfile
 
+from . import codec
 from . import legacy
 
-try: import bson
-except: bson = None
-
 IGNORE = 1
 """ Ignore strategy for conflict solving in the import operation
 basically this strategy skips importing a document that has the same
@@ -157,7 +154,7 @@ class ExportManager(object):
         # loads the provided json data as a sequence of key value items
         # and then starts loading all the values into the data source
         data = data.decode("utf-8")
-        data_s = json.loads(data)
+        data_s = codec.loads(data)
         for _key, entity in data_s.items():
             # verifies if the "native" object id value for the database
             # definition exists and if that's the case tries to convert
@@ -204,7 +201,7 @@ class ExportManager(object):
             # loads the current data in iteration from the file
             # as the entity to be loaded into the data source
             _data = _data.decode("utf-8")
-            entity = json.loads(_data)
+            entity = codec.loads(_data)
 
             # verifies if the "native" object id value for the database
             # definition exists and if that's the case tries to convert
@@ -250,7 +247,7 @@ class ExportManager(object):
             value = entity[key]
             value_s = self._to_key(value)
             _entities[value_s] = entity
-        data = json.dumps(_entities, cls = MongoEncoder)
+        data = codec.dumps(_entities)
         data = legacy.bytes(data)
         return data
 
@@ -260,7 +257,7 @@ class ExportManager(object):
             value = entity[key]
             value_s = self._to_key(value)
             value_s = self._escape_key(value_s)
-            _data = json.dumps(entity, cls = MongoEncoder)
+            _data = codec.dumps(entity)
             _data = legacy.bytes(_data)
             yield (value_s, _data)
 
@@ -313,10 +310,3 @@ class ExportManager(object):
                 zip_file.write(_path, _path_out)
             elif os.path.isdir(_path):
                 self.__add_to_zip(zip_file, _path, base = base)
-
-class MongoEncoder(json.JSONEncoder):
-
-    def default(self, obj, **kwargs):
-        if not bson: return json.JSONEncoder.default(obj, **kwargs)
-        if isinstance(obj, bson.objectid.ObjectId): return str(obj)
-        else: return json.JSONEncoder.default(obj, **kwargs)
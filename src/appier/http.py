@@ -37,12 +37,12 @@ __copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
 __license__ = "Apache License, Version 2.0"
 """ The license for the module """
 
-import json
 import base64
 import string
 import random
 import logging
 
+from . import codec
 from . import legacy
 from . import config
 from . import exceptions
@@ -319,7 +319,7 @@ def _method_payload(
     if not data == None:
         url = url + "?" + data_e if data_e else url
     elif not data_j == None:
-        data = json.dumps(data_j)
+        data = codec.dumps(data_j)
         url = url + "?" + data_e if data_e else url
         mime = mime or "application/json"
     elif not data_m == None:
@@ -422,7 +422,7 @@ def _result(data, info = {}, force = False, strict = False):
     # the strict flag is used to determine if the exception should
     # be re-raised to the upper level in case of value error
     if is_json and legacy.is_bytes(data): data = data.decode("utf-8")
-    try: data = json.loads(data) if is_json else data
+    try: data = codec.loads(data) if is_json else data
     except ValueError:
         if strict: raise
     return data
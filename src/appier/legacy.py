@@ -97,11 +97,19 @@ except ImportError: import io; _StringIO = io
 try: import urlparse as _urlparse
 except ImportError: import urllib.parse; _urlparse = urllib.parse
 
+try: import Queue as queue
+except ImportError: import queue
+
 PYTHON_3 = sys.version_info[0] >= 3
 """ Global variable that defines if the current python
 interpreter is at least python 3 compliant, this is used
 to take some of the conversion decision for runtime """
 
+PYTHON_ASYNC = sys.version_info >= (3, 5)
+""" Global variable that defines if the current python
+interpreter supports the native coroutines (async/await)
+syntax, required for the asgi based infra-structure """
+
 if PYTHON_3: LONG = int
 else: LONG = long #@UndefinedVariable
 
@@ -247,6 +255,10 @@ def is_generator(value):
     if type(value) in (itertools.chain,): return True
     return False
 
+def is_awaitable(value):
+    if not PYTHON_ASYNC: return False
+    return inspect.isawaitable(value)
+
 def execfile(path, global_vars, local_vars = None, encoding = "utf-8"):
     if local_vars == None: local_vars = global_vars
     if not PYTHON_3: return _execfile(path, global_vars, local_vars)
@@ -109,7 +109,7 @@ class Indexed(type):
                 # retrieves the method reference associated with the function, this
                 # is required as the current reference is just an unbound function
                 # and the bound method is required for registration
-                url, method, async, json = route
+                url, method, async, json, cache = route
                 function = getattr(new_cls, name)
 
                 # creates the tuple that identifies the route as a set
@@ -129,7 +129,8 @@ class Indexed(type):
                     function,
                     async = async,
                     json = json,
-                    context = new_name
+                    context = new_name,
+                    cache = cache
                 )
 
             for error in errors:
@@ -40,7 +40,6 @@ __license__ = "Apache License, Version 2.0"
 import re
 import copy
 import math
-import json
 import types
 import inspect
 import logging
@@ -48,6 +47,7 @@ import datetime
 
 from . import meta
 from . import util
+from . import codec
 from . import legacy
 from . import common
 from . import typesf
@@ -68,8 +68,8 @@ BUILDERS = {
     legacy.UNICODE : lambda v: v.decode("utf-8") if\
         type(v) == legacy.BYTES else legacy.UNICODE(v),
     list : lambda v: RE(v) if type(v) == list else\
-        (json.loads(v) if type(v) == legacy.UNICODE else RE([v])),
-    dict : lambda v: json.loads(v) if type(v) == legacy.UNICODE else dict(v),
+        (codec.loads(v) if type(v) == legacy.UNICODE else RE([v])),
+    dict : lambda v: codec.loads(v) if type(v) == legacy.UNICODE else dict(v),
     bool : lambda v: v if type(v) == bool else\
         not v in ("", "0", "false", "False")
 }
@@ -90,8 +90,8 @@ an extension to the base builder map """
 METAS = dict(
     text = lambda v, d: v,
     enum = lambda v, d: d["enum"].get(v, None),
-    list = lambda v, d: json.dumps(v),
-    map = lambda v, d: json.dumps(v),
+    list = lambda v, d: codec.dumps(v),
+    map = lambda v, d: codec.dumps(v),
     date = lambda v, d: datetime.datetime.utcfromtimestamp(float(v)).strftime("%d %b %Y"),
     datetime = lambda v, d: datetime.datetime.utcfromtimestamp(float(v)).strftime("%d %b %Y %H:%M:%S")
 )
@@ -164,6 +164,11 @@ the parameters that are considered to be dirty and that should
 be cleaned from any query operation on the data source, otherwise
 serious consequences may occur """
 
+ITER_BATCH = 100
+""" The default number of documents that are retrieved from the
+data source and processed at once when iterating over the models
+of a collection (streaming), controls the memory usage """
+
 OPERATORS = {
     "equals" : None,
     "not_equals" : "$ne",
@@ -488,12 +493,12 @@ class Model(legacy.with_meta(meta.Ordered, observer.Observable)):
                 code = 404
             )
         if not model and not raise_e: return model
-        cls.types(model)
-        if fill: cls.fill(model)
+        cls._hydrate(model, fill = fill)
         if build: cls.build(model, map = map, rules = rules, meta = meta)
         if eager: model = cls._eager(model, eager)
-        if map: model = cls._resolve_all(model, resolve = False)
-        return model if map else cls.old(model = model, safe = False)
+        if map: return cls._resolve_all(model, resolve = False)
+        names = cls._eager_n(eager)
+        return cls._wrap(model, filled = fill, built = build, names = names)
 
     @classmethod
     def find(cls, *args, **kwargs):
@@ -524,13 +529,92 @@ class Model(legacy.with_meta(meta.Ordered, observer.Observable)):
             limit = limit,
             sort = sort
         )
-        models = [cls.types(model) for model in models]
-        if fill: models = [cls.fill(model) for model in models]
-        if build: [cls.build(model, map = map, rules = rules, meta = meta) for model in models]
-        if eager: models = cls._eager(models, eager)
-        if map: models = [cls._resolve_all(model, resolve = False) for model in models]
-        models = models if map else [cls.old(model = model, safe = False) for model in models]
-        return models
+        return cls._process(
+            models,
+            eager = eager,
+            map = map,
+            rules = rules,
+            meta = meta,
+            build = build,
+            fill = fill
+        )
+
+    @classmethod
+    def find_iter(cls, *args, **kwargs):
+        """
+        Iterates over the models that match the provided filter, in
+        the same fashion as the find method but without materializing
+        the complete result set, meaning that the memory usage remains
+        constant independently of the size of the collection.
+
+        The documents are retrieved from the data source (cursor) and
+        processed in chunks of the batch size, so that operations like
+        the eager loading of references are performed per chunk.
+
+        The same arguments as the ones of the find method are accepted
+        plus the batch (size) and the batched flag that controls if the
+        chunks (lists) should be yielded instead of the single models,
+        note that these two arguments are removed from the filter so an
+        attribute named batch (or batched) can't be filtered on here
+        (the find and count methods should be used for that instead).
+
+        :rtype: Generator
+        :return: The generator that yields the various models (or lists
+        of models in case the batched flag is set) that match the filter.
+        """
+
+        fields, eager, eager_l, map, rules, meta, build, fill, skip, limit, sort, batch, batched =\
+            cls._get_attrs(kwargs, (
+                ("fields", None),
+                ("eager", None),
+                ("eager_l", False),
+                ("map", False),
+                ("rules", True),
+                ("meta", False),
+                ("build", True),
+                ("fill", True),
+                ("skip", 0),
+                ("limit", 0),
+                ("sort", None),
+                ("batch", ITER_BATCH),
+                ("batched", False)
+            ))
+
+        if eager_l: eager = cls._eager_b(eager)
+        cls._find_s(kwargs)
+        cls._find_d(kwargs)
+
+        # runs the query in the data source and sets the batch size of
+        # the cursor (if supported) so that the round trips to the data
+        # source are aligned with the chunks that are going to be processed
+        fields = cls._sniff(fields, rules = rules)
+        collection = cls._collection()
+        models = collection.find(
+            kwargs,
+            fields,
+            skip = skip,
+            limit = limit,
+            sort = sort
+        )
+        if hasattr(models, "batch_size"): models = models.batch_size(batch)
+
+        for chunk in util.chunks(models, batch):
+            chunk = cls._process(
+                chunk,
+                eager = eager,
+                map = map,
+                rules = rules,
+                meta = meta,
+                build = build,
+                fill = fill
+            )
+            if batched: yield chunk
+            else:
+                for model in chunk: yield model
+
+    @classmethod
+    def iter(cls, *args, **kwargs):
+        return cls.find_iter(*args, **kwargs)
 
     @classmethod
     def count(cls, *args, **kwargs):
@@ -1308,29 +1392,254 @@ class Model(legacy.with_meta(meta.Ordered, observer.Observable)):
         name = cls.__name__.lower()
         return name
 
+    @classmethod
+    def _process(
+        cls,
+        models,
+        eager = None,
+        map = False,
+        rules = True,
+        meta = False,
+        build = True,
+        fill = True
+    ):
+        # runs the complete set of operations for the sequence of models
+        # (maps) retrieved from the data source, note that the eager loading
+        # is performed for the complete sequence of models at once
+        models = [cls._hydrate(model, fill = fill) for model in models]
+        if build: [cls.build(model, map = map, rules = rules, meta = meta) for model in models]
+        if eager: models = cls._eager(models, eager)
+        if map: return [cls._resolve_all(model, resolve = False) for model in models]
+        names = cls._eager_n(eager)
+        return [cls._wrap(model, filled = fill, built = build, names = names) for model in models]
+
+    @classmethod
+    def _plan(cls):
+        # in case the hydration plan is already "cached" in the current
+        # class (fast retrieval) returns immediately
+        if "_plan_c" in cls.__dict__: return cls._plan_c
+
+        # creates the structures that are going to hold the casting
+        # information (builder and type) for each of the attributes and
+        # the sequence of attributes to be filled (with their default values)
+        casters = dict()
+        fillers = []
+
+        # iterates over the complete definition of the model to pre-compute
+        # the operations that are going to be performed for each attribute
+        # avoiding the per document lookup of the definition (expensive)
+        definition = cls.definition()
+        for name, _definition in definition.items():
+            if name == "_id": continue
+            _type = _definition.get("type", legacy.UNICODE)
+            builder = BUILDERS.get(_type, _type)
+            casters[name] = (builder, _type)
+            filler = cls._filler(_definition)
+            if filler: fillers.append((name,) + filler + ((builder, _type),))
+
+        # saves the hydration plan in the current class and then returns
+        # the contents of it to the caller method (as expected)
+        cls._plan_c = (casters, fillers)
+        return cls._plan_c
+
+    @classmethod
+    def _filler(cls, definition):
+        # the increment based attributes are never filled as their values
+        # are meant to be generated at the time of the model creation
+        increment = definition.get("increment", False)
+        if increment: return None
+
+        # the initial value has priority over the default value of the type
+        # and for the types that define a default generator it's stored so
+        # that a new value is generated for each of the filled documents
+        if "initial" in definition: return (definition.get("initial"), None)
+        _type = definition.get("type")
+        default = TYPE_DEFAULTS.get(_type, None)
+        factory = _type._default if hasattr(_type, "_default") else None
+        return (default, factory)
+
+    @classmethod
+    def _hydrate(cls, model, fill = True):
+        """
+        Runs the type casting and (optionally) the filling operations
+        for the provided model (map) in a single pass, using the plan
+        pre-computed for the current class.
+
+        This is equivalent to calling both the types and the fill
+        methods in sequence but avoids the lookup of the definition
+        of each attribute for every retrieved document.
+
+        :type model: Dictionary
+        :param model: The model map that is going to be hydrated, this
+        map is changed in place by the operation.
+        :type fill: bool
+        :param fill: If the attributes that are not set in the model
+        should be filled with their default values.
+        :rtype: Dictionary
+        :return: The same model map that has been provided, after the
+        casting and filling operations.
+        """
+
+        casters, fillers = cls._plan()
+
+        for name, value in legacy.eager(model.items()):
+            if value == None: continue
+            caster = casters.get(name, None)
+            if not caster: continue
+            model[name] = cls._cast_p(value, caster)
+
+        if fill: cls._fill_p(model, fillers)
+        return model
+
+    @classmethod
+    def _wrap(cls, model, filled = True, built = True, names = ()):
+        """
+        Wraps the provided (already hydrated) model map into an instance
+        of the current class, this is the equivalent of the old method
+        (with no safe attributes) for models retrieved from the data source.
+
+        Only the operations not already performed by the hydration are
+        executed: the fill of the attributes (in case it has not been
+        done or for the attributes removed by the build, eg: the private
+        ones) and the casting of the (top level) attributes changed by
+        the eager loading.
+
+        :type model: Dictionary
+        :param model: The hydrated model map that is going to be wrapped.
+        :type filled: bool
+        :param filled: If the model has already been filled with the default
+        values for the unset attributes (at hydration time).
+        :type built: bool
+        :param built: If the build operation has been performed for the model
+        meaning that some attributes may have been removed from it (eg: by the
+        rules or by a custom build) and must be filled again.
+        :type names: Tuple
+        :param names: The sequence of top level attribute names that have been
+        eager loaded and that should be casted again.
+        :rtype: Model
+        :return: The instance of the current class wrapping the model.
+        """
+
+        casters, fillers = cls._plan()
+
+        if not filled or built: cls._fill_p(model, fillers)
+
+        for name in names:
+            value = model.get(name, None)
+            if value == None: continue
+            caster = casters.get(name, None)
+            if not caster: continue
+            model[name] = cls._cast_p(value, caster)
+
+        instance = cls(fill = False)
+        instance.pre_apply()
+        instance.model.update(model)
+        instance.post_apply()
+        return instance
+
+    @classmethod
+    def _fill_p(cls, model, fillers):
+        # fills the unset attributes with their default (or initial) values
+        # casting them (as done by the types method) so that a new value is
+        # created for every model and the initial values have the proper type
+        for name, default, factory, caster in fillers:
+            if name in model: continue
+            value = factory() if factory else default
+            model[name] = value if value == None else cls._cast_p(value, caster)
+
+    @classmethod
+    def _cast_p(cls, value, caster):
+        builder, _type = caster
+        try:
+            return builder(value) if builder else value
+        except:
+            default = TYPE_DEFAULTS.get(_type, None)
+            default = _type._default() if hasattr(_type, "_default") else default
+            return default
+
+    @classmethod
+    def _eager_n(cls, names):
+        if not names: return ()
+        return tuple(set(name.split(".", 1)[0] for name in names))
+
     @classmethod
     def _eager(cls, model, names):
-        # verifies if the provided model instance is a sequence and if
-        # that's the case runs the recursive eager loading of names and
-        # returns the resulting sequence to the caller method
+        # normalizes the provided model (or sequence of models) into a
+        # list so that the references of all of them are resolved at once
         is_list = isinstance(model, (list, tuple))
-        if is_list: return [cls._eager(_model, names) for _model in model]
+        models = model if is_list else [model]
+
+        # creates the identity map that is going to be shared by the complete
+        # set of names (paths), so that the same referenced object is shared
+        # among references (and retrieved only once) for the operation
+        identity = dict()
 
         # iterates over the complete set of names that are meant to be
-        # eager loaded from the model and runs the "resolution" process
-        # for each of them so that they are properly eager loaded
+        # eager loaded from the models and runs the (batched) resolution
+        # process for each level (part) of the path of each of them
         for name in names:
-            _model = model
+            level = models
             for part in name.split("."):
-                is_sequence = type(_model) in (list, tuple)
-                if is_sequence: _model = [cls._res(value, part) for value in _model]
-                else: _model = cls._res(_model, part)
-                if not _model: break
+                level = cls._res_m(level, part, identity)
+                if not level: break
 
         # returns the resulting model to the caller method, most of the
         # times this model should have not been touched
         return model
 
+    @classmethod
+    def _res_m(cls, models, part, identity):
+        # gathers the identifiers of the references (that are not yet
+        # resolved) for the part of the various models, grouping them by
+        # the target model and key (name) attribute of the reference
+        pending = dict()
+        for model in models:
+            for reference in cls._references(model[part]):
+                if reference.is_resolved() or not reference.id: continue
+                key = (reference._target, reference._name)
+                ids = pending.get(key, None)
+                if ids == None: ids = pending[key] = set()
+                if (key, reference.id) in identity: continue
+                ids.add(reference.id)
+
+        # retrieves the objects for each of the groups using a single query
+        # (with the in operator) and stores them in the identity map, note
+        # that the eager fields of the target models are loaded as well
+        for key, ids in legacy.iteritems(pending):
+            if not ids: continue
+            target, name = key
+            objects = target.find(eager_l = True, **{name : {"$in" : list(ids)}})
+            for object in objects: identity[(key, object.model.get(name, None))] = object
+
+        # "stitches" the retrieved objects into the models replacing the
+        # references and builds the sequence of values for the next level
+        level = []
+        for model in models:
+            value = model[part]
+            if isinstance(value, TYPE_REFERENCES):
+                value = cls._stitch(value, identity)
+                model[part] = value
+            if not value: continue
+            is_sequence = isinstance(value, (list, tuple))
+            if is_sequence: level.extend(item for item in value if item)
+            else: level.append(value)
+        return level
+
+    @classmethod
+    def _stitch(cls, value, identity):
+        if isinstance(value, typesf.References):
+            return [cls._stitch(reference, identity) for reference in value.objects]
+        if value.is_resolved(): return value._object
+        if not value.id: return None
+        key = (value._target, value._name)
+        return identity.get((key, value.id), None)
+
+    @classmethod
+    def _references(cls, value):
+        if isinstance(value, typesf.Reference): return (value,)
+        if isinstance(value, typesf.References): return value.objects
+        return ()
+
     @classmethod
     def _res(cls, model, part):
         value = model[part]
@@ -1874,7 +2183,7 @@ class Model(legacy.with_meta(meta.Ordered, observer.Observable)):
         return model
 
     def dumps(self):
-        return json.dumps(self.model)
+        return codec.dumps(self.model)
 
     def unwrap(self, **kwargs):
         default = kwargs.get("default", False)
@@ -37,8 +37,7 @@ __copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
 __license__ = "Apache License, Version 2.0"
 """ The license for the module """
 
-import json
-
+from . import codec
 from . import legacy
 from . import typesf
 from . import config
@@ -107,8 +106,8 @@ def drop_db(name = None):
 def object_id(value):
     return bson.ObjectId(value)
 
-def dumps(*args):
-    return json.dumps(default = serialize, *args)
+def dumps(*args, **kwargs):
+    return codec.dumps(default = serialize, *args, **kwargs)
 
 def serialize(obj):
     if isinstance(obj, common.model().Model): return obj.model
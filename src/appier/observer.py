@@ -57,14 +57,23 @@ class Observable(object):
     """ The dictionary containing the global association
     between the global event names and the handler methods """
 
+    _names_f = {}
+    """ The cache that associates the class name and event name
+    tuple with the fully qualified event name, avoiding the (expensive)
+    conversion of the class name on every event trigger """
+
     def __init__(self, *args, **kwargs):
         self._events = {}
 
     @classmethod
     def name_f(cls, name):
+        key = (cls.__name__, name)
+        name_f = Observable._names_f.get(key, None)
+        if name_f: return name_f
         cls_name = cls.__name__
         cls_name = util.camel_to_underscore(cls_name)
         name_f = cls_name + "." + name
+        Observable._names_f[key] = name_f
         return name_f
 
     @classmethod
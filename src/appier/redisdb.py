@@ -37,8 +37,7 @@ __copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
 __license__ = "Apache License, Version 2.0"
 """ The license for the module """
 
-import json
-
+from . import codec
 from . import config
 
 try: import redis
@@ -68,5 +67,5 @@ def get_connection():
     connection = redis.from_url(url)
     return connection
 
-def dumps(*args):
-    return json.dumps(*args)
+def dumps(*args, **kwargs):
+    return codec.dumps(*args, **kwargs)
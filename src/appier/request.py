@@ -37,12 +37,12 @@ __copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
 __license__ = "Apache License, Version 2.0"
 """ The license for the module """
 
-import json
 import time
 import base64
 import datetime
 
 from . import util
+from . import codec
 from . import config
 from . import legacy
 from . import session
@@ -94,6 +94,24 @@ CODE_STRINGS = {
 """ Dictionary associating the error code as integers
 with the official descriptive message for it """
 
+class Lazy(object):
+    """
+    Non data descriptor used for the attributes of the request
+    that are computed by a (possibly expensive) loading stage,
+    the stage is only run on the first access to the attribute
+    after which the value is read from the instance dictionary
+    (without any further overhead).
+    """
+
+    def __init__(self, name, stage):
+        self.name = name
+        self.stage = stage
+
+    def __get__(self, instance, owner):
+        if instance == None: return self
+        instance.load_stage(self.stage)
+        return instance.__dict__[self.name]
+
 class Request(object):
     """
     Request class that acts as a proxy for the both
@@ -109,6 +127,19 @@ class Request(object):
     be changed in case the app required loading of the session
     using a different attribute name """
 
+    data_j = Lazy("data_j", "data")
+    post = Lazy("post", "data")
+    files = Lazy("files", "data")
+    args = Lazy("args", "data")
+    params_s = Lazy("params_s", "form")
+    post_s = Lazy("post_s", "form")
+    files_s = Lazy("files_s", "form")
+    authorization = Lazy("authorization", "authorization")
+    in_headers = Lazy("in_headers", "headers")
+    cookies = Lazy("cookies", "cookies")
+    session = Lazy("session", "session")
+    locale = Lazy("locale", "locale")
+
     def __init__(
         self,
         owner = None,
@@ -119,9 +150,9 @@ class Request(object):
         scheme = None,
         address = None,
         params = {},
-        data_j = {},
+        data_j = None,
         environ = {},
-        session_c = session.FileSession
+        session_c = None
     ):
         self.owner = owner
         self.method = method
@@ -131,9 +162,8 @@ class Request(object):
         self.scheme = scheme
         self.address = address
         self.params = params
-        self.data_j = data_j
         self.environ = environ
-        self.session_c = session_c
+        self.session_c = session_c or session.FileSession
         self.handled = False
         self.context = None
         self.method_i = None
@@ -141,20 +171,20 @@ class Request(object):
         self.code = 200
         self.location = prefix + util.quote(path).lstrip("/")
         self.content_type = None
-        self.authorization = None
         self.data = None
+        self.input = None
+        self.length = -1
         self.result = None
-        self.session = session.MockSession(self)
+        self.stream = None
+        self.cache_key = None
+        self.cache_route = None
         self.set_cookie = None
-        self.post = {}
-        self.files = {}
-        self.args = {}
-        self.cookies = {}
-        self.in_headers = {}
         self.out_headers = {}
         self.warnings = []
         self.properties = {}
+        self.stages = {}
         self._params = None
+        if not data_j == None: self.set_json(data_j)
 
     def __str__(self):
         return str(self.repr())
@@ -200,11 +230,29 @@ class Request(object):
         is persisted into the current client's information.
 
         This method should always be called at the end of the request
-        handling workflow.
+        handling workflow, note that in case the session has not
+        been loaded (never accessed) there's nothing to be flushed.
         """
 
+        if not "session" in self.__dict__: return
         self.session.flush(self)
 
+    def close(self):
+        """
+        Closes the current request releasing the resources associated
+        with it, namely the temporary files of the (spooled) files
+        of a multipart upload, that are removed once closed.
+
+        This method should always be called at the end of the request
+        handling workflow (after the flush operation).
+        """
+
+        if not "files" in self.__dict__: return
+        for values in self.files.values():
+            for value in values:
+                if not isinstance(value, util.FileTuple): continue
+                value.close()
+
     def repr(self):
         """
         Returns the dictionary based representation of the current
@@ -253,17 +301,21 @@ class Request(object):
 
     def set_params(self, params):
         self.params = params
+        if not "data" in self.stages: return
         self.extend_args(params)
 
     def set_post(self, post):
+        self.load_stage("data")
         self.post = post
         self.extend_args(post)
 
     def set_files(self, files):
+        self.load_stage("data")
         self.files = files
         self.extend_args(files)
 
     def set_multipart(self, post, files, ordered):
+        self.load_stage("data")
         self.post = post
         self.files = files
         self.extend_args(ordered)
@@ -274,10 +326,27 @@ class Request(object):
     def set_data(self, data):
         self.data = data
 
+    def set_input(self, input, length = -1):
+        """
+        Sets the (wsgi) input stream from which the body of the request
+        is going to be read (and parsed) incrementally, instead of using
+        a previously read data buffer (eg: large multipart uploads).
+
+        :type input: File
+        :param input: The file like object for the body of the request.
+        :type length: int
+        :param length: The (content) length of the body of the request,
+        a negative value means that the length is unknown.
+        """
+
+        self.input = input
+        self.length = length
+
     def get_json(self):
         return self.data_j
 
     def set_json(self, data_j):
+        self.load_stage("data")
         self.data_j = data_j
 
     def set_code(self, code):
@@ -341,16 +410,58 @@ class Request(object):
         self.load_headers()
         self.load_session()
 
+    def load_stage(self, name):
+        """
+        Runs the loading stage with the provided name in case it has
+        not been run for the current request, this is the entry point
+        for the lazy loading of the request attributes, so that only
+        the stages required by the handler are effectively run.
+
+        The number of times each of the stages has been run is kept
+        in the stages map of the request (useful for debugging).
+
+        :type name: String
+        :param name: The name of the stage to be run, should be the
+        suffix of the corresponding load method (eg: data, session).
+        """
+
+        if name in self.stages: return
+        method = getattr(self, "load_" + name)
+        method()
+
+    def is_loaded(self, name):
+        """
+        Checks if the lazy attribute with the provided name has already
+        been loaded for the current request, this check does not trigger
+        the loading of the attribute (as a plain access would).
+
+        Should be used by code paths that only want to use an attribute
+        in case it's already available (eg: error handlers).
+
+        :type name: String
+        :param name: The name of the lazy attribute to be checked.
+        :rtype: bool
+        :return: If the attribute has already been loaded (or set).
+        """
+
+        return name in self.__dict__
+
     def load_data(self):
-        # initializes the various structures associated with the data loading
-        # and/or parsing, so that the request is correctly populated
+        # marks the data stage as run and initializes the various structures
+        # associated with the data loading and/or parsing, so that the request
+        # is correctly populated, note that the arguments are re-built from
+        # the (already) set parameters and the ones present in the data
+        self._mark_stage("data")
         self.data_j = None
         self.post = {}
         self.files = {}
+        self.args = {}
+        self.extend_args(self.params)
 
-        # verifies if the current data attribute contains a valid value in case
-        # it does not returns immediately as there's nothing to be loaded
-        if not self.data: return
+        # verifies if the current data attribute contains a valid value (or if
+        # there's an input stream to be parsed) in case it does not returns
+        # immediately as there's nothing to be loaded
+        if not self.data and not self.input: return
 
         # tries to retrieve the current content type value set in the environment
         # then splits it around the separator to retrieve the mime type
@@ -361,7 +472,7 @@ class Request(object):
 
         if mime_type == "application/json":
             data = self.data.decode("utf-8") if self.data else None
-            try: self.data_j = json.loads(data) if data else None
+            try: self.data_j = codec.loads(data) if data else None
             except: pass
         elif mime_type == "application/x-www-form-urlencoded":
             data = legacy.str(self.data) if self.data else None
@@ -373,10 +484,17 @@ class Request(object):
             self.set_post(post)
         elif mime_type == "multipart/form-data":
             boundary = content_type_s[1]
-            post, files, ordered = util.parse_multipart(self.data, boundary)
+            post, files, ordered = util.parse_multipart(
+                self.input or self.data,
+                boundary,
+                length = self.length,
+                spool = getattr(self.owner, "multipart_spool", None),
+                limit = getattr(self.owner, "body_max", None)
+            )
             self.set_multipart(post, files, ordered)
 
     def load_form(self):
+        self._mark_stage("form")
         self.params_s = util.load_form(self.params)
         self.post_s = util.load_form(self.post)
         self.files_s = util.load_form(self.files)
@@ -385,6 +503,8 @@ class Request(object):
         # tries to decode the provided authorization header into it's own
         # components of username and password, in case the structure of the
         # provided string is not compliant an exception is raised
+        self._mark_stage("authorization")
+        self.authorization = None
         authorization = self.environ.get("HTTP_AUTHORIZATION", None)
         if not authorization: return
         parts = authorization.split(" ", 1)
@@ -401,6 +521,8 @@ class Request(object):
         self.authorization = tuple(parts)
 
     def load_headers(self):
+        self._mark_stage("headers")
+        self.in_headers = {}
         for key, value in self.environ.items():
             if not key.startswith("HTTP_"): continue
             key = key[5:]
@@ -410,15 +532,18 @@ class Request(object):
             self.in_headers[key_s] = value
 
     def load_session(self):
+        self._mark_stage("session")
+        self.session = session.MockSession(self)
         self.load_mock()
-        self.load_cookies()
         self.set_alias()
         self.set_session()
+        self.resolve_params()
 
     def load_mock(self):
         self.session.address = self.get_address()
 
     def load_cookies(self):
+        self._mark_stage("cookies")
         cookie_s = self.environ.get("HTTP_COOKIE", "")
         self.cookies = util.parse_cookie(cookie_s)
 
@@ -430,11 +555,18 @@ class Request(object):
         value = value or self.locale
         return value.replace("-", "_").lower()
 
-    def load_locale(self, available, fallback = "en_us"):
+    def load_locale(self, available = None, fallback = "en_us"):
+        # in case no available locales are provided uses the ones
+        # defined for the owner (app) of the request, this is the
+        # case for the lazy loading of the locale (on first access)
+        self._mark_stage("locale")
+        if available == None: available = getattr(self.owner, "locales", ())
+
         # tries to gather the best locale value using the currently
         # available strategies and in case the retrieved local is part
         # of the valid locales for the app returns the locale, otherwise
-        # returns the fallback value instead
+        # returns the fallback value instead, note that the global (operative
+        # system) locale is not changed as it's shared by the request threads
         locale = self.get_locale(fallback = fallback)
         locale = self.locale_b(locale)
         if locale in available: self.locale = locale
@@ -580,6 +712,9 @@ class Request(object):
         if not self.query: return self.location
         return self.location + "?" + self.query
 
+    def _mark_stage(self, name):
+        self.stages[name] = self.stages.get(name, 0) + 1
+
     def _resolve_p(self, params):
         secret = self.session.get("secret", None)
         if not secret: return params
@@ -595,6 +730,19 @@ class MockRequest(Request):
 
     def __init__(self, locale = "en_us"):
         Request.__init__(self, "NONE", "/")
+
+        # sets the values of the lazy attributes eagerly so that no
+        # loading stage is ever run for the mock request, as it may
+        # be shared among threads and must not reach the session
+        # backend (eg: creating session files) outside of a request
+        self.session = session.MockSession(self)
+        self.data_j = None
+        self.post = dict()
+        self.files = dict()
+        self.args = dict()
+        self.authorization = None
+        self.in_headers = dict()
+        self.cookies = dict()
         self.locale = locale
         self.files_s = dict()
         self.post_s = dict()
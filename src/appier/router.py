@@ -0,0 +1,323 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Hive Appier Framework
+# Copyright (c) 2008-2016 Hive Solutions Lda.
+#
+# This file is part of Hive Appier Framework.
+#
+# Hive Appier Framework is free software: you can redistribute it and/or modify
+# it under the terms of the Apache License as published by the Apache
+# Foundation, either version 2.0 of the License, or (at your option) any
+# later version.
+#
+# Hive Appier Framework is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# Apache License for more details.
+#
+# You should have received a copy of the Apache License along with
+# Hive Appier Framework. If not, see <http://www.apache.org/licenses/>.
+
+__author__ = "João Magalhães <joamag@hive.pt>"
+""" The author(s) of the module """
+
+__version__ = "1.0.0"
+""" The version of the module """
+
+__revision__ = "$LastChangedRevision$"
+""" The revision number of the module """
+
+__date__ = "$LastChangedDate$"
+""" The last change date of the module """
+
+__copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
+""" The copyright for the module """
+
+__license__ = "Apache License, Version 2.0"
+""" The license for the module """
+
+import re
+
+from . import legacy
+from . import exceptions
+
+MAX_GROUPS = 99
+""" The maximum number of capturing groups that may be present in
+a single combined (alternation) regular expression, older versions
+of the interpreter limit the number of groups to one hundred and
+the cost of a match operation grows with the number of groups """
+
+META_CHARS = "<>()[]{}.*+?|^$\\"
+""" The set of characters that if present in the first segment of
+a route expression turn it into a dynamic one (not possible to be
+used as static key for the bucketing of the route) """
+
+NAMED_REGEX = re.compile(r"\(\?P([<=])(\w+)")
+""" The regular expression used to find both the named groups and
+the named back references in a route regex so that they may be
+renamed (avoiding collisions) in the combined expression """
+
+NUMBERED_REGEX = re.compile(r"\\[1-9]")
+""" Regular expression that detects numbered back references, these
+are not compatible with the combination of regexes (as the group
+numbers change) and so such routes are matched on their own """
+
+FLAGS_REGEX = re.compile(r"\(\?[aiLmsux]")
+""" Regular expression that detects inline flags in a pattern, that
+would change the behavior of the complete combined expression """
+
+class Router(object):
+    """
+    Compiled dispatch table for a sequence of routes, that avoids
+    the linear scan of every route regex for each request.
+
+    Routes are bucketed by http method and by the static first
+    segment of their path, then the regexes of each bucket are
+    combined into a (reduced) set of alternation based regexes,
+    so that a single (native) match operation resolves the route.
+
+    The ordering of the routes is preserved, meaning that the first
+    route (in definition order) to match the path is always selected.
+    """
+
+    def __init__(self, routes = ()):
+        self.routes = list(routes)
+        self._static = dict()
+        self._dynamic = dict()
+        self.build()
+
+    def __len__(self):
+        return self.routes.__len__()
+
+    def build(self):
+        # creates the maps that are going to store the entries indexed
+        # by the http method and the static segment (static map) and
+        # the entries indexed only by method (dynamic map), these are
+        # going to be used as the source for the compilation
+        static = dict()
+        dynamic = dict()
+
+        # iterates over the complete set of routes to "bucket" them by
+        # the various methods they support and by their (static) first
+        # segment, note that the index is stored so that the original
+        # order of the routes may be restored latter on
+        for index, route in enumerate(self.routes):
+            methods, regex = route[:2]
+            segment = self._route_segment(route)
+            entry = (index, route)
+            for method in methods:
+                if segment == None:
+                    entries = dynamic.get(method, [])
+                    dynamic[method] = entries
+                else:
+                    entries = static.get((method, segment), [])
+                    static[(method, segment)] = entries
+                entries.append(entry)
+
+        # compiles the dynamic only buckets (used when the path segment
+        # has no static route associated) and then the static buckets that
+        # are merged with the dynamic ones, respecting the original order
+        self._dynamic = dict()
+        self._static = dict()
+        for method, entries in legacy.iteritems(dynamic):
+            self._dynamic[method] = self._compile(entries)
+        for key, entries in legacy.iteritems(static):
+            method, _segment = key
+            entries = entries + dynamic.get(method, [])
+            entries.sort(key = lambda entry: entry[0])
+            self._static[key] = self._compile(entries)
+
+    def match(self, method, path):
+        """
+        Tries to find the first route that matches the provided
+        method and path, returning both the route and the sequence
+        of values for the groups captured by its regex.
+
+        :type method: String
+        :param method: The http method of the request to be matched.
+        :type path: String
+        :param path: The (unquoted) path of the request to be matched.
+        :rtype: Tuple
+        :return: A tuple containing the matched route and the groups
+        captured by the route regex, or a tuple of unset values in
+        case no route is matched.
+        """
+
+        segment = self._path_segment(path)
+        matchers = self._static.get((method, segment), None)
+        if matchers == None: matchers = self._dynamic.get(method, ())
+        for regex, table, route in matchers:
+            match = regex.match(path)
+            if not match: continue
+            if not table: return route, match.groups()
+            index = match.lastindex
+            route, count = table[index]
+            groups = match.groups()[index:index + count]
+            return route, groups
+        return None, None
+
+    def _compile(self, entries):
+        # creates the list of matchers (regex, table and route tuples)
+        # and the buffers for the chunk that is currently being combined
+        matchers = []
+        patterns = []
+        table = dict()
+        groups = 0
+
+        for _index, route in entries:
+            regex = route[1]
+            pattern = regex.pattern
+            count = regex.groups
+
+            # in case the current route is not combinable (or would overflow
+            # the group limit on its own) flushes the current chunk and adds
+            # the route as a standalone matcher (original regex is used)
+            combinable = self._combinable(pattern, regex)
+            if not combinable or count + 1 > MAX_GROUPS:
+                self._flush(matchers, patterns, table)
+                patterns, table, groups = [], dict(), 0
+                matchers.append((regex, None, route))
+                continue
+
+            # verifies if adding the current route to the chunk would overflow
+            # the maximum number of groups and if that's the case flushes it
+            if groups + count + 1 > MAX_GROUPS:
+                self._flush(matchers, patterns, table)
+                patterns, table, groups = [], dict(), 0
+
+            # renames the named groups of the pattern so that no collisions
+            # occur in the combined pattern and then wraps it in a named group
+            # that identifies the route when matched (as the last index)
+            prefix = "r%d_" % len(patterns)
+            pattern = NAMED_REGEX.sub(r"(?P\1" + prefix + r"\2", pattern)
+            patterns.append("(" + pattern + ")")
+            table[groups + 1] = (route, count)
+            groups += count + 1
+
+        self._flush(matchers, patterns, table)
+        return matchers
+
+    def _flush(self, matchers, patterns, table):
+        if not patterns: return
+        pattern = "|".join(patterns)
+        try: regex = re.compile(pattern, re.UNICODE)
+        except re.error:
+            for _index, (route, _count) in sorted(table.items()):
+                matchers.append((route[1], None, route))
+            return
+        matchers.append((regex, table, None))
+
+    def _combinable(self, pattern, regex):
+        if NUMBERED_REGEX.search(pattern): return False
+        if regex.flags & ~(re.UNICODE | getattr(re, "ASCII", 0)): return False
+        if FLAGS_REGEX.search(pattern): return False
+        return True
+
+    def _route_segment(self, route):
+        # retrieves the base (non compiled) expression of the route
+        # falling back to the pattern of the regex in case it's not
+        # present in the options and then removes the start anchor
+        opts = route[3] if len(route) > 3 else {}
+        base = opts.get("base", None) if isinstance(opts, dict) else None
+        base = base or route[1].pattern
+        if base.startswith("^"): base = base[1:]
+
+        # verifies that the expression starts with a slash (as expected)
+        # and then extracts the first segment of it, if such segment
+        # contains any special character it's considered dynamic
+        if not base.startswith("/"): return None
+        segment = base[1:].split("/", 1)[0]
+        for char in META_CHARS:
+            if char in segment: return None
+        return segment
+
+    def _path_segment(self, path):
+        if not path.startswith("/"): return None
+        return path[1:].split("/", 1)[0]
+
+class Binder(object):
+    """
+    Precomputed binding information for an action method, that
+    is used to convert the values captured by the route regex
+    and the query parameters into the arguments of the call.
+
+    The introspection of the method is performed only once (at
+    construction time) so that the per request binding is reduced
+    to a series of simple lookup and casting operations.
+    """
+
+    def __init__(self, method, param_t = (), name = None):
+        self.method = method
+        self.param_t = list(param_t)
+        self.name = name or getattr(method, "__name__", str(method))
+        self.casters = [value_t for value_t, _value_n in self.param_t]
+        self.names = frozenset()
+        self.kwargs = False
+        self.varargs = False
+        self.build()
+
+    def build(self):
+        # retrieves the argument specification of the method, falling
+        # back to the call method for callable objects, note that in case
+        # it's not possible to introspect the method an error is raised
+        # as it's not possible to call it from the routing infra-structure
+        try: spec = legacy.getargspec(self.method)
+        except TypeError:
+            try: spec = legacy.getargspec(self.method.__call__)
+            except (TypeError, AttributeError):
+                raise exceptions.OperationalError(
+                    message = "Not possible to inspect action '%s'" % self.name
+                )
+
+        # unpacks the specification and stores the various values that
+        # are going to be used in the binding of the arguments, note that
+        # the bound methods have their first argument removed (self)
+        args, varargs, kwargs = spec[0], spec[1], spec[2]
+        is_bound = hasattr(self.method, "__self__") and self.method.__self__
+        positional = args[1:] if is_bound and args else args
+        self.names = frozenset(args)
+        self.kwargs = True if kwargs else False
+        self.varargs = True if varargs else False
+
+        # verifies that the method is able to receive the complete set of
+        # values captured from the route expression as positional arguments
+        # otherwise the call would always fail (raises the error right away)
+        if not self.varargs and len(positional) < len(self.casters):
+            raise exceptions.OperationalError(
+                message = "Action '%s' does not accept the %d route parameters" %\
+                    (self.name, len(self.casters))
+            )
+
+    def cast(self, groups):
+        """
+        Casts the provided sequence of values captured by the route
+        regex using the types defined in the route expression.
+
+        :type groups: Tuple
+        :param groups: The sequence of (string) values captured by the
+        regular expression of the route.
+        :rtype: List
+        :return: The list of values casted to the proper types, to be
+        used as the positional arguments of the call.
+        """
+
+        return [caster(value) for value, caster in zip(groups, self.casters)]
+
+    def bind(self, params):
+        """
+        Builds the keyword arguments map from the provided map of
+        (multiple value) parameters, filtering the ones that are not
+        defined in the method signature.
+
+        :type params: Dictionary
+        :param params: The map of parameters (as lists of values) that
+        are going to be used as the source for the keyword arguments.
+        :rtype: Dictionary
+        :return: The map containing the keyword arguments to be used
+        in the call of the method.
+        """
+
+        if self.kwargs: return dict((key, value[0]) for key, value in params.items())
+        names = self.names
+        return dict((key, value[0]) for key, value in params.items() if key in names)
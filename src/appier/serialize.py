@@ -39,6 +39,7 @@ __license__ = "Apache License, Version 2.0"
 
 import csv
 import uuid
+import itertools
 
 from . import model
 from . import legacy
@@ -52,22 +53,28 @@ def serialize(obj):
     return legacy.UNICODE(obj)
 
 def serialize_csv(items, encoding = "utf-8", delimiter = ";", strict = False):
+    # converts the provided items into an iterator so that any kind of
+    # iterable (eg: generator of models) may be used and then retrieves
+    # the first element of it, that is used to determine the keys
+    items = iter(items)
+    try: first = next(items)
+    except StopIteration: first = None
+
     # verifies if the strict mode is active and there're no items defined
     # if that's the case an operational error is raised, otherwise an in
     # case the items are not provided the default (empty string) is returned
-    if strict and not items: raise exceptions.OperationalError(
+    if strict and first == None: raise exceptions.OperationalError(
         message = "Empty items object provided, no keys available"
     )
-    if not items: return str()
+    if first == None: return str()
 
     # builds the encoder taking into account the provided encoding string
     # value, this encoder will be used to encode each of the partial values
     # that is going to be set in the target csv buffer
     encoder = build_encoder(encoding)
 
-    # retrieves the first element and uses it to determine if the current
-    # sequence to be serialized is map or sequence based
-    first = items[0]
+    # uses the first element to determine if the current sequence
+    # to be serialized is map or sequence based
     is_map = type(first) == dict
 
     # retrieves the various keys from the first element of the provided sequence
@@ -77,7 +84,7 @@ def serialize_csv(items, encoding = "utf-8", delimiter = ";", strict = False):
     keys = first.keys() if is_map else first
     keys = legacy.eager(keys)
     if is_map: keys.sort()
-    else: items = items[1:]
+    if is_map: items = itertools.chain((first,), items)
 
     # constructs the first row (names/keys row) using the gathered sequence of keys
     # and encoding them using the currently build encoder
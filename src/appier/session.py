@@ -38,6 +38,7 @@ __license__ = "Apache License, Version 2.0"
 """ The license for the module """
 
 import os
+import json
 import time
 import uuid
 import hmac
@@ -45,8 +46,10 @@ import zlib
 import pickle
 import shelve
 import base64
+import sqlite3
 import hashlib
 import datetime
+import threading
 
 from . import config
 from . import legacy
@@ -58,6 +61,114 @@ EXPIRE_TIME = datetime.timedelta(days = 31)
 in case no expire time is provided to the creation of
 the session instance """
 
+class Serializer(object):
+    """
+    Abstract serializer class that defines the interface used by
+    the session classes to convert sessions into (byte) payloads
+    and back, for their storage or transmission.
+    """
+
+    name = None
+    """ The name of the serializer, as used in the configuration """
+
+    def dumps(self, session):
+        raise exceptions.NotImplementedError()
+
+    def loads(self, data, cls):
+        raise exceptions.NotImplementedError()
+
+    def validate(self, value):
+        """
+        Validates that the provided value may be serialized by the
+        serializer, raising an operational error otherwise, so that
+        the problem is reported when the value is set in the session
+        instead of when the session is flushed.
+
+        :type value: Object
+        :param value: The value that is going to be set in the session.
+        """
+
+        pass
+
+class PickleSerializer(Serializer):
+    """
+    Serializer that pickles the complete session object, able to
+    handle any (picklable) value but producing large payloads that
+    must never be loaded from untrusted sources.
+    """
+
+    name = "pickle"
+    """ The name of the serializer, as used in the configuration """
+
+    def dumps(self, session):
+        return pickle.dumps(session, 2)
+
+    def loads(self, data, cls):
+        return pickle.loads(data)
+
+class JSONSerializer(Serializer):
+    """
+    Compact serializer that encodes only the state of the session
+    (the data and the expiration meta-data) as a JSON array, safe to
+    be loaded from untrusted sources but restricted to JSON values,
+    meaning for example that tuples are loaded as lists.
+
+    Values that are not JSON serializable (eg: dates, bytes or object
+    ids) are rejected with an operational error when set in the session,
+    they must be converted into JSON values before being set.
+    """
+
+    name = "json"
+    """ The name of the serializer, as used in the configuration """
+
+    FIELDS = ("sid", "name", "address", "create", "expire", "data")
+    """ The fields of the state of the session that are encoded by
+    position, the remaining ones (if any) are encoded by name """
+
+    def dumps(self, session):
+        state = session.__getstate__()
+        state.pop("dirty", None)
+        values = [state.pop(name, None) for name in self.__class__.FIELDS]
+        if state: values.append(state)
+        data = self._dumps(values)
+        return legacy.bytes(data)
+
+    def loads(self, data, cls):
+        if legacy.is_bytes(data): data = data.decode("utf-8")
+        values = json.loads(data)
+        fields = self.__class__.FIELDS
+        state = dict(zip(fields, values))
+        if len(values) > len(fields): state.update(values[-1])
+        state["dirty"] = False
+        session = cls.__new__(cls)
+        session.__setstate__(state)
+        return session
+
+    def validate(self, value):
+        self._dumps(value)
+
+    def _dumps(self, value):
+        try: return json.dumps(value, separators = (",", ":"))
+        except (TypeError, ValueError) as exception:
+            raise exceptions.OperationalError(
+                message = "Session value not serializable by '%s' serializer: %s" %\
+                    (self.__class__.name, str(exception))
+            )
+
+SERIALIZERS = dict(
+    pickle = PickleSerializer,
+    json = JSONSerializer
+)
+""" The map associating the name of the serializers with the classes
+that implement them, used for the resolution of the configuration """
+
+def new_serializer(name):
+    serializer_c = SERIALIZERS.get(name, None)
+    if not serializer_c: raise exceptions.OperationalError(
+        message = "Invalid session serializer '%s'" % name
+    )
+    return serializer_c()
+
 class Session(object):
     """
     Abstract session class to be used as a reference in
@@ -67,6 +178,11 @@ class Session(object):
     under this class and reused in the concrete classes.
     """
 
+    SERIALIZER = PickleSerializer()
+    """ The serializer to be used to convert the session into the
+    payload that is stored or transmitted (and back), may be changed
+    for the backends using the session serializer configuration """
+
     def __init__(
         self,
         name = "session",
@@ -234,6 +350,20 @@ class Session(object):
         current = time.time()
         return self.expire - current
 
+    @classmethod
+    def _dumps(cls, session):
+        return cls.SERIALIZER.dumps(session)
+
+    @classmethod
+    def _loads(cls, data):
+        return cls.SERIALIZER.loads(data, cls)
+
+    @classmethod
+    def _load_serializer(cls):
+        name = config.conf("SESSION_SERIALIZER", None)
+        if not name: return
+        cls.SERIALIZER = new_serializer(name)
+
     def _gen_sid(self):
         token_s = str(uuid.uuid4())
         token_s = legacy.bytes(token_s)
@@ -294,6 +424,7 @@ class DataSession(Session):
         except KeyError: return Session.__getitem__(self, key)
 
     def __setitem__(self, key, value):
+        self.__class__.SERIALIZER.validate(value)
         self.mark(); return self.data.__setitem__(key, value)
 
     def __delitem__(self, key):
@@ -394,30 +525,45 @@ class FileSession(DataSession):
     result of opening a file in shelve mode, this is a global
     object and only one instance should exist per process """
 
+    LOCK = threading.RLock()
+    """ The lock that controls the access to the shelve object,
+    required as the shelve is not thread safe and multiple requests
+    may be handled concurrently by the same process """
+
     def __init__(self, name = "file", *args, **kwargs):
         DataSession.__init__(self, name = name, *args, **kwargs)
         self["sid"] = self.sid
 
     @classmethod
     def new(cls, *args, **kwargs):
-        if cls.SHELVE == None: cls.open()
         session = cls(*args, **kwargs)
-        cls.SHELVE[session.sid] = session
+        cls.LOCK.acquire()
+        try:
+            if cls.SHELVE == None: cls.open()
+            cls.SHELVE[session.sid] = session
+        finally:
+            cls.LOCK.release()
         return session
 
     @classmethod
     def get_s(cls, sid, request = None):
-        if cls.SHELVE == None: cls.open()
-        session = cls.SHELVE.get(sid, None)
-        if not session: return session
-        is_expired = session.is_expired()
-        if is_expired: cls.expire(sid)
+        cls.LOCK.acquire()
+        try:
+            if cls.SHELVE == None: cls.open()
+            session = cls.SHELVE.get(sid, None)
+            if not session: return session
+            is_expired = session.is_expired()
+            if is_expired: cls.expire(sid)
+        finally:
+            cls.LOCK.release()
         session = None if is_expired else session
         return session
 
     @classmethod
     def expire(cls, sid):
-        del cls.SHELVE[sid]
+        cls.LOCK.acquire()
+        try: del cls.SHELVE[sid]
+        finally: cls.LOCK.release()
 
     @classmethod
     def count(cls):
@@ -473,13 +619,204 @@ class FileSession(DataSession):
 
     def sync(self, secure = None):
         cls = self.__class__
-        if secure == None:
-            secure = cls.db_secure()
-        if secure:
-            cls.SHELVE.close()
-            cls.open()
-        else:
-            cls.SHELVE.sync()
+        cls.LOCK.acquire()
+        try:
+            if secure == None:
+                secure = cls.db_secure()
+            if secure:
+                cls.SHELVE.close()
+                cls.open()
+            else:
+                cls.SHELVE.sync()
+        finally:
+            cls.LOCK.release()
+
+class SqliteSession(DataSession):
+
+    CONNECTION = None
+    """ Global connection to the sqlite database that stores the
+    sessions (one row per session), only one connection should
+    exist per process (re-opened after a fork) """
+
+    PID = None
+    """ The identifier of the process that has opened the current
+    connection, used to detect the usage of the connection in a
+    child (forked) process, where it must be re-opened """
+
+    PATH = None
+    """ The (absolute) path to the file of the sqlite database that
+    has been opened, used for the re-opening of the connection """
+
+    LOCK = threading.RLock()
+    """ The lock that controls the access to the connection, as
+    multiple requests may be handled concurrently by the process """
+
+    GC_COUNT = 1000
+    """ The maximum number of expired sessions that are removed
+    in a single (incremental) garbage collection operation """
+
+    GC_INTERVAL = 60.0
+    """ The minimum interval in seconds between two (incremental)
+    garbage collection operations of the same process """
+
+    GC_TIME = 0.0
+    """ The timestamp of the last garbage collection operation """
+
+    def __init__(self, name = "sqlite", *args, **kwargs):
+        DataSession.__init__(self, name = name, *args, **kwargs)
+        self["sid"] = self.sid
+
+    @classmethod
+    def new(cls, *args, **kwargs):
+        session = cls(*args, **kwargs)
+        cls._store(session)
+        return session
+
+    @classmethod
+    def get_s(cls, sid, request = None):
+        rows = cls._execute(
+            "select data, expire from sessions where sid = ?",
+            (sid,),
+            fetch = True
+        )
+        if not rows: return None
+        data, expire = rows[0]
+        is_expired = time.time() >= expire
+        if is_expired: cls.expire(sid)
+        if is_expired: return None
+        return cls._loads(bytes(data))
+
+    @classmethod
+    def expire(cls, sid):
+        cls._execute("delete from sessions where sid = ?", (sid,))
+
+    @classmethod
+    def count(cls):
+        rows = cls._execute(
+            "select count(*) from sessions where expire > ?",
+            (time.time(),),
+            fetch = True
+        )
+        return rows[0][0]
+
+    @classmethod
+    def all(cls):
+        sessions = dict()
+        rows = cls._execute(
+            "select sid, data from sessions where expire > ?",
+            (time.time(),),
+            fetch = True
+        )
+        for sid, data in rows:
+            try: session = cls._loads(bytes(data))
+            except: continue
+            sessions[sid] = session
+        return sessions
+
+    @classmethod
+    def open(cls, file_path = "session.sqlite"):
+        cls._load_serializer()
+        base_path = config.conf("APPIER_BASE_PATH", "")
+        base_path = config.conf("SESSION_FILE_PATH", base_path)
+        if base_path and not os.path.exists(base_path): os.makedirs(base_path)
+        file_path = os.path.join(base_path, file_path)
+        file_path = os.path.abspath(file_path)
+        cls.LOCK.acquire()
+        try:
+            # opens the connection in autocommit mode (every statement is its
+            # own transaction) with a busy timeout, so that multiple processes
+            # may share the same file, with the wal journal allowing the reads
+            # to run concurrently with the writes
+            cls.CONNECTION = sqlite3.connect(
+                file_path,
+                timeout = 30.0,
+                isolation_level = None,
+                check_same_thread = False
+            )
+            cls.PID = os.getpid()
+            cls.PATH = file_path
+            cls.CONNECTION.execute("pragma journal_mode = wal")
+            cls.CONNECTION.execute("pragma synchronous = normal")
+            cls.CONNECTION.execute(
+                "create table if not exists sessions (" +\
+                "sid text primary key, data blob, expire real)"
+            )
+            cls.CONNECTION.execute(
+                "create index if not exists sessions_expire on sessions (expire)"
+            )
+        finally:
+            cls.LOCK.release()
+        cls.gc()
+
+    @classmethod
+    def close(cls):
+        cls.LOCK.acquire()
+        try:
+            if not cls.CONNECTION: return
+            cls.CONNECTION.close()
+            cls.CONNECTION = None
+            cls.PID = None
+            cls.PATH = None
+        finally:
+            cls.LOCK.release()
+
+    @classmethod
+    def empty(cls):
+        cls._execute("delete from sessions")
+
+    @classmethod
+    def gc(cls, count = None):
+        """
+        Runs an incremental garbage collection operation, removing
+        (at most) the provided number of expired sessions, the ones
+        that have expired first are removed first (using the index
+        on the expire column), so that no complete scan is required.
+
+        :type count: int
+        :param count: The maximum number of expired sessions to be
+        removed, if not provided the default batch size is used.
+        :rtype: int
+        :return: The number of sessions that have been removed.
+        """
+
+        count = count or cls.GC_COUNT
+        cls.GC_TIME = time.time()
+        return cls._execute(
+            "delete from sessions where sid in (select sid from sessions " +\
+            "where expire <= ? order by expire limit ?)",
+            (cls.GC_TIME, count)
+        )
+
+    def flush(self, request = None):
+        if not self.is_dirty(): return
+        self.mark(dirty = False)
+        cls = self.__class__
+        cls._store(self)
+        if time.time() - cls.GC_TIME < cls.GC_INTERVAL: return
+        cls.gc()
+
+    @classmethod
+    def _store(cls, session):
+        data = cls._dumps(session)
+        cls._execute(
+            "insert or replace into sessions values (?, ?, ?)",
+            (session.sid, sqlite3.Binary(data), session.expire)
+        )
+
+    @classmethod
+    def _execute(cls, query, args = (), fetch = False):
+        cls.LOCK.acquire()
+        try:
+            # in case the connection has been opened by a different (parent)
+            # process it's discarded (not closed, as it's shared with the parent)
+            # and a new one is opened for the current process
+            if cls.CONNECTION and not cls.PID == os.getpid(): cls.CONNECTION = None
+            if not cls.CONNECTION: cls.open(file_path = cls.PATH or "session.sqlite")
+            cursor = cls.CONNECTION.execute(query, args)
+            if fetch: return cursor.fetchall()
+            return cursor.rowcount
+        finally:
+            cls.LOCK.release()
 
 class RedisSession(DataSession):
 
@@ -488,30 +825,51 @@ class RedisSession(DataSession):
     result of opening a file in shelve mode, this is a global
     object and only one instance should exist per process """
 
-    SERIALIZER = pickle
-    """ The serializer to be used for the values contained in
-    the session (used on top of the class) """
+    PREFIX = "appier:session:"
+    """ The prefix to be used in the keys of the sessions, so that
+    the sessions may co-exist with other values in the same database
+    (may be changed using the session prefix configuration) """
+
+    BATCH = 100
+    """ The number of keys that are retrieved (and loaded) at once
+    while iterating over the complete set of sessions """
+
+    SLIDE_RATIO = 0.5
+    """ The ratio of the lifetime of a session below which an
+    unchanged session is still re-stored on flush, so that the
+    expiration of the session is pushed further (sliding) """
 
     def __init__(self, name = "redis", *args, **kwargs):
         DataSession.__init__(self, name = name, *args, **kwargs)
+        self.lifetime = self.expire - self.create
         self["sid"] = self.sid
 
+    def __getstate__(self):
+        state = DataSession.__getstate__(self)
+        state.update(
+            lifetime = self.lifetime
+        )
+        return state
+
+    def __setstate__(self, state):
+        DataSession.__setstate__(self, state)
+        lifetime = state.get("lifetime", None)
+        if lifetime == None: lifetime = self.expire - self.create
+        self.lifetime = lifetime
+
     @classmethod
     def new(cls, *args, **kwargs):
         if cls.REDIS == None: cls.open()
         session = cls(*args, **kwargs)
-        data = cls.SERIALIZER.dumps(session)
-        timeout = session.timeout()
-        timeout = int(timeout)
-        cls.REDIS.setex(session.sid, data, timeout)
+        cls._store(session)
         return session
 
     @classmethod
     def get_s(cls, sid, request = None):
         if cls.REDIS == None: cls.open()
-        data = cls.REDIS.get(sid)
+        data = cls.REDIS.get(cls.PREFIX + sid)
         if not data: return data
-        session = cls.SERIALIZER.loads(data)
+        session = cls._loads(data)
         is_expired = session.is_expired()
         if is_expired: cls.expire(sid)
         session = None if is_expired else session
@@ -519,49 +877,104 @@ class RedisSession(DataSession):
 
     @classmethod
     def expire(cls, sid):
-        cls.REDIS.delete(sid)
+        if cls.REDIS == None: cls.open()
+        pipeline = cls.REDIS.pipeline()
+        pipeline.delete(cls.PREFIX + sid)
+        pipeline.zrem(cls._index(), sid)
+        pipeline.execute()
 
     @classmethod
     def count(cls):
+        # removes the (already expired) sessions from the index and
+        # then retrieves its cardinality, as the index is kept in sync
+        # with the sessions no iteration over the keys is required
         if cls.REDIS == None: cls.open()
-        sids = cls.REDIS.keys()
-        return len(sids)
+        pipeline = cls.REDIS.pipeline()
+        pipeline.zremrangebyscore(cls._index(), "-inf", time.time())
+        pipeline.zcard(cls._index())
+        _removed, count = pipeline.execute()
+        return count
 
     @classmethod
     def all(cls):
         if cls.REDIS == None: cls.open()
         sessions = dict()
-        sids = cls.REDIS.keys()
-        for sid in sids:
-            data = cls.REDIS.get(sid)
-            try: session = cls.SERIALIZER.loads(data)
-            except: continue
-            sessions[sid] = session
+        for keys in cls._batches():
+            values = cls.REDIS.mget(keys)
+            for key, data in zip(keys, values):
+                if not data: continue
+                try: session = cls._loads(data)
+                except: continue
+                sessions[session.sid] = session
         return sessions
 
     @classmethod
     def open(cls):
         cls.REDIS = redisdb.get_connection()
+        cls.PREFIX = config.conf("SESSION_PREFIX", cls.PREFIX)
+        cls._load_serializer()
 
     @classmethod
     def empty(cls):
+        # removes only the keys under the prefix of the sessions (and
+        # the index), leaving any other values of the database intact
         if cls.REDIS == None: cls.open()
-        cls.REDIS.flushdb()
+        for keys in cls._batches(): cls.REDIS.delete(*keys)
+        cls.REDIS.delete(cls._index())
 
     def flush(self, request = None):
-        if not self.is_dirty(): return
+        if not self.is_dirty() and not self.is_stale(): return
         self.mark(dirty = False)
         cls = self.__class__
-        data = cls.SERIALIZER.dumps(self)
-        timeout = self.timeout()
-        timeout = int(timeout)
-        cls.REDIS.setex(self.sid, data, timeout)
+        self.expire = time.time() + self.lifetime
+        cls._store(self)
+
+    def is_stale(self):
+        return self.timeout() < self.lifetime * self.__class__.SLIDE_RATIO
+
+    @classmethod
+    def _store(cls, session):
+        # stores the session and updates its expiration in the index
+        # in a single round-trip, note that the raw command is used for
+        # the index as its signature differs among the client versions
+        if cls.REDIS == None: cls.open()
+        data = cls._dumps(session)
+        timeout = max(int(session.timeout()), 1)
+        pipeline = cls.REDIS.pipeline()
+        pipeline.set(cls.PREFIX + session.sid, data, ex = timeout)
+        pipeline.execute_command("ZADD", cls._index(), session.expire, session.sid)
+        pipeline.execute()
+
+    @classmethod
+    def _batches(cls):
+        # iterates over the keys of the sessions using the (cursor based)
+        # scan operation, yielding them in batches so that each batch
+        # may be retrieved with a single operation, the index is skipped
+        index = cls._index()
+        keys = []
+        pattern = cls.PREFIX + "*"
+        for key in cls.REDIS.scan_iter(match = pattern, count = cls.BATCH):
+            if legacy.str(key) == index: continue
+            keys.append(key)
+            if len(keys) < cls.BATCH: continue
+            yield keys
+            keys = []
+        if keys: yield keys
+
+    @classmethod
+    def _index(cls):
+        return cls.PREFIX + "index"
 
 class ClientSession(DataSession):
 
-    SERIALIZER = pickle
-    """ The serializer to be used for the values contained in
-    the session (used on top of the class) """
+    SERIALIZER = PickleSerializer()
+    """ The serializer to be used for the session, the payload is
+    only loaded after its signature is verified, the (compact and
+    safer) json serializer may be used instead for JSON values """
+
+    DIGEST = hashlib.sha256
+    """ The digest algorithm used in the signature (hmac) of the
+    payload of the session, ensuring that it has not been changed """
 
     COOKIE_LIMIT = 4096
     """ The limit (in bytes) of a cookie to be properly handled
@@ -578,7 +991,8 @@ class ClientSession(DataSession):
         data = base64.b64decode(data_b64)
         data = zlib.decompress(data)
         data = cls._verify(data, request)
-        session = cls.SERIALIZER.loads(data)
+        if data == None: return None
+        session = cls._loads(data)
         is_expired = session.is_expired()
         if is_expired: cls.expire(sid)
         session = None if is_expired else session
@@ -588,7 +1002,7 @@ class ClientSession(DataSession):
     def _sign(cls, data, request):
         secret = cls._secret(request)
         secret = legacy.bytes(secret)
-        digest = hmac.new(secret, data).hexdigest()
+        digest = hmac.new(secret, data, cls.DIGEST).hexdigest()
         digest = legacy.bytes(digest)
         data = digest + b":" + data
         return data
@@ -598,14 +1012,31 @@ class ClientSession(DataSession):
         secret = cls._secret(request)
         secret = legacy.bytes(secret)
         digest, data = data.split(b":", 1)
-        expected = hmac.new(secret, data).hexdigest()
+        expected = hmac.new(secret, data, cls.DIGEST).hexdigest()
         expected = legacy.bytes(expected)
-        valid = digest == expected
+
+        # a digest with a different size is considered to come from a
+        # session created with a previous (incompatible) format and as
+        # such it's ignored, instead of being handled as an attack
+        if not len(digest) == len(expected): return None
+        valid = cls._compare(digest, expected)
         if not valid: raise exceptions.SecurityError(
             message = "Invalid signature for message"
         )
         return data
 
+    @classmethod
+    def _compare(cls, first, second):
+        # uses the constant time comparison of the digests (avoiding timing
+        # attacks) and in case it's not available (python < 2.7.7) falls back
+        # to an equivalent pure python implementation of such comparison
+        if hasattr(hmac, "compare_digest"): return hmac.compare_digest(first, second)
+        if not len(first) == len(second): return False
+        result = 0
+        for first_b, second_b in zip(bytearray(first), bytearray(second)):
+            result |= first_b ^ second_b
+        return result == 0
+
     @classmethod
     def _secret(cls, request):
         owner = request.owner
@@ -617,7 +1048,7 @@ class ClientSession(DataSession):
         if not self.is_dirty(): return
         self.mark(dirty = False)
         cls = self.__class__
-        data = cls.SERIALIZER.dumps(self)
+        data = cls._dumps(self)
         data = cls._sign(data, request)
         data = zlib.compress(data)
         data_b64 = base64.b64encode(data)
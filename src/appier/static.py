@@ -0,0 +1,426 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Hive Appier Framework
+# Copyright (c) 2008-2016 Hive Solutions Lda.
+#
+# This file is part of Hive Appier Framework.
+#
+# Hive Appier Framework is free software: you can redistribute it and/or modify
+# it under the terms of the Apache License as published by the Apache
+# Foundation, either version 2.0 of the License, or (at your option) any
+# later version.
+#
+# Hive Appier Framework is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# Apache License for more details.
+#
+# You should have received a copy of the Apache License along with
+# Hive Appier Framework. If not, see <http://www.apache.org/licenses/>.
+
+__author__ = "João Magalhães <joamag@hive.pt>"
+""" The author(s) of the module """
+
+__version__ = "1.0.0"
+""" The version of the module """
+
+__revision__ = "$LastChangedRevision$"
+""" The revision number of the module """
+
+__date__ = "$LastChangedDate$"
+""" The last change date of the module """
+
+__copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
+""" The copyright for the module """
+
+__license__ = "Apache License, Version 2.0"
+""" The license for the module """
+
+import os
+import stat
+import time
+import mmap
+import threading
+import mimetypes
+import collections
+import email.utils
+
+from . import cache
+
+BUFFER_SIZE = 4096
+""" The default size of the chunks (in bytes) that are read from
+the file and yielded to the server, when the file is read using
+the (classic) read operation of the file object """
+
+MMAP_SIZE = 65536
+""" The size of the chunks (in bytes) that are yielded from the
+memory map of the file, as no system call is required for each of
+the chunks larger values reduce the overhead of the iteration """
+
+STAT_INTERVAL = 1.0
+""" The default number of seconds for which the metadata of a
+static resource is considered valid, before it's revalidated
+using a new stat operation on the file """
+
+STAT_SIZE = 4096
+""" The default maximum number of entries of the stat cache,
+after which the least recently used entries are evicted """
+
+FILE_LIMIT = 65536
+""" The default maximum size (in bytes) of a file for it to be
+eligible to be stored in the (in memory) file cache """
+
+class Resource(object):
+    """
+    Metadata of a static resource (file), retrieved with a single
+    stat operation and complemented with the values derived from it
+    (eg: mime type and etag) so that they are computed only once.
+    """
+
+    def __init__(self, file_path, url_path):
+        self.file_path = file_path
+        self.url_path = url_path
+        self.exists = False
+        self.is_dir = False
+        self.size = 0
+        self.modified = 0.0
+        self.type = None
+        self.etag = None
+        self.checked = 0.0
+        self._headers = dict()
+
+    def load(self):
+        # runs the stat operation for the file and uses it to populate
+        # the metadata values, in case of failure the file is considered
+        # not to exist (same behavior as the exists function)
+        try: result = os.stat(self.file_path)
+        except (EnvironmentError, ValueError): result = None
+        self.exists = True if result else False
+        self.is_dir = True if result and stat.S_ISDIR(result.st_mode) else False
+        self.size = result.st_size if result else 0
+        self.modified = result.st_mtime if result else 0.0
+
+        # computes the derived values, these are the ones that are
+        # otherwise computed for every single request for the file
+        self.type, _encoding = mimetypes.guess_type(self.url_path, strict = True)
+        self.etag = "appier-%.2f" % self.modified
+        self.checked = time.time()
+        self._headers = dict()
+
+    def headers(self, cache, cache_s):
+        """
+        Retrieves the (pre-built) sequence of header tuples to be sent
+        for the resource, taking into account if caching is enabled.
+
+        :type cache: bool
+        :param cache: If the resource should be cached by the client.
+        :type cache_s: int
+        :param cache_s: The number of seconds for the client cache.
+        :rtype: Tuple
+        :return: The sequence of name and value tuples for the headers.
+        """
+
+        key = (cache, cache_s)
+        headers = self._headers.get(key, None)
+        if headers: return headers
+        if cache: cache_control = "public, max-age=%d" % cache_s
+        else: cache_control = "no-cache, must-revalidate"
+        headers = (("Etag", self.etag), ("Cache-Control", cache_control))
+        self._headers[key] = headers
+        return headers
+
+class StatCache(object):
+    """
+    Cache of the metadata of the static resources, indexed by both
+    the file path and the url path (that determines the mime type).
+
+    Entries are revalidated (new stat operation) after the interval
+    has passed since their last check, meaning that during that time
+    (eg: not modified responses) no system call is performed, an
+    interval of zero disables the caching of the entries.
+
+    The entries are stored in a (thread safe) bounded cache that
+    evicts the least recently used ones once the size is reached.
+    """
+
+    def __init__(self, interval = STAT_INTERVAL, size = STAT_SIZE):
+        self.interval = interval
+        self.size = size
+        self.entries = cache.BoundedCache(
+            name = "stat",
+            size = size,
+            bytes = 0,
+            policy = "lru",
+            ttl = interval
+        )
+        self._expires = (None, None)
+
+    def get(self, file_path, url_path):
+        key = (file_path, url_path)
+        resource = self.entries.get(key, None)
+        if resource: return resource
+        resource = Resource(file_path, url_path)
+        resource.load()
+        if not self.interval: return resource
+        self.entries.set(key, resource)
+        return resource
+
+    def expires(self, cache_s):
+        """
+        Retrieves the (http) date string to be used as the expires
+        header value, for the current time incremented by the provided
+        number of seconds, the value is formatted once per second.
+
+        The formatting is locale independent so that there's no need
+        to change the locale of the process for it.
+
+        :type cache_s: int
+        :param cache_s: The number of seconds to be added to the
+        current time for the expiration of the resource.
+        :rtype: String
+        :return: The formatted (http) date for the expiration.
+        """
+
+        current = int(time.time())
+        key, value = self._expires
+        if key == (current, cache_s): return value
+        value = email.utils.formatdate(current + cache_s, usegmt = True)
+        self._expires = ((current, cache_s), value)
+        return value
+
+    def clear(self):
+        self.entries.clear()
+
+    def info(self):
+        return dict(
+            entries = len(self.entries),
+            hits = self.entries.hits,
+            misses = self.entries.misses
+        )
+
+class FileCache(object):
+    """
+    Bounded in memory cache of the contents of small (static) files,
+    with a total memory cap and least recently used eviction.
+
+    The entries are invalidated by the modification time of the file
+    (as provided by the caller) so that changed files are re-read, a
+    total size of zero disables the cache.
+    """
+
+    def __init__(self, size = 0, limit = FILE_LIMIT):
+        self.size = size
+        self.limit = limit
+        self.used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.entries = collections.OrderedDict()
+        self.lock = threading.RLock()
+
+    def accepts(self, size):
+        """
+        Determines if a file with the provided size is eligible to be
+        stored in the cache, taking into account the cache limits.
+
+        :type size: int
+        :param size: The size of the file in bytes.
+        :rtype: bool
+        :return: If the file may be stored in (served from) the cache.
+        """
+
+        if not self.size: return False
+        return size <= self.limit and size <= self.size
+
+    def get(self, file_path, modified):
+        """
+        Retrieves the contents of the file, from the cache in case there's
+        a valid entry for the modification time or from the file system
+        otherwise (storing the contents in the cache).
+
+        :type file_path: String
+        :param file_path: The path to the file to be retrieved.
+        :type modified: float
+        :param modified: The modification time of the file, used to
+        validate the cache entry.
+        :rtype: String
+        :return: The (byte) contents of the file.
+        """
+
+        self.lock.acquire()
+        try:
+            entry = self.entries.pop(file_path, None)
+            if entry and entry[0] == modified:
+                self.entries[file_path] = entry
+                self.hits += 1
+                return entry[1]
+            if entry: self.used -= len(entry[1])
+            self.misses += 1
+        finally:
+            self.lock.release()
+
+        file = open(file_path, "rb")
+        try: data = file.read()
+        finally: file.close()
+
+        self.lock.acquire()
+        try:
+            previous = self.entries.pop(file_path, None)
+            if previous: self.used -= len(previous[1])
+            self.entries[file_path] = (modified, data)
+            self.used += len(data)
+            while self.used > self.size and self.entries:
+                _file_path, (_modified, _data) = self.entries.popitem(last = False)
+                self.used -= len(_data)
+                self.evictions += 1
+        finally:
+            self.lock.release()
+
+        return data
+
+    def clear(self):
+        self.lock.acquire()
+        try:
+            self.entries.clear()
+            self.used = 0
+        finally:
+            self.lock.release()
+
+    def info(self):
+        return dict(
+            entries = len(self.entries),
+            used = self.used,
+            size = self.size,
+            hits = self.hits,
+            misses = self.misses,
+            evictions = self.evictions
+        )
+
+class FileRange(object):
+    """
+    Iterable over a range of bytes of a file, to be used as the
+    body of a response that serves a (static) file.
+
+    The range may be handed to the file wrapper of the (wsgi) server
+    so that the server is able to use zero copy strategies (eg: the
+    sendfile system call), otherwise the contents are iterated from
+    a memory map of the file (avoiding a read call per chunk), falling
+    back to the classic read operation when no map is possible.
+
+    In case the (cached) contents of the file are provided they are
+    used directly, the complete contents are sent as is and a range
+    of them is sliced from a memory view of the contents.
+    """
+
+    def __init__(
+        self,
+        file_path,
+        start,
+        size,
+        total = None,
+        file = None,
+        data = None,
+        buffer_size = BUFFER_SIZE
+    ):
+        self.file_path = file_path
+        self.start = start
+        self.size = size
+        self.total = total
+        self.file = file
+        self.data = data
+        self.buffer_size = buffer_size
+        self.virtual = not file == None or not data == None
+
+    def __iter__(self):
+        if not self.data == None:
+            for chunk in self._chunks_d(self.data): yield chunk
+            return
+
+        file = self.open()
+        try:
+            mapping = self._mmap(file)
+            if mapping: chunks = self._chunks_m(mapping)
+            else: chunks = self._chunks(file)
+            for chunk in chunks: yield chunk
+        finally:
+            self.close()
+
+    def open(self):
+        if self.file: return self.file
+        self.file = open(self.file_path, "rb")
+        return self.file
+
+    def close(self):
+        if not self.file: return
+        self.file.close()
+        self.file = None
+
+    def wrappable(self):
+        """
+        Determines if the range may be handed to a (wsgi) file wrapper,
+        that sends the file from the current position until the end of
+        it, so only ranges that reach the end of a file in disk (not a
+        virtual, in memory, file) are considered to be valid.
+
+        :rtype: bool
+        :return: If the range can be sent using a file wrapper.
+        """
+
+        if self.virtual: return False
+        if self.total == None: return False
+        return self.start + self.size == self.total
+
+    def wrap(self, wrapper):
+        """
+        Wraps the range using the provided (wsgi) file wrapper, the file
+        is opened and positioned at the start of the range so that the
+        server sends it from that point, closing it at the end.
+
+        :type wrapper: Class
+        :param wrapper: The file wrapper class provided by the server
+        (eg: the wsgi file wrapper value of the environment).
+        :rtype: Object
+        :return: The iterable (wrapper) to be returned to the server.
+        """
+
+        file = self.open()
+        file.seek(self.start)
+        return wrapper(file, self.buffer_size)
+
+    def _chunks_d(self, data):
+        end = min(self.start + self.size, len(data))
+        if self.start == 0 and end == len(data): yield data; return
+        if self.start >= end: return
+        yield memoryview(data)[self.start:end].tobytes()
+
+    def _chunks(self, file):
+        file.seek(self.start)
+        size = self.size
+        while size:
+            data = file.read(min(size, self.buffer_size))
+            if not data: break
+            size -= len(data)
+            yield data
+
+    def _chunks_m(self, mapping):
+        try:
+            position = self.start
+            end = min(self.start + self.size, len(mapping))
+            buffer_size = max(self.buffer_size, MMAP_SIZE)
+            while position < end:
+                _position = min(position + buffer_size, end)
+                yield mapping[position:_position]
+                position = _position
+        finally:
+            mapping.close()
+
+    def _mmap(self, file):
+        # the virtual (in memory) files are not possible to be mapped
+        # (no file descriptor) and the small ranges are read at once
+        # as the cost of the map operation is not compensated
+        if self.virtual or self.size < MMAP_SIZE: return None
+        try: fileno = file.fileno()
+        except (AttributeError, EnvironmentError, ValueError): return None
+        try: return mmap.mmap(fileno, 0, access = mmap.ACCESS_READ)
+        except (EnvironmentError, ValueError): return None
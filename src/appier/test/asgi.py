@@ -0,0 +1,252 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Hive Appier Framework
+# Copyright (c) 2008-2016 Hive Solutions Lda.
+#
+# This file is part of Hive Appier Framework.
+#
+# Hive Appier Framework is free software: you can redistribute it and/or modify
+# it under the terms of the Apache License as published by the Apache
+# Foundation, either version 2.0 of the License, or (at your option) any
+# later version.
+#
+# Hive Appier Framework is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# Apache License for more details.
+#
+# You should have received a copy of the Apache License along with
+# Hive Appier Framework. If not, see <http://www.apache.org/licenses/>.
+
+__author__ = "João Magalhães <joamag@hive.pt>"
+""" The author(s) of the module """
+
+__version__ = "1.0.0"
+""" The version of the module """
+
+__revision__ = "$LastChangedRevision$"
+""" The revision number of the module """
+
+__date__ = "$LastChangedDate$"
+""" The last change date of the module """
+
+__copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
+""" The copyright for the module """
+
+__license__ = "Apache License, Version 2.0"
+""" The license for the module """
+
+import json
+import unittest
+import threading
+
+import appier
+
+class ASGITestApp(appier.App):
+
+    def routes(self):
+        return [
+            (("GET",), "/hello", self.hello),
+            (("GET",), "/delayed/<int:id>", self.delayed),
+            (("POST",), "/echo", self.echo),
+            (("POST",), "/upload", self.upload),
+            (("GET",), "/thread", self.thread)
+        ]
+
+    def hello(self):
+        return "hello"
+
+    def delayed(self, id, delay = 0.0):
+        import asyncio
+        self.request.set_header("X-Id", str(id))
+        return asyncio.sleep(float(delay), result = dict(id = id))
+
+    def echo(self):
+        return self.request.data_j
+
+    def upload(self):
+        file = self.field("file")
+        return dict(name = self.field("name"), size = len(file.read()))
+
+    def thread(self):
+        return dict(thread = threading.current_thread().ident)
+
+class ASGITest(unittest.TestCase):
+
+    def setUp(self):
+        if not appier.legacy.PYTHON_ASYNC: return
+        import asyncio
+        self.app = ASGITestApp()
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        if not appier.legacy.PYTHON_ASYNC: return
+        self.loop.close()
+        self.app.unload()
+
+    def test_environ(self):
+        if not appier.legacy.PYTHON_ASYNC: return
+
+        environ = self.app.asgi_environ(dict(
+            type = "http",
+            method = "GET",
+            path = "/hello",
+            query_string = b"name=world",
+            headers = [
+                (b"content-type", b"application/json"),
+                (b"x-value", b"1"),
+                (b"x-value", b"2")
+            ]
+        ), b"body")
+
+        self.assertEqual(environ["REQUEST_METHOD"], "GET")
+        self.assertEqual(environ["PATH_INFO"], "/hello")
+        self.assertEqual(environ["QUERY_STRING"], "name=world")
+        self.assertEqual(environ["CONTENT_TYPE"], "application/json")
+        self.assertEqual(environ["CONTENT_LENGTH"], "4")
+        self.assertEqual(environ["HTTP_X_VALUE"], "1,2")
+        self.assertEqual(environ["wsgi.input"].read(), b"body")
+
+    def test_http(self):
+        if not appier.legacy.PYTHON_ASYNC: return
+
+        status, headers, body = self._run(self._call("GET", "/hello"))
+        self.assertEqual(status, 200)
+        self.assertEqual(headers["content-type"], "text/plain")
+        self.assertEqual(body, b"hello")
+
+        status, headers, body = self._run(self._call("GET", "/delayed/1"))
+        self.assertEqual(status, 200)
+        self.assertEqual(headers["x-id"], "1")
+        self.assertEqual(json.loads(body.decode("utf-8")), dict(id = 1))
+
+        status, headers, body = self._run(self._call(
+            "POST",
+            "/echo",
+            body = b"{\"value\": 1}",
+            headers = [(b"content-type", b"application/json")]
+        ))
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body.decode("utf-8")), dict(value = 1))
+
+        status, headers, body = self._run(self._call("GET", "/missing"))
+        self.assertEqual(status, 404)
+        self.assertEqual(json.loads(body.decode("utf-8"))["name"], "NotFoundError")
+
+    def test_executor(self):
+        if not appier.legacy.PYTHON_ASYNC: return
+
+        status, _headers, body = self._run(self._call("GET", "/thread"))
+        self.assertEqual(status, 200)
+        self.assertNotEqual(json.loads(body.decode("utf-8"))["thread"], threading.current_thread().ident)
+        self.assertEqual(self.app.request, self.app.mock)
+
+    def test_body(self):
+        if not appier.legacy.PYTHON_ASYNC: return
+
+        data = b"--boundary\r\n" +\
+            b"Content-Disposition: form-data; name=\"name\"\r\n\r\n" +\
+            b"value\r\n" +\
+            b"--boundary\r\n" +\
+            b"Content-Disposition: form-data; name=\"file\"; filename=\"file.bin\"\r\n" +\
+            b"Content-Type: application/octet-stream\r\n\r\n" +\
+            b"x" * 4096 + b"\r\n" +\
+            b"--boundary--\r\n"
+        chunks = [data[index:index + 512] for index in range(0, len(data), 512)]
+        headers = [(b"content-type", b"multipart/form-data; boundary=boundary")]
+
+        status, _headers, body = self._run(self._call("POST", "/upload", chunks = chunks, headers = headers))
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body.decode("utf-8")), dict(name = "value", size = 4096))
+
+        self.app.body_max = 1024
+        status, _headers, body = self._run(self._call("POST", "/upload", chunks = chunks, headers = headers))
+        self.assertEqual(status, 413)
+        self.assertEqual(self.received < len(chunks), True)
+
+        status, _headers, body = self._run(self._call("POST", "/echo", chunks = chunks))
+        self.assertEqual(status, 413)
+        self.assertEqual(self.received < len(chunks), True)
+
+        status, _headers, body = self._run(self._call("POST", "/echo", chunks = [b"{\"value\"", b": 1}"]))
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body.decode("utf-8")), dict(value = 1))
+
+    def test_concurrency(self):
+        if not appier.legacy.PYTHON_ASYNC: return
+
+        import asyncio
+
+        count = 20
+        calls = [
+            self._call("GET", "/delayed/%d" % index, query = "delay=%f" % ((count - index) * 0.001))\
+            for index in range(count)
+        ]
+        awaitables = [awaitable for awaitable, _sent in calls]
+        self.loop.run_until_complete(asyncio.gather(*awaitables, loop = self.loop))
+
+        for index, (_awaitable, sent) in enumerate(calls):
+            status, headers, body = self._response(sent)
+            self.assertEqual(status, 200)
+            self.assertEqual(headers["x-id"], str(index))
+            self.assertEqual(json.loads(body.decode("utf-8")), dict(id = index))
+
+        self.assertEqual(self.app.request, self.app.mock)
+
+    def test_wsgi(self):
+        if not appier.legacy.PYTHON_ASYNC: return
+
+        environ = self.app.asgi_environ(dict(
+            type = "http",
+            method = "GET",
+            path = "/delayed/2",
+            query_string = b""
+        ), b"")
+        result = self.app.application(environ, lambda status, headers, *args: None)
+        body = b"".join(result)
+        self.assertEqual(json.loads(body.decode("utf-8")), dict(id = 2))
+
+    def _run(self, call):
+        awaitable, sent = call
+        self.loop.run_until_complete(awaitable)
+        return self._response(sent)
+
+    def _call(self, method, path, query = "", body = b"", headers = [], chunks = None):
+        import asyncio
+
+        chunks = [body] if chunks == None else chunks
+        messages = [
+            dict(type = "http.request", body = chunk, more_body = index < len(chunks) - 1)\
+            for index, chunk in enumerate(chunks)
+        ]
+        sent = []
+        self.received = 0
+
+        @asyncio.coroutine
+        def receive():
+            self.received += 1
+            if messages: return messages.pop(0)
+            return dict(type = "http.disconnect")
+
+        @asyncio.coroutine
+        def send(message):
+            sent.append(message)
+
+        scope = dict(
+            type = "http",
+            method = method,
+            path = path,
+            query_string = query.encode("latin-1"),
+            headers = headers
+        )
+        return self.app.application_asgi(scope, receive, send), sent
+
+    def _response(self, sent):
+        start = sent[0]
+        headers = dict(
+            (name.decode("latin-1").lower(), value.decode("latin-1"))\
+            for name, value in start["headers"]
+        )
+        body = b"".join(message.get("body", b"") for message in sent[1:])
+        return start["status"], headers, body
@@ -0,0 +1,310 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Hive Appier Framework
+# Copyright (c) 2008-2016 Hive Solutions Lda.
+#
+# This file is part of Hive Appier Framework.
+#
+# Hive Appier Framework is free software: you can redistribute it and/or modify
+# it under the terms of the Apache License as published by the Apache
+# Foundation, either version 2.0 of the License, or (at your option) any
+# later version.
+#
+# Hive Appier Framework is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# Apache License for more details.
+#
+# You should have received a copy of the Apache License along with
+# Hive Appier Framework. If not, see <http://www.apache.org/licenses/>.
+
+__author__ = "João Magalhães <joamag@hive.pt>"
+""" The author(s) of the module """
+
+__version__ = "1.0.0"
+""" The version of the module """
+
+__revision__ = "$LastChangedRevision$"
+""" The revision number of the module """
+
+__date__ = "$LastChangedDate$"
+""" The last change date of the module """
+
+__copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
+""" The copyright for the module """
+
+__license__ = "Apache License, Version 2.0"
+""" The license for the module """
+
+import os
+import time
+import shutil
+import tempfile
+import unittest
+import threading
+
+import appier
+
+def square(value, mid = None):
+    return dict(value = value * value, mid = mid)
+
+def fail(mid = None):
+    raise appier.OperationalError(message = "failed")
+
+class MockOwner(object):
+
+    def __init__(self):
+        self.errors = []
+
+    def log_error(self, exception, message = None):
+        self.errors.append(exception)
+
+class AsyncTest(unittest.TestCase):
+
+    def test_queue(self):
+        owner = MockOwner()
+        manager = appier.QueueManager(owner, timeout = 0.01)
+        manager.start()
+
+        event = threading.Event()
+        values = []
+        manager.add(values.append, (1,), dict())
+        manager.add(lambda: event.set(), (), dict())
+        event.wait(5.0)
+
+        self.assertEqual(values, [1])
+        self.assertEqual(manager.info()["depth"], 0)
+
+        manager.stop()
+        manager.thread.join(5.0)
+        self.assertEqual(manager.thread.is_alive(), False)
+
+    def test_pool(self):
+        owner = MockOwner()
+        manager = appier.PoolManager(owner, workers = 4, size = 16)
+        manager.start()
+
+        lock = threading.Lock()
+        values = []
+
+        def append(value):
+            lock.acquire()
+            try: values.append(value)
+            finally: lock.release()
+
+        def fail():
+            raise appier.OperationalError(message = "failed")
+
+        for index in range(10): manager.add(append, (index,), dict())
+        manager.add(fail, (), dict())
+
+        threads = list(manager.threads)
+        manager.stop()
+        for thread in threads: thread.join(5.0)
+
+        info = manager.info()
+        self.assertEqual(sorted(values), list(range(10)))
+        self.assertEqual(len(owner.errors), 1)
+        self.assertEqual(info["submitted"], 11)
+        self.assertEqual(info["completed"], 10)
+        self.assertEqual(info["failed"], 1)
+        self.assertEqual(info["rejected"], 0)
+        self.assertEqual(info["depth"], 0)
+
+    def test_pool_reject(self):
+        owner = MockOwner()
+        manager = appier.PoolManager(owner, workers = 1, size = 1, policy = "reject")
+        manager.start()
+
+        event = threading.Event()
+        manager.add(event.wait, (5.0,), dict())
+        while manager.queue.qsize(): time.sleep(0.001)
+        manager.add(event.wait, (5.0,), dict())
+
+        self.assertRaises(
+            appier.OperationalError,
+            lambda: manager.add(event.wait, (5.0,), dict())
+        )
+        self.assertEqual(manager.info()["rejected"], 1)
+
+        event.set()
+        manager.stop()
+
+    def test_pool_block(self):
+        owner = MockOwner()
+        manager = appier.PoolManager(owner, workers = 1, size = 1, timeout = 0.01)
+        manager.start()
+
+        event = threading.Event()
+        manager.add(event.wait, (5.0,), dict())
+        while manager.queue.qsize(): time.sleep(0.001)
+        manager.add(event.wait, (5.0,), dict())
+
+        self.assertRaises(
+            appier.OperationalError,
+            lambda: manager.add(event.wait, (5.0,), dict())
+        )
+
+        event.set()
+        manager.stop()
+
+    def test_pool_stop(self):
+        owner = MockOwner()
+        manager = appier.PoolManager(owner, workers = 1, size = 1, stop_timeout = 0.1)
+        manager.start()
+
+        event = threading.Event()
+        values = []
+        manager.add(event.wait, (5.0,), dict())
+        while manager.queue.qsize(): time.sleep(0.001)
+        manager.add(values.append, (1,), dict())
+
+        threads = list(manager.threads)
+        start = time.time()
+        manager.stop()
+        self.assertEqual(time.time() - start < 2.0, True)
+        self.assertEqual(manager.threads, [])
+
+        event.set()
+        for thread in threads: thread.join(5.0)
+        self.assertEqual([thread.is_alive() for thread in threads], [False])
+        self.assertEqual(values, [1])
+
+    def test_process(self):
+        app = appier.App()
+        manager = appier.ProcessManager(app, workers = 2)
+        manager.start()
+
+        try:
+            event = threading.Event()
+            results = []
+
+            def callback(result, callback, mid):
+                results.append(result)
+                if len(results) == 2: event.set()
+                return True
+
+            app._async_callback = callback
+            manager.add(square, (3,), dict(), mid = "mid", callback = "http://localhost/")
+            manager.add(fail, (), dict(), callback = "http://localhost/")
+            event.wait(10.0)
+
+            results.sort(key = lambda result: result["result"])
+            self.assertEqual(len(results), 2)
+            self.assertEqual(results[0]["result"], "error")
+            self.assertEqual(results[0]["message"], "failed")
+            self.assertEqual(results[1]["result"], "success")
+            self.assertEqual(results[1]["value"], 9)
+            self.assertEqual(results[1]["mid"], "mid")
+
+            self.assertRaises(
+                appier.OperationalError,
+                lambda: manager.add(square, (threading.Lock(),), dict())
+            )
+
+            info = manager.info()
+            self.assertEqual(info["submitted"], 2)
+            self.assertEqual(info["completed"], 1)
+            self.assertEqual(info["failed"], 1)
+        finally:
+            manager.stop()
+            app.unload()
+
+    def test_durable(self):
+        app = appier.App()
+        path = tempfile.mkdtemp()
+        file_path = os.path.join(path, "async.sqlite")
+
+        try:
+            # adds an item to a manager that is not started (simulating a
+            # crash before the item is handled) and verifies that the item
+            # is recovered and handled by a new manager on the same store
+            manager = appier.DurableManager(app, file_path = file_path)
+            mid = manager.add(square, (3,), dict(), callback = "http://localhost/")
+            manager.close()
+
+            event = threading.Event()
+            results = []
+
+            def callback(result, callback, mid):
+                results.append(result)
+                if len(results) < 2: return False
+                event.set()
+                return True
+
+            app._async_callback = callback
+            manager = appier.DurableManager(
+                app,
+                file_path = file_path,
+                flush = 0.01,
+                backoff = 0.01
+            )
+            manager.start()
+            try:
+                event.wait(10.0)
+                self.assertEqual(len(results), 2)
+                self.assertEqual(results[0], results[1])
+                self.assertEqual(results[1]["result"], "success")
+                self.assertEqual(results[1]["value"], 9)
+
+                for _index in range(100):
+                    info = manager.info()
+                    if info["done"] == 1: break
+                    time.sleep(0.01)
+                self.assertEqual(info["done"], 1)
+                self.assertEqual(info["pending"], 0)
+                self.assertNotEqual(mid, None)
+
+                app._async_callback = lambda result, callback, mid: False
+                manager.retries = 2
+                manager.add(square, (2,), dict(), callback = "http://localhost/")
+                for _index in range(100):
+                    info = manager.info()
+                    if info["failed"] == 1: break
+                    time.sleep(0.01)
+                self.assertEqual(info["failed"], 1)
+            finally:
+                manager.stop()
+        finally:
+            shutil.rmtree(path, ignore_errors = True)
+            app.unload()
+
+    def test_durable_claim(self):
+        app = appier.App()
+        path = tempfile.mkdtemp()
+        file_path = os.path.join(path, "async.sqlite")
+
+        try:
+            # adds some items to a manager that is then closed, releasing
+            # them, so that they may be claimed by the other managers
+            manager = appier.DurableManager(app, file_path = file_path)
+            for value in range(3): manager.add(square, (value,), dict())
+            manager.close()
+
+            # recovers the items in two managers sharing the same store,
+            # only the first one should claim (and schedule) them, as
+            # the second one finds them claimed under a valid lease
+            first = appier.DurableManager(app, file_path = file_path, lease = 0.05)
+            second = appier.DurableManager(app, file_path = file_path)
+            third = appier.DurableManager(app, file_path = file_path)
+            try:
+                first.recover()
+                second.recover()
+                self.assertEqual(len(first.queue), 3)
+                self.assertEqual(len(second.queue), 0)
+
+                # waits for the lease of the first manager to expire (as if
+                # it had crashed) so that the items are claimed by another
+                time.sleep(0.1)
+                second.recover()
+                third.recover()
+                self.assertEqual(len(second.queue), 3)
+                self.assertEqual(len(third.queue), 0)
+            finally:
+                first.connection.close()
+                second.close()
+                third.close()
+        finally:
+            shutil.rmtree(path, ignore_errors = True)
+            app.unload()
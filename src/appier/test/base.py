@@ -37,10 +37,160 @@ __copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
 __license__ = "Apache License, Version 2.0"
 """ The license for the module """
 
+import os
+import json
+import zlib
+import locale
+import binascii
+import time
+import datetime
+import shutil
+import tempfile
 import unittest
+import threading
 
 import appier
 
+from . import mock
+
+class CacheApp(appier.App):
+
+    def __init__(self, *args, **kwargs):
+        appier.App.__init__(self, *args, **kwargs)
+        self.calls = 0
+
+    def routes(self):
+        cache = dict(ttl = 60, vary = ("locale",), tags = (mock.Person, "people"))
+        return [
+            (("GET",), "/people", self.people, False, True, None, cache),
+            (("GET",), "/expiring", self.expiring, False, False, None, 0.05)
+        ]
+
+    def people(self):
+        self.calls += 1
+        return dict(people = [person.name for person in mock.Person.find()])
+
+    def expiring(self):
+        self.calls += 1
+        return "%d" % self.calls
+
+class CompactCodec(appier.JSONCodec):
+
+    separators = (",", ":")
+
+    def __init__(self, *args, **kwargs):
+        appier.JSONCodec.__init__(self, *args, **kwargs)
+        self.encoder = json.JSONEncoder(
+            default = self.default,
+            separators = self.separators
+        )
+
+    def default(self, obj):
+        if isinstance(obj, datetime.datetime): return obj.isoformat()
+        return appier.JSONCodec.default(self, obj)
+
+class StreamApp(appier.App):
+
+    def routes(self):
+        return [
+            (("GET",), "/list", self.list),
+            (("GET",), "/values", self.values),
+            (("GET",), "/stream", self.stream),
+            (("GET",), "/stream/fail", self.stream_fail),
+            (("GET",), "/stream/bound", self.stream_bound)
+        ]
+
+    def list(self):
+        return [0, 1]
+
+    def values(self):
+        return dict(
+            items = [datetime.datetime(2020, 1, index + 1) for index in range(2)],
+            nested = [[dict(index = index)] for index in range(2)]
+        )
+
+    def stream(self):
+        return appier.JSONStream(dict(index = index) for index in range(3))
+
+    def stream_fail(self):
+        def generator():
+            raise appier.OperationalError(message = "Stream failed", code = 400)
+            yield
+        return appier.JSONStream(generator())
+
+    def stream_bound(self):
+        def generator():
+            for index in range(4096):
+                yield dict(index = index, path = self.request.path)
+        return appier.JSONStream(generator())
+
+class LazyApp(appier.App):
+
+    def routes(self):
+        return [
+            (("GET",), "/health", self.health),
+            (("GET",), "/session", self.session),
+            (("GET",), "/locale", self.locale),
+            (("GET",), "/fail", self.fail),
+            (("GET",), "/session/large", self.session_large)
+        ]
+
+    def health(self):
+        return dict(stages = self.request.stages)
+
+    def session(self):
+        self.request.session.get("username", None)
+        return dict(stages = self.request.stages)
+
+    def locale(self):
+        return dict(stages = self.request.stages, value = self.request.locale)
+
+    def fail(self):
+        self.failed = self.request
+        raise appier.OperationalError(message = "Failed", code = 400)
+
+    def session_large(self):
+        data = binascii.hexlify(os.urandom(8192))
+        self.request.session["data"] = appier.legacy.str(data)
+        return dict()
+
+class UploadApp(appier.App):
+
+    def routes(self):
+        return [
+            (("POST",), "/upload", self.upload)
+        ]
+
+    def upload(self):
+        file = self.field("file")
+        return dict(
+            name = self.field("name"),
+            file = file.name,
+            size = len(file.read()),
+            spooled = file.is_spooled(),
+            stream = self.request.data == None
+        )
+
+class ConcurrentApp(appier.App):
+
+    def routes(self):
+        return [
+            (("GET",), "/echo/<int:id>", self.echo_id),
+            (("GET",), "/template/<str:extension>", self.template_e)
+        ]
+
+    def echo_id(self, id, value = None):
+        request = self.request
+        time.sleep(0.001)
+        return "%d:%s:%s:%s" % (id, value, self.request.path, self.request == request)
+
+    def template_e(self, extension, value = None):
+        time.sleep(0.001)
+        return self.template(
+            "hello." + extension,
+            value = value
+        )
+
 class BaseTest(unittest.TestCase):
 
     def setUp(self):
@@ -107,3 +257,372 @@ class BaseTest(unittest.TestCase):
 
         result = self.app.to_locale("bye", locale = "pt_pt", fallback = False)
         self.assertEqual(result, "bye")
+
+    def test_concurrency(self):
+        templates_path = tempfile.mkdtemp()
+        try:
+            for extension in ("html", "txt"):
+                file_path = os.path.join(templates_path, "hello." + extension)
+                file = open(file_path, "wb")
+                try: file.write(b"{{ value }}:{{ request.path }}")
+                finally: file.close()
+            app = ConcurrentApp()
+            app.templates_path = templates_path
+            try: self._test_concurrency(app)
+            finally: app.unload()
+        finally:
+            shutil.rmtree(templates_path)
+
+    def test_route_cache(self):
+        app = CacheApp()
+        app._register_models_m(mock, "Mocks")
+        call = lambda *args, **kwargs: self._call(app, *args, **kwargs)
+
+        try:
+            person = mock.Person()
+            person.name = "Name"
+            person.save()
+
+            status, headers, result = call("/people")
+            self.assertEqual(status, "200 OK")
+            self.assertEqual(headers["Content-Type"], "application/json")
+            self.assertEqual(appier.legacy.str(result), "{\"people\": [\"Name\"]}")
+            self.assertEqual(app.calls, 1)
+            etag = headers["Etag"]
+            self.assertNotEqual(app.cache_d.get("tag:people"), None)
+
+            status, headers, result = call("/people")
+            self.assertEqual(status, "200 OK")
+            self.assertEqual(headers["Content-Type"], "application/json")
+            self.assertEqual(headers["Etag"], etag)
+            self.assertEqual(appier.legacy.str(result), "{\"people\": [\"Name\"]}")
+            self.assertEqual(app.calls, 1)
+
+            status, headers, result = call("/people", etag = etag)
+            self.assertEqual(status, "304 Not Modified")
+            self.assertEqual(result, b"")
+            self.assertEqual(app.calls, 1)
+
+            status, headers, result = call("/people", query = "locale=pt_pt")
+            self.assertEqual(app.calls, 2)
+
+            person = mock.Person()
+            person.name = "Other"
+            person.save()
+
+            status, headers, result = call("/people", etag = etag)
+            self.assertEqual(status, "200 OK")
+            self.assertEqual(appier.legacy.str(result), "{\"people\": [\"Name\", \"Other\"]}")
+            self.assertNotEqual(headers["Etag"], etag)
+            self.assertEqual(app.calls, 3)
+
+            app.invalidate_cache("people")
+            call("/people")
+            call("/people")
+            self.assertEqual(app.calls, 4)
+
+            del app.cache_d["tag:people"]
+            call("/people")
+            call("/people")
+            self.assertEqual(app.calls, 5)
+
+            app.calls = 0
+            self.assertEqual(isinstance(app.cache_d, appier.BoundedCache), True)
+            self.assertEqual(call("/expiring")[2], b"1")
+            self.assertEqual(call("/expiring")[2], b"1")
+            self.assertEqual(call("/expiring", query = "random=1")[2], b"2")
+            time.sleep(0.1)
+            self.assertEqual(app.cache_d.get("route:/expiring?random=1"), None)
+            self.assertEqual(call("/expiring")[2], b"3")
+        finally:
+            app.unload()
+            appier.get_adapter().drop_db()
+
+        self.assertEqual(mock.Person._events_g.get("person.post_save", []), [])
+
+    def test_json_stream(self):
+        app = StreamApp()
+        try:
+            status, headers, result = self._call(app, "/list")
+            self.assertEqual(status, "200 OK")
+            self.assertEqual(headers["Content-Type"], "application/json")
+            self.assertEqual(headers["Content-Length"], "6")
+            self.assertEqual(result, b"[0, 1]")
+
+            app.json_stream = 2
+            status, headers, result = self._call(app, "/list")
+            self.assertEqual(status, "200 OK")
+            self.assertEqual(headers["Content-Type"], "application/json")
+            self.assertEqual("Content-Length" in headers, False)
+            self.assertEqual(result, b"[0, 1]")
+
+            status, headers, result = self._call(app, "/stream")
+            self.assertEqual(status, "200 OK")
+            self.assertEqual(headers["Content-Type"], "application/json")
+            self.assertEqual("Content-Length" in headers, False)
+            self.assertEqual(result, b"[{\"index\": 0}, {\"index\": 1}, {\"index\": 2}]")
+
+            status, headers, result = self._call(app, "/list", encoding = "gzip")
+            self.assertEqual(status, "200 OK")
+            self.assertEqual(headers["Content-Encoding"], "gzip")
+            self.assertEqual(headers["Vary"], "Accept-Encoding")
+            self.assertEqual("Content-Length" in headers, False)
+            self.assertEqual(zlib.decompress(result, 31), b"[0, 1]")
+
+            status, headers, result = self._call(app, "/stream", encoding = "deflate")
+            self.assertEqual(headers["Content-Encoding"], "deflate")
+            self.assertEqual(zlib.decompress(result), b"[{\"index\": 0}, {\"index\": 1}, {\"index\": 2}]")
+
+            status, headers, result = self._call(app, "/stream/fail")
+            self.assertEqual(status, "400 Bad Request")
+            self.assertEqual(appier.codec.loads(result)["message"], "Stream failed")
+
+            status, headers, result = self._call(app, "/stream/bound")
+            self.assertEqual(status, "200 OK")
+            result = appier.codec.loads(result)
+            self.assertEqual(len(result), 4096)
+            self.assertEqual(result[-1], dict(index = 4095, path = "/stream/bound"))
+            self.assertEqual(set(item["path"] for item in result), set(["/stream/bound"]))
+        finally:
+            app.unload()
+
+    def test_json_stream_codec(self):
+        app = StreamApp()
+        appier.set_codec(CompactCodec())
+        try:
+            status, headers, buffered = self._call(app, "/values")
+            self.assertEqual(status, "200 OK")
+            self.assertEqual("Content-Length" in headers, True)
+
+            app.json_stream = 2
+            status, headers, result = self._call(app, "/values")
+            self.assertEqual(status, "200 OK")
+            self.assertEqual("Content-Length" in headers, False)
+            self.assertEqual(result, buffered)
+            self.assertEqual(
+                appier.codec.loads(result)["items"],
+                ["2020-01-01T00:00:00", "2020-01-02T00:00:00"]
+            )
+            self.assertEqual(b" " in result, False)
+        finally:
+            appier.set_codec(None)
+            app.unload()
+
+    def test_lazy(self):
+        app = LazyApp()
+        try:
+            status, _headers, result = self._call(app, "/health")
+            self.assertEqual(status, "200 OK")
+            self.assertEqual(appier.codec.loads(result)["stages"], dict())
+
+            status, _headers, result = self._call(app, "/session", query = "sid=invalid")
+            self.assertEqual(status, "200 OK")
+            self.assertEqual(
+                appier.codec.loads(result)["stages"],
+                dict(session = 1, data = 1, cookies = 1, headers = 1)
+            )
+
+            status, _headers, result = self._call(app, "/locale", query = "locale=en_us")
+            self.assertEqual(status, "200 OK")
+            self.assertEqual(appier.codec.loads(result)["value"], "en_us")
+            self.assertEqual(appier.codec.loads(result)["stages"]["locale"], 1)
+
+            status, _headers, result = self._call(app, "/fail", query = "sid=invalid")
+            self.assertEqual(status, "400 Bad Request")
+            self.assertEqual(appier.codec.loads(result)["message"], "Failed")
+            self.assertEqual("session" in app.failed.stages, False)
+            self.assertEqual(app.failed.is_loaded("session"), False)
+        finally:
+            app.unload()
+
+    def test_locale_global(self):
+        app = LazyApp(locales = ("en_us", "pt_pt"))
+        try:
+            saved = locale.setlocale(locale.LC_ALL)
+            status, _headers, result = self._call(app, "/locale", query = "locale=pt_pt")
+            self.assertEqual(status, "200 OK")
+            self.assertEqual(appier.codec.loads(result)["value"], "pt_pt")
+            self.assertEqual(locale.setlocale(locale.LC_ALL), saved)
+        finally:
+            app.unload()
+
+    def test_session_flush(self):
+        app = LazyApp(session_c = appier.ClientSession)
+        try:
+            status, headers, result = self._call(app, "/session/large")
+            self.assertEqual(status, "200 OK")
+            self.assertEqual("session=" in headers.get("Set-Cookie", ""), False)
+            self.assertEqual(appier.codec.loads(result), dict(result = "success"))
+        finally:
+            app.unload()
+
+    def test_upload(self):
+        data = b"--boundary\r\n" +\
+            b"Content-Disposition: form-data; name=\"name\"\r\n\r\n" +\
+            b"value\r\n" +\
+            b"--boundary\r\n" +\
+            b"Content-Disposition: form-data; name=\"file\"; filename=\"file.bin\"\r\n" +\
+            b"Content-Type: application/octet-stream\r\n\r\n" +\
+            b"x" * 4096 + b"\r\n" +\
+            b"--boundary--\r\n"
+        content_type = "multipart/form-data; boundary=boundary"
+
+        app = UploadApp()
+        try:
+            status, _headers, result = self._call(
+                app,
+                "/upload",
+                method = "POST",
+                data = data,
+                content_type = content_type
+            )
+            self.assertEqual(status, "200 OK")
+            self.assertEqual(
+                appier.codec.loads(result),
+                dict(name = "value", file = "file.bin", size = 4096, spooled = False, stream = True)
+            )
+
+            app.multipart_spool = 1024
+            status, _headers, result = self._call(
+                app,
+                "/upload",
+                method = "POST",
+                data = data,
+                content_type = content_type
+            )
+            self.assertEqual(status, "200 OK")
+            self.assertEqual(appier.codec.loads(result)["size"], 4096)
+            self.assertEqual(appier.codec.loads(result)["spooled"], True)
+
+            app.body_max = 1024
+            status, _headers, result = self._call(
+                app,
+                "/upload",
+                method = "POST",
+                data = data,
+                content_type = content_type
+            )
+            self.assertEqual(status, "413 Request Entity Too Large")
+        finally:
+            app.unload()
+
+    def test_etag(self):
+        app = ConcurrentApp(etag = True)
+        try:
+            status, headers, result = self._call(app, "/echo/1", query = "value=1")
+            self.assertEqual(status, "200 OK")
+            self.assertEqual(result, b"1:1:/echo/1:True")
+            etag = headers["Etag"]
+
+            status, headers, result = self._call(app, "/echo/1", query = "value=1", etag = etag)
+            self.assertEqual(status, "304 Not Modified")
+            self.assertEqual(headers["Etag"], etag)
+            self.assertEqual(result, b"")
+
+            status, headers, result = self._call(app, "/echo/1", query = "value=2", etag = etag)
+            self.assertEqual(status, "200 OK")
+            self.assertNotEqual(headers["Etag"], etag)
+
+            status, headers, result = self._call(app, "/echo/1", query = "value=1", etag = "\"other\", W/" + etag)
+            self.assertEqual(status, "304 Not Modified")
+
+            app.gzip_min = 0
+            status, headers, result = self._call(app, "/echo/1", query = "value=1", etag = etag, encoding = "gzip")
+            self.assertEqual(status, "200 OK")
+            self.assertEqual(headers["Content-Encoding"], "gzip")
+            self.assertEqual(headers["Etag"], etag[:-1] + "-gzip\"")
+            self.assertEqual(zlib.decompress(result, 31), b"1:1:/echo/1:True")
+
+            status, headers, result = self._call(app, "/echo/1", query = "value=1", etag = headers["Etag"], encoding = "gzip")
+            self.assertEqual(status, "304 Not Modified")
+            self.assertEqual("Content-Encoding" in headers, False)
+            self.assertEqual(result, b"")
+
+            app.etag_max = 4
+            status, headers, result = self._call(app, "/echo/1", query = "value=1", etag = etag)
+            self.assertEqual(status, "200 OK")
+            self.assertEqual("Etag" in headers, False)
+        finally:
+            app.unload()
+
+        app = ConcurrentApp()
+        try:
+            status, headers, result = self._call(app, "/echo/1")
+            self.assertEqual("Etag" in headers, False)
+        finally:
+            app.unload()
+
+    def _call(
+        self,
+        app,
+        path,
+        query = "",
+        etag = None,
+        method = "GET",
+        data = None,
+        content_type = None,
+        encoding = None
+    ):
+        response = dict()
+
+        def start_response(status, headers, *args):
+            response["status"] = status
+            response["headers"] = dict(headers)
+
+        environ = dict(
+            REQUEST_METHOD = method,
+            PATH_INFO = path,
+            QUERY_STRING = query,
+            SCRIPT_NAME = "",
+            SERVER_NAME = "localhost",
+            SERVER_PORT = "80"
+        )
+        environ["wsgi.url_scheme"] = "http"
+        environ["wsgi.input"] = appier.legacy.BytesIO(data) if data else None
+        if etag: environ["HTTP_IF_NONE_MATCH"] = etag
+        if encoding: environ["HTTP_ACCEPT_ENCODING"] = encoding
+        if data: environ["CONTENT_LENGTH"] = str(len(data))
+        if content_type: environ["CONTENT_TYPE"] = content_type
+        result = b"".join(app.application(environ, start_response))
+        return response["status"], response["headers"], result
+
+    def _test_concurrency(self, app, count = 8, iterations = 25):
+        errors = []
+
+        def call(path, query = ""):
+            environ = dict(
+                REQUEST_METHOD = "GET",
+                PATH_INFO = path,
+                QUERY_STRING = query,
+                SCRIPT_NAME = "",
+                SERVER_NAME = "localhost",
+                SERVER_PORT = "80"
+            )
+            environ["wsgi.url_scheme"] = "http"
+            environ["wsgi.input"] = None
+            result = app.application(environ, lambda status, headers, *args: None)
+            return b"".join(result).decode("utf-8")
+
+        def worker(index):
+            try:
+                for iteration in range(iterations):
+                    id = index * iterations + iteration
+                    result = call("/echo/%d" % id, "value=%d" % index)
+                    expected = "%d:%d:/echo/%d:True" % (id, index, id)
+                    if not result == expected: errors.append((expected, result))
+
+                    extension = "html" if iteration % 2 else "txt"
+                    result = call("/template/" + extension, "value=<%d>" % index)
+                    if extension == "html": expected = "&lt;%d&gt;:/template/html" % index
+                    else: expected = "<%d>:/template/txt" % index
+                    if not result == expected: errors.append((expected, result))
+            except BaseException as exception:
+                errors.append(exception)
+
+        threads = [threading.Thread(target = worker, args = (index,)) for index in range(count)]
+        for thread in threads: thread.start()
+        for thread in threads: thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(app.request, app.mock)
+        self.assertEqual(app.own, app)
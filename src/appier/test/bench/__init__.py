@@ -0,0 +1,66 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Hive Appier Framework
+# Copyright (c) 2008-2016 Hive Solutions Lda.
+#
+# This file is part of Hive Appier Framework.
+#
+# Hive Appier Framework is free software: you can redistribute it and/or modify
+# it under the terms of the Apache License as published by the Apache
+# Foundation, either version 2.0 of the License, or (at your option) any
+# later version.
+#
+# Hive Appier Framework is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# Apache License for more details.
+#
+# You should have received a copy of the Apache License along with
+# Hive Appier Framework. If not, see <http://www.apache.org/licenses/>.
+
+__author__ = "João Magalhães <joamag@hive.pt>"
+""" The author(s) of the module """
+
+__version__ = "1.0.0"
+""" The version of the module """
+
+__revision__ = "$LastChangedRevision$"
+""" The revision number of the module """
+
+__date__ = "$LastChangedDate$"
+""" The last change date of the module """
+
+__copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
+""" The copyright for the module """
+
+__license__ = "Apache License, Version 2.0"
+""" The license for the module """
+
+import time
+
+def measure(method, count = 10000, *args, **kwargs):
+    """
+    Runs the provided method the requested number of times and
+    returns the average (wall clock) time of each call in seconds.
+
+    :type method: Function
+    :param method: The method that is going to be measured.
+    :type count: int
+    :param count: The number of times the method is going to be
+    called for the computation of the average time.
+    :rtype: float
+    :return: The average time in seconds that a single call to
+    the provided method has taken.
+    """
+
+    start = time.time()
+    for _index in range(count): method(*args, **kwargs)
+    return (time.time() - start) / float(count)
+
+def report(title, rows, header = ("name", "value")):
+    print(title)
+    print("-" * len(title))
+    print("%-32s %16s" % header)
+    for name, value in rows: print("%-32s %16s" % (name, value))
+    print("")
@@ -0,0 +1,149 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Hive Appier Framework
+# Copyright (c) 2008-2016 Hive Solutions Lda.
+#
+# This file is part of Hive Appier Framework.
+#
+# Hive Appier Framework is free software: you can redistribute it and/or modify
+# it under the terms of the Apache License as published by the Apache
+# Foundation, either version 2.0 of the License, or (at your option) any
+# later version.
+#
+# Hive Appier Framework is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# Apache License for more details.
+#
+# You should have received a copy of the Apache License along with
+# Hive Appier Framework. If not, see <http://www.apache.org/licenses/>.
+
+__author__ = "João Magalhães <joamag@hive.pt>"
+""" The author(s) of the module """
+
+__version__ = "1.0.0"
+""" The version of the module """
+
+__revision__ = "$LastChangedRevision$"
+""" The revision number of the module """
+
+__date__ = "$LastChangedDate$"
+""" The last change date of the module """
+
+__copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
+""" The copyright for the module """
+
+__license__ = "Apache License, Version 2.0"
+""" The license for the module """
+
+import time
+import threading
+
+import appier
+
+from . import report
+
+class Stub(object):
+    """
+    Local stub of an (I/O bound) backend service, that simulates
+    the latency of the remote call using sleep operations.
+    """
+
+    def __init__(self, latency = 0.01):
+        self.latency = latency
+
+    def fetch(self):
+        time.sleep(self.latency)
+        return dict(result = "ok")
+
+    def fetch_async(self):
+        import asyncio
+        return asyncio.sleep(self.latency, result = dict(result = "ok"))
+
+class BenchApp(appier.App):
+
+    def __init__(self, stub, *args, **kwargs):
+        appier.App.__init__(self, *args, **kwargs)
+        self.stub = stub
+
+    def routes(self):
+        return [
+            (("GET",), "/sync", self.sync),
+            (("GET",), "/async", self.async_)
+        ]
+
+    def sync(self):
+        return self.stub.fetch()
+
+    def async_(self):
+        return self.stub.fetch_async()
+
+def environ(path):
+    return dict(
+        REQUEST_METHOD = "GET",
+        PATH_INFO = path,
+        QUERY_STRING = "",
+        SCRIPT_NAME = "",
+        SERVER_NAME = "localhost",
+        SERVER_PORT = "80"
+    )
+
+def run_wsgi(app, count, workers):
+    def worker(count):
+        for _index in range(count):
+            result = app.application(environ("/sync"), lambda *args: None)
+            b"".join(result)
+
+    start = time.time()
+    threads = [
+        threading.Thread(target = worker, args = (count // workers,))\
+        for _index in range(workers)
+    ]
+    for thread in threads: thread.start()
+    for thread in threads: thread.join()
+    return time.time() - start
+
+def run_asgi(app, count, concurrency):
+    import asyncio
+
+    loop = asyncio.new_event_loop()
+    scope = dict(type = "http", method = "GET", path = "/async", query_string = b"")
+
+    @asyncio.coroutine
+    def receive():
+        return dict(type = "http.request", body = b"", more_body = False)
+
+    @asyncio.coroutine
+    def send(message):
+        pass
+
+    start = time.time()
+    try:
+        for _index in range(count // concurrency):
+            calls = [app.application_asgi(scope, receive, send) for _index in range(concurrency)]
+            loop.run_until_complete(asyncio.gather(*calls, loop = loop))
+    finally:
+        loop.close()
+    return time.time() - start
+
+def run(count = 400, workers = 8, concurrency = 100, latency = 0.01):
+    stub = Stub(latency = latency)
+    app = BenchApp(stub)
+    rows = []
+    try:
+        elapsed = run_wsgi(app, count, workers)
+        rows.append(("wsgi (%d threads)" % workers, "%.1f req/s" % (count / elapsed)))
+        if appier.legacy.PYTHON_ASYNC:
+            elapsed = run_asgi(app, count, concurrency)
+            rows.append(("asgi (%d concurrent)" % concurrency, "%.1f req/s" % (count / elapsed)))
+    finally:
+        app.unload()
+    report(
+        "WSGI vs ASGI (%d ms backend latency)" % (latency * 1000),
+        rows,
+        header = ("case", "throughput")
+    )
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,93 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Hive Appier Framework
+# Copyright (c) 2008-2016 Hive Solutions Lda.
+#
+# This file is part of Hive Appier Framework.
+#
+# Hive Appier Framework is free software: you can redistribute it and/or modify
+# it under the terms of the Apache License as published by the Apache
+# Foundation, either version 2.0 of the License, or (at your option) any
+# later version.
+#
+# Hive Appier Framework is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# Apache License for more details.
+#
+# You should have received a copy of the Apache License along with
+# Hive Appier Framework. If not, see <http://www.apache.org/licenses/>.
+
+__author__ = "João Magalhães <joamag@hive.pt>"
+""" The author(s) of the module """
+
+__version__ = "1.0.0"
+""" The version of the module """
+
+__revision__ = "$LastChangedRevision$"
+""" The revision number of the module """
+
+__date__ = "$LastChangedDate$"
+""" The last change date of the module """
+
+__copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
+""" The copyright for the module """
+
+__license__ = "Apache License, Version 2.0"
+""" The license for the module """
+import time
+import random
+import threading
+
+import appier
+
+from . import measure, report
+
+def workload(cache, keys, value, ratio = 0.8):
+    """
+    Runs a single (mixed) operation against the cache, a read of a
+    random key for most of the calls and a write otherwise, the keys
+    follow an exponential distribution so that some of them are "hot".
+    """
+
+    key = keys[int(random.expovariate(10.0 / len(keys))) % len(keys)]
+    if random.random() < ratio: cache.get(key, None)
+    else: cache[key] = value
+
+def threaded(cache, keys, value, count, workers):
+    threads = [
+        threading.Thread(target = measure, args = (workload, count // workers, cache, keys, value))\
+        for _index in range(workers)
+    ]
+    start = time.time()
+    for thread in threads: thread.start()
+    for thread in threads: thread.join()
+    return time.time() - start
+
+def run(count = 200000, keys = 20000, workers = 4):
+    keys = ["key%d" % index for index in range(keys)]
+    value = (1.0, b"x" * 256)
+    cases = (
+        ("memory", lambda: appier.MemoryCache.new()),
+        ("bounded lru", lambda: appier.BoundedCache.new(size = 5000, bytes = 0, policy = "lru", ttl = 0)),
+        ("bounded lfu", lambda: appier.BoundedCache.new(size = 5000, bytes = 0, policy = "lfu", ttl = 0)),
+        ("bounded lru bytes", lambda: appier.BoundedCache.new(size = 0, bytes = 1048576, policy = "lru", ttl = 0)),
+        ("bounded lru ttl", lambda: appier.BoundedCache.new(size = 5000, bytes = 0, policy = "lru", ttl = 60))
+    )
+    rows = []
+    for name, builder in cases:
+        cache = builder()
+        single = measure(workload, count, cache, keys, value)
+        rows.append(("%s (1 thread)" % name, "%.0f ops/s" % (1.0 / single)))
+        elapsed = threaded(builder(), keys, value, count, workers)
+        rows.append(("%s (%d threads)" % (name, workers), "%.0f ops/s" % (count / elapsed)))
+        if hasattr(cache, "info"):
+            info = cache.info()
+            ratio = info["hits"] / float(max(info["hits"] + info["misses"], 1))
+            rows.append(("%s hit ratio" % name, "%.1f%%" % (ratio * 100.0)))
+        else: rows.append(("%s entries" % name, "%d" % len(cache)))
+    report("Application cache (80% reads)", rows, header = ("case", "throughput"))
+
+if __name__ == "__main__":
+    run()
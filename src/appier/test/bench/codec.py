@@ -0,0 +1,105 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Hive Appier Framework
+# Copyright (c) 2008-2016 Hive Solutions Lda.
+#
+# This file is part of Hive Appier Framework.
+#
+# Hive Appier Framework is free software: you can redistribute it and/or modify
+# it under the terms of the Apache License as published by the Apache
+# Foundation, either version 2.0 of the License, or (at your option) any
+# later version.
+#
+# Hive Appier Framework is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# Apache License for more details.
+#
+# You should have received a copy of the Apache License along with
+# Hive Appier Framework. If not, see <http://www.apache.org/licenses/>.
+
+__author__ = "João Magalhães <joamag@hive.pt>"
+""" The author(s) of the module """
+
+__version__ = "1.0.0"
+""" The version of the module """
+
+__revision__ = "$LastChangedRevision$"
+""" The revision number of the module """
+
+__date__ = "$LastChangedDate$"
+""" The last change date of the module """
+
+__copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
+""" The copyright for the module """
+
+__license__ = "Apache License, Version 2.0"
+""" The license for the module """
+
+import os
+import time
+
+import appier
+
+from . import report
+from .. import mock
+
+def build_maps(count):
+    # builds a sequence of (mapped) models as returned by the find
+    # operation with the map flag set, including nested structures
+    return [dict(
+        _id = "%024x" % index,
+        identifier = index,
+        name = appier.legacy.u("Eyjafjallajökull %d") % index,
+        age = index % 100,
+        score = index * 1.5,
+        enabled = index % 2 == 0,
+        tags = ["tag %d" % value for value in range(index % 5)],
+        address = dict(street = "Street %d" % index, number = index, zip = None)
+    ) for index in range(count)]
+
+def build_models(count):
+    # builds the model instances (with references) so that the values
+    # are converted by the codec using the json value of each of them
+    return [mock.Person.old(model = dict(
+        identifier = index,
+        name = "Name %d" % index,
+        age = index % 100,
+        father = index
+    ), safe = False) for index in range(count)]
+
+def rate(method, count, value, repeat = 3):
+    best = None
+    for _index in range(repeat):
+        start = time.time()
+        method(value)
+        elapsed = time.time() - start
+        best = elapsed if best == None else min(best, elapsed)
+    return count / max(best, 1e-9)
+
+def run(sizes = (1000, 10000)):
+    os.environ["ADAPTER"] = "tiny"
+    os.environ["TINY_STORAGE"] = "memory"
+    app = appier.App()
+    app._register_models_m(mock, "Mocks")
+    names = [name for name in sorted(appier.CODECS) if appier.codec.AVAILABLE[name]]
+    rows = []
+    try:
+        for size in sizes:
+            payloads = (("maps", build_maps(size)), ("models", build_models(size)))
+            for name in names:
+                codec = appier.new_codec(name)
+                for kind, value in payloads:
+                    label = "%d %s %s" % (size, kind, name)
+                    data = codec.dumps(value)
+                    encode = rate(codec.dumps, size, value)
+                    decode = rate(codec.loads, size, data)
+                    rows.append((label + " encode", "%.0f doc/s" % encode))
+                    rows.append((label + " decode", "%.0f doc/s" % decode))
+    finally:
+        app.unload()
+    report("JSON codec throughput", rows, header = ("case", "throughput"))
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,96 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Hive Appier Framework
+# Copyright (c) 2008-2016 Hive Solutions Lda.
+#
+# This file is part of Hive Appier Framework.
+#
+# Hive Appier Framework is free software: you can redistribute it and/or modify
+# it under the terms of the Apache License as published by the Apache
+# Foundation, either version 2.0 of the License, or (at your option) any
+# later version.
+#
+# Hive Appier Framework is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# Apache License for more details.
+#
+# You should have received a copy of the Apache License along with
+# Hive Appier Framework. If not, see <http://www.apache.org/licenses/>.
+
+__author__ = "João Magalhães <joamag@hive.pt>"
+""" The author(s) of the module """
+
+__version__ = "1.0.0"
+""" The version of the module """
+
+__revision__ = "$LastChangedRevision$"
+""" The revision number of the module """
+
+__date__ = "$LastChangedDate$"
+""" The last change date of the module """
+
+__copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
+""" The copyright for the module """
+
+__license__ = "Apache License, Version 2.0"
+""" The license for the module """
+
+import os
+import time
+
+import appier
+
+from . import report
+from .. import mock
+
+def populate(count):
+    # inserts the documents directly in the underlying (tiny) table
+    # as a single batch, as the per document insertion is expensive
+    collection = mock.Person._collection()
+    collection._base.insert_multiple([dict(
+        _id = index,
+        identifier = index,
+        identifier_safe = index,
+        name = "Name %d" % index,
+        age = str(index % 100)
+    ) for index in range(count)])
+
+def find_multi(cls, **kwargs):
+    # the multiple pass pipeline (types, fill, build and then old
+    # with a new fill and types operation) used before the single
+    # pass hydration, kept as the baseline for the comparison
+    models = cls._collection().find(kwargs, cls._sniff(None, rules = True))
+    models = [cls.types(model) for model in models]
+    models = [cls.fill(model) for model in models]
+    [cls.build(model, map = False, rules = True, meta = False) for model in models]
+    return [cls.old(model = model, safe = False) for model in models]
+
+def rate(method, count, *args, **kwargs):
+    start = time.time()
+    models = method(*args, **kwargs)
+    elapsed = time.time() - start
+    assert len(models) == count
+    return count / elapsed
+
+def run(sizes = (1000, 10000)):
+    os.environ["ADAPTER"] = "tiny"
+    os.environ["TINY_STORAGE"] = "memory"
+    app = appier.App()
+    app._register_models_m(mock, "Mocks")
+    rows = []
+    try:
+        for size in sizes:
+            populate(size)
+            multi = rate(find_multi, size, mock.Person)
+            single = rate(mock.Person.find, size, eager_l = False)
+            rows.append(("%d documents multi pass" % size, "%.0f doc/s" % multi))
+            rows.append(("%d documents find" % size, "%.0f doc/s" % single))
+            appier.get_adapter().drop_db()
+    finally:
+        app.unload()
+    report("Model find hydration", rows, header = ("case", "throughput"))
+
+if __name__ == "__main__":
+    run()
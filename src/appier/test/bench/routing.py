@@ -0,0 +1,81 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Hive Appier Framework
+# Copyright (c) 2008-2016 Hive Solutions Lda.
+#
+# This file is part of Hive Appier Framework.
+#
+# Hive Appier Framework is free software: you can redistribute it and/or modify
+# it under the terms of the Apache License as published by the Apache
+# Foundation, either version 2.0 of the License, or (at your option) any
+# later version.
+#
+# Hive Appier Framework is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# Apache License for more details.
+#
+# You should have received a copy of the Apache License along with
+# Hive Appier Framework. If not, see <http://www.apache.org/licenses/>.
+
+__author__ = "João Magalhães <joamag@hive.pt>"
+""" The author(s) of the module """
+
+__version__ = "1.0.0"
+""" The version of the module """
+
+__revision__ = "$LastChangedRevision$"
+""" The revision number of the module """
+
+__date__ = "$LastChangedDate$"
+""" The last change date of the module """
+
+__copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
+""" The copyright for the module """
+
+__license__ = "Apache License, Version 2.0"
+""" The license for the module """
+
+import appier
+
+from . import measure, report
+
+def build(count, dynamic = False):
+    routes = []
+    for index in range(count):
+        if dynamic: expression = "/<str:name>/resource%d/<int:id>" % index
+        else: expression = "/resource%d/<int:id>" % index
+        route = appier.App.norm_route("GET", expression, None)
+        del route[3]
+        routes.append(route)
+    return routes
+
+def scan(routes, method, path):
+    for route in routes:
+        methods_i, regex_i = route[:2]
+        match = regex_i.match(path)
+        if not method in methods_i or not match: continue
+        return route, match.groups()
+    return None, None
+
+def run(sizes = (10, 100, 1000), count = 2000):
+    rows = []
+    for size in sizes:
+        routes = build(size)
+        routes_d = build(size, dynamic = True)
+        cases = (
+            ("last", routes, "/resource%d/1" % (size - 1)),
+            ("404", routes, "/missing/1"),
+            ("dynamic", routes_d, "/name/resource%d/1" % (size - 1))
+        )
+        for name, routes, path in cases:
+            router = appier.Router(routes)
+            scan_t = measure(scan, count, routes, "GET", path)
+            router_t = measure(router.match, count, "GET", path)
+            rows.append(("%d routes (%s) scan" % (size, name), "%.2f us" % (scan_t * 1e6)))
+            rows.append(("%d routes (%s) router" % (size, name), "%.2f us" % (router_t * 1e6)))
+    report("Routing dispatch", rows, header = ("case", "time/match"))
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,93 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Hive Appier Framework
+# Copyright (c) 2008-2016 Hive Solutions Lda.
+#
+# This file is part of Hive Appier Framework.
+#
+# Hive Appier Framework is free software: you can redistribute it and/or modify
+# it under the terms of the Apache License as published by the Apache
+# Foundation, either version 2.0 of the License, or (at your option) any
+# later version.
+#
+# Hive Appier Framework is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# Apache License for more details.
+#
+# You should have received a copy of the Apache License along with
+# Hive Appier Framework. If not, see <http://www.apache.org/licenses/>.
+
+__author__ = "João Magalhães <joamag@hive.pt>"
+""" The author(s) of the module """
+
+__version__ = "1.0.0"
+""" The version of the module """
+
+__revision__ = "$LastChangedRevision$"
+""" The revision number of the module """
+
+__date__ = "$LastChangedDate$"
+""" The last change date of the module """
+
+__copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
+""" The copyright for the module """
+
+__license__ = "Apache License, Version 2.0"
+""" The license for the module """
+import time
+import json
+
+import appier
+
+from . import report
+
+try: import tracemalloc
+except ImportError: tracemalloc = None
+
+def build(count):
+    return [dict(id = index, name = "name %d" % index, value = index * 1.5) for index in range(count)]
+
+def dumps(value):
+    data = json.dumps(value, cls = appier.JSONEncoder).encode("utf-8")
+    for index in range(0, len(data), 32768): yield data[index:index + 32768]
+
+def stream(value):
+    encoder = appier.JSONEncoder()
+    for chunk in encoder.iterencode_l(value): yield chunk.encode("utf-8")
+
+def consume(method, value):
+    """
+    Consumes the chunks generated by the provided method, returning
+    the time to the first chunk, the time to the last one and (when
+    available) the peak of memory allocated during the consumption.
+    """
+
+    if tracemalloc: tracemalloc.start()
+    start = time.time()
+    first = None
+    for _chunk in method(value):
+        if first == None: first = time.time() - start
+    last = time.time() - start
+    peak = tracemalloc.get_traced_memory()[1] if tracemalloc else 0
+    if tracemalloc: tracemalloc.stop()
+    return first, last, peak
+
+def run(sizes = (1000, 10000, 100000)):
+    rows = []
+    for size in sizes:
+        value = build(size)
+        for name, method in (("dumps", dumps), ("stream", stream)):
+            first, last, peak = consume(method, value)
+            label = "%d items %s" % (size, name)
+            rows.append((label + " first", "%.2f ms" % (first * 1000)))
+            rows.append((label + " last", "%.2f ms" % (last * 1000)))
+            if peak: rows.append((label + " peak", "%.1f KB" % (peak / 1024.0)))
+        lazy = lambda value: stream(appier.JSONStream(iter(value)))
+        first, last, _peak = consume(lazy, value)
+        rows.append(("%d items lazy first" % size, "%.2f ms" % (first * 1000)))
+    report("JSON serialization (list of maps)", rows, header = ("case", "value"))
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,146 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Hive Appier Framework
+# Copyright (c) 2008-2016 Hive Solutions Lda.
+#
+# This file is part of Hive Appier Framework.
+#
+# Hive Appier Framework is free software: you can redistribute it and/or modify
+# it under the terms of the Apache License as published by the Apache
+# Foundation, either version 2.0 of the License, or (at your option) any
+# later version.
+#
+# Hive Appier Framework is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# Apache License for more details.
+#
+# You should have received a copy of the Apache License along with
+# Hive Appier Framework. If not, see <http://www.apache.org/licenses/>.
+
+__author__ = "João Magalhães <joamag@hive.pt>"
+""" The author(s) of the module """
+
+__version__ = "1.0.0"
+""" The version of the module """
+
+__revision__ = "$LastChangedRevision$"
+""" The revision number of the module """
+
+__date__ = "$LastChangedDate$"
+""" The last change date of the module """
+
+__copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
+""" The copyright for the module """
+
+__license__ = "Apache License, Version 2.0"
+""" The license for the module """
+
+import os
+import hmac
+import zlib
+import time
+import base64
+import shutil
+import tempfile
+
+import appier
+
+from . import report
+from . import measure
+
+def populate(cls, count):
+    sids = []
+    for index in range(count):
+        session = cls.new()
+        session["index"] = index
+        session.flush()
+        sids.append(session.sid)
+    return sids
+
+def rate(method, sids):
+    start = time.time()
+    for sid in sids: method(sid)
+    elapsed = time.time() - start
+    return len(sids) / max(elapsed, 1e-9)
+
+def touch(cls):
+    def method(sid):
+        session = cls.get_s(sid)
+        session["touched"] = True
+        session.flush()
+    return method
+
+def run(sizes = (500, 2000)):
+    rows = []
+    for size in sizes:
+        for name, cls, file_path in (
+            ("file", appier.FileSession, "session.shelve"),
+            ("sqlite", appier.SqliteSession, "session.sqlite")
+        ):
+            path = tempfile.mkdtemp()
+            file_path = os.path.join(path, file_path)
+            try:
+                cls.open(file_path = file_path)
+                sids = populate(cls, size)
+                cls.close()
+
+                start = time.time()
+                cls.open(file_path = file_path)
+                opened = time.time() - start
+
+                label = "%d sessions %s" % (size, name)
+                rows.append((label + " open", "%.2f ms" % (opened * 1000)))
+                rows.append((label + " get", "%.0f ops/s" % rate(cls.get_s, sids)))
+                rows.append((label + " flush", "%.0f ops/s" % rate(touch(cls), sids)))
+                cls.close()
+            finally:
+                shutil.rmtree(path)
+    report("Session backends", rows, header = ("case", "value"))
+
+def build_payloads():
+    # builds the session data of the typical cases, from a simple
+    # login session to one that also keeps a (large) shopping bag
+    login = dict(
+        username = "username",
+        email = "username@example.com",
+        tokens = ["admin", "user"],
+        locale = "en_us"
+    )
+    flash = dict(login, flash = "Changes saved successfully", flash_type = "success")
+    bag = dict(login, bag = [dict(
+        product = "%024x" % index,
+        name = "Product %d" % index,
+        quantity = index % 3 + 1,
+        price = index * 2.5
+    ) for index in range(25)])
+    return (("login", login), ("flash", flash), ("bag", bag))
+
+def cookie(data, secret = b"secret"):
+    # builds the cookie value as the client session does (signature,
+    # compression and encoding) returning its size in bytes
+    digest = hmac.new(secret, data, appier.ClientSession.DIGEST).hexdigest()
+    data = appier.legacy.bytes(digest) + b":" + data
+    return len(appier.legacy.str(base64.b64encode(zlib.compress(data))))
+
+def serializers(count = 5000):
+    rows = []
+    for kind, payload in build_payloads():
+        session = appier.ClientSession()
+        for name, value in payload.items(): session[name] = value
+        for name in sorted(appier.SERIALIZERS):
+            serializer = appier.new_serializer(name)
+            data = serializer.dumps(session)
+            label = "%s %s" % (kind, name)
+            encode = measure(serializer.dumps, count, session)
+            decode = measure(serializer.loads, count, data, appier.ClientSession)
+            rows.append((label + " size", "%d bytes" % len(data)))
+            rows.append((label + " cookie", "%d bytes" % cookie(data)))
+            rows.append((label + " encode", "%.0f ops/s" % (1.0 / max(encode, 1e-9))))
+            rows.append((label + " decode", "%.0f ops/s" % (1.0 / max(decode, 1e-9))))
+    report("Session serializers", rows, header = ("case", "value"))
+
+if __name__ == "__main__":
+    run()
+    serializers()
@@ -0,0 +1,171 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Hive Appier Framework
+# Copyright (c) 2008-2016 Hive Solutions Lda.
+#
+# This file is part of Hive Appier Framework.
+#
+# Hive Appier Framework is free software: you can redistribute it and/or modify
+# it under the terms of the Apache License as published by the Apache
+# Foundation, either version 2.0 of the License, or (at your option) any
+# later version.
+#
+# Hive Appier Framework is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# Apache License for more details.
+#
+# You should have received a copy of the Apache License along with
+# Hive Appier Framework. If not, see <http://www.apache.org/licenses/>.
+
+__author__ = "João Magalhães <joamag@hive.pt>"
+""" The author(s) of the module """
+
+__version__ = "1.0.0"
+""" The version of the module """
+
+__revision__ = "$LastChangedRevision$"
+""" The revision number of the module """
+
+__date__ = "$LastChangedDate$"
+""" The last change date of the module """
+
+__copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
+""" The copyright for the module """
+
+__license__ = "Apache License, Version 2.0"
+""" The license for the module """
+
+import os
+import time
+import shutil
+import tempfile
+
+import appier
+
+from . import report
+
+class BenchApp(appier.App):
+
+    def __init__(self, path, *args, **kwargs):
+        appier.App.__init__(self, *args, **kwargs)
+        self.path = path
+
+    def routes(self):
+        return [
+            (("GET",), "/<str:name>", self.file)
+        ]
+
+    def file(self, name):
+        return self.send_path(os.path.join(self.path, name), url_path = name, cache = True)
+
+class SendfileWrapper(object):
+    """
+    File wrapper that simulates a server with zero copy support, the
+    file is sent to the target descriptor using the sendfile system call
+    (instead of being iterated in the python space).
+    """
+
+    def __init__(self, file, block_size):
+        self.file = file
+        self.block_size = block_size
+
+    def send(self, fileno):
+        offset = self.file.tell()
+        while True:
+            sent = os.sendfile(fileno, self.file.fileno(), offset, 1048576)
+            if not sent: break
+            offset += sent
+
+    def close(self):
+        self.file.close()
+
+def request(app, name, fileno, wrapper = None, etag = None):
+    environ = dict(
+        REQUEST_METHOD = "GET",
+        PATH_INFO = "/" + name,
+        QUERY_STRING = "",
+        SCRIPT_NAME = "",
+        SERVER_NAME = "localhost",
+        SERVER_PORT = "80"
+    )
+    environ["wsgi.url_scheme"] = "http"
+    environ["wsgi.input"] = None
+    if wrapper: environ["wsgi.file_wrapper"] = wrapper
+    if etag: environ["HTTP_IF_NONE_MATCH"] = etag
+    result = app.application(environ, lambda status, headers, *args: None)
+    try:
+        if isinstance(result, SendfileWrapper): result.send(fileno)
+        else:
+            for chunk in result: os.write(fileno, chunk)
+    finally:
+        if hasattr(result, "close"): result.close()
+
+def throughput(app, name, size, count, fileno, wrapper = None):
+    start = time.time()
+    for _index in range(count): request(app, name, fileno, wrapper = wrapper)
+    elapsed = time.time() - start
+    return size * count / elapsed / 1048576.0
+
+def rate(app, name, count, fileno, etag = None):
+    start = time.time()
+    for _index in range(count): request(app, name, fileno, etag = etag)
+    elapsed = time.time() - start
+    return count / elapsed
+
+def run_stat(path, fileno, count = 5000):
+    rows = []
+    file = open(os.path.join(path, "small.css"), "wb")
+    try: file.write(b"x" * 512)
+    finally: file.close()
+    for interval in (0.0, appier.STAT_INTERVAL):
+        app = BenchApp(path)
+        app.stat_cache = appier.StatCache(interval = interval)
+        try:
+            label = "cached" if interval else "uncached"
+            etag = app.stat_cache.get(os.path.join(path, "small.css"), "small.css").etag
+            rows.append(("512B %s" % label, "%.0f req/s" % rate(app, "small.css", count, fileno)))
+            rows.append(("304 %s" % label, "%.0f req/s" % rate(app, "small.css", count, fileno, etag = etag)))
+        finally:
+            app.unload()
+    report("Static metadata cache", rows, header = ("case", "rate"))
+
+def run(sizes = ((1024, "1KB", 2000), (1048576, "1MB", 200), (104857600, "100MB", 3))):
+    path = tempfile.mkdtemp()
+    app = BenchApp(path)
+    fileno = os.open(os.devnull, os.O_WRONLY)
+    mmap = appier.FileRange._mmap
+    rows = []
+    try:
+        for size, label, count in sizes:
+            file = open(os.path.join(path, label), "wb")
+            try: file.write(b"x" * size)
+            finally: file.close()
+
+            appier.FileRange._mmap = lambda self, file: None
+            try: read = throughput(app, label, size, count, fileno)
+            finally: appier.FileRange._mmap = mmap
+            rows.append(("%s read" % label, "%.1f MB/s" % read))
+
+            mapped = throughput(app, label, size, count, fileno)
+            rows.append(("%s mmap" % label, "%.1f MB/s" % mapped))
+
+            if size <= appier.FILE_LIMIT:
+                app.file_cache = appier.FileCache(size = 16777216)
+                try: memory = throughput(app, label, size, count, fileno)
+                finally: app.file_cache = appier.FileCache()
+                rows.append(("%s memory" % label, "%.1f MB/s" % memory))
+
+            if not hasattr(os, "sendfile"): continue
+            sendfile = throughput(app, label, size, count, fileno, wrapper = SendfileWrapper)
+            rows.append(("%s file wrapper" % label, "%.1f MB/s" % sendfile))
+        report("Static file delivery", rows, header = ("case", "throughput"))
+        run_stat(path, fileno)
+    finally:
+        os.close(fileno)
+        app.unload()
+        shutil.rmtree(path)
+
+if __name__ == "__main__":
+    run()
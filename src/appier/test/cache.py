@@ -37,10 +37,56 @@ __copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
 __license__ = "Apache License, Version 2.0"
 """ The license for the module """
 
+import os
+import time
+import shutil
+import tempfile
 import unittest
 
 import appier
 
+class MockRedis(object):
+    """
+    Minimal in memory implementation of the subset of the redis
+    client interface used by the redis cache.
+    """
+
+    def __init__(self):
+        self.values = dict()
+
+    def get(self, name):
+        return self.values.get(name, None)
+
+    def set(self, name, value, ex = None):
+        self.values[name] = value
+
+    def delete(self, *names):
+        count = 0
+        for name in names:
+            if not name in self.values: continue
+            del self.values[name]
+            count += 1
+        return count
+
+    def exists(self, name):
+        return 1 if name in self.values else 0
+
+    def scan_iter(self, match = None):
+        prefix = match[:-1]
+        return [name for name in list(self.values.keys()) if name.startswith(prefix)]
+
+class RacingCache(appier.MemoryCache):
+    """
+    Cache whose entries always expire (or are evicted) right after
+    being found by the membership test, simulating a race condition.
+    """
+
+    def __contains__(self, item):
+        return True
+
+    def __getitem__(self, key):
+        raise KeyError(key)
+
 class CacheTest(unittest.TestCase):
 
     def test_memory(self):
@@ -53,3 +99,163 @@ class CacheTest(unittest.TestCase):
 
         self.assertEqual(cache["first"], 1)
         self.assertEqual(cache["second"], 2)
+        self.assertEqual(cache.get("third", 3), 3)
+
+    def test_bounded(self):
+        cache = appier.BoundedCache.new(size = 2, bytes = 0, policy = "lru", ttl = 0)
+
+        cache["first"] = 1
+        cache["second"] = 2
+        self.assertEqual(cache["first"], 1)
+
+        cache["third"] = 3
+        self.assertEqual("first" in cache, True)
+        self.assertEqual("second" in cache, False)
+        self.assertEqual(cache.get("second"), None)
+        self.assertRaises(KeyError, lambda: cache["second"])
+
+        info = cache.info()
+        self.assertEqual(info["entries"], 2)
+        self.assertEqual(info["hits"], 1)
+        self.assertEqual(info["misses"], 2)
+        self.assertEqual(info["evictions"], 1)
+
+        del cache["first"]
+        self.assertEqual(len(cache), 1)
+
+        cache.flush()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual("third" in cache, False)
+
+        cache = appier.BoundedCache.new(size = 2, bytes = 0, policy = "lfu", ttl = 0)
+
+        cache["first"] = 1
+        cache["second"] = 2
+        self.assertEqual(cache["first"], 1)
+        self.assertEqual(cache["first"], 1)
+        self.assertEqual(cache["second"], 2)
+
+        cache["third"] = 3
+        self.assertEqual("first" in cache, True)
+        self.assertEqual("second" in cache, False)
+
+        cache["fourth"] = 4
+        self.assertEqual("first" in cache, True)
+        self.assertEqual("third" in cache, False)
+
+        del cache["first"]
+        cache["fifth"] = 5
+        cache["sixth"] = 6
+        self.assertEqual(len(cache), 2)
+        self.assertEqual("fourth" in cache, False)
+
+        cache = appier.BoundedCache.new(size = 0, bytes = 20, policy = "lru", ttl = 0)
+
+        cache["first"] = b"0123456789"
+        cache["second"] = (b"01234", b"56789")
+        self.assertEqual(cache.info()["used"], 20)
+
+        cache["third"] = b"01234"
+        self.assertEqual("first" in cache, False)
+        self.assertEqual(cache.info()["used"], 15)
+
+        cache["fourth"] = b"0" * 21
+        self.assertEqual("fourth" in cache, False)
+
+        cache = appier.BoundedCache.new(size = 10, bytes = 0, policy = "lru", ttl = 0.05)
+
+        cache["first"] = 1
+        cache.set("second", 2, ttl = 60)
+        time.sleep(0.1)
+        self.assertEqual("first" in cache, False)
+        self.assertEqual(cache["second"], 2)
+        self.assertEqual(cache.info()["expirations"], 1)
+
+        self.assertRaises(
+            appier.OperationalError,
+            lambda: appier.BoundedCache.new(policy = "invalid")
+        )
+
+    def test_try(self):
+        app = appier.App()
+        try:
+            app.cache_d = RacingCache.new()
+            self.assertEqual(app.cache_d.get("key"), None)
+            self.assertEqual(app.try_cache("key", 1), None)
+            self.assertEqual(app.try_cache("key", 1, default = 2), 2)
+
+            app.cache_d = appier.MemoryCache.new()
+            app.flag_cache("key", 1, "value")
+            self.assertEqual(app.try_cache("key", 1), "value")
+            self.assertEqual(app.try_cache("key", 2), None)
+        finally:
+            app.unload()
+
+    def test_shared(self):
+        path = tempfile.mkdtemp()
+        file_path = os.path.join(path, "cache.shared")
+        kwargs = dict(file_path = file_path, slots = 8, slot_size = 256, ways = 2, ttl = 0)
+        cache = appier.SharedCache.new(**kwargs)
+        other = appier.SharedCache.new(**kwargs)
+        try:
+            cache["first"] = (1.0, b"0123456789")
+            cache["second"] = dict(value = 2)
+            self.assertEqual(other["first"], (1.0, b"0123456789"))
+            self.assertEqual(other["second"], dict(value = 2))
+            self.assertEqual(len(other), 2)
+
+            other["first"] = "changed"
+            self.assertEqual(cache["first"], "changed")
+
+            del cache["second"]
+            self.assertEqual("second" in other, False)
+            self.assertRaises(KeyError, lambda: other["second"])
+
+            cache["large"] = b"x" * 256
+            self.assertEqual("large" in cache, False)
+
+            for index in range(32): cache["key%d" % index] = index
+            self.assertEqual(len(cache) <= 8, True)
+            self.assertEqual(cache.info()["evictions"] > 0, True)
+            self.assertEqual(cache.get("key31"), 31)
+
+            cache.set("expiring", 1, ttl = 0.05)
+            time.sleep(0.1)
+            self.assertEqual(other.get("expiring"), None)
+
+            if hasattr(os, "fork"):
+                pid = os.fork()
+                if pid == 0:
+                    try: cache["child"] = os.getpid()
+                    finally: os._exit(0)
+                os.waitpid(pid, 0)
+                self.assertEqual(other["child"], pid)
+
+            cache.clear()
+            self.assertEqual(len(other), 0)
+        finally:
+            cache.close()
+            other.close()
+            shutil.rmtree(path)
+
+    def test_redis(self):
+        redis = MockRedis()
+        cache = appier.RedisCache.new(prefix = "test:", ttl = 0, redis = redis)
+        other = appier.RedisCache.new(prefix = "other:", ttl = 0, redis = redis)
+
+        cache["first"] = (1.0, b"0123456789")
+        other["first"] = 1
+        self.assertEqual(cache["first"], (1.0, b"0123456789"))
+        self.assertEqual(other["first"], 1)
+        self.assertEqual(len(cache), 1)
+        self.assertEqual("second" in cache, False)
+        self.assertEqual(cache.get("second", 2), 2)
+
+        del cache["first"]
+        self.assertRaises(KeyError, lambda: cache["first"])
+
+        cache["first"] = 1
+        cache["second"] = 2
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(len(other), 1)
@@ -0,0 +1,147 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Hive Appier Framework
+# Copyright (c) 2008-2016 Hive Solutions Lda.
+#
+# This file is part of Hive Appier Framework.
+#
+# Hive Appier Framework is free software: you can redistribute it and/or modify
+# it under the terms of the Apache License as published by the Apache
+# Foundation, either version 2.0 of the License, or (at your option) any
+# later version.
+#
+# Hive Appier Framework is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# Apache License for more details.
+#
+# You should have received a copy of the Apache License along with
+# Hive Appier Framework. If not, see <http://www.apache.org/licenses/>.
+
+__author__ = "João Magalhães <joamag@hive.pt>"
+""" The author(s) of the module """
+
+__version__ = "1.0.0"
+""" The version of the module """
+
+__revision__ = "$LastChangedRevision$"
+""" The revision number of the module """
+
+__date__ = "$LastChangedDate$"
+""" The last change date of the module """
+
+__copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
+""" The copyright for the module """
+
+__license__ = "Apache License, Version 2.0"
+""" The license for the module """
+
+import datetime
+import unittest
+
+import appier
+
+from . import mock
+
+class CodecTest(unittest.TestCase):
+
+    def setUp(self):
+        self.app = appier.App()
+        self.app._register_models_m(mock, "Mocks")
+
+    def tearDown(self):
+        appier.set_codec(None)
+        self.app.unload()
+        adapter = appier.get_adapter()
+        adapter.drop_db()
+
+    def test_dumps(self):
+        codec = appier.JSONCodec()
+
+        result = codec.loads(codec.dumps(dict(name = "name", value = 1.5)))
+        self.assertEqual(result, dict(name = "name", value = 1.5))
+
+        result = codec.loads(codec.dumps(dict(values = set([1]))))
+        self.assertEqual(result, dict(values = [1]))
+
+        result = codec.loads(codec.dumps(dict(values = (value for value in range(3)))))
+        self.assertEqual(result, dict(values = [0, 1, 2]))
+
+        person = mock.Person.old(model = dict(
+            identifier = 1,
+            name = "Name",
+            father = 2
+        ), safe = False)
+
+        result = codec.loads(codec.dumps(person))
+        self.assertEqual(result["identifier"], 1)
+        self.assertEqual(result["name"], "Name")
+        self.assertEqual(result["father"], 2)
+        self.assertEqual(result["cats"], [])
+
+        result = codec.loads(codec.dumps(dict(father = person.father)))
+        self.assertEqual(result, dict(father = 2))
+
+        result = codec.dumps(dict(value = 1), default = str, sort_keys = True)
+        self.assertEqual(result, "{\"value\": 1}")
+
+        codec = appier.JSONCodec(permissive = False)
+        self.assertRaises(TypeError, lambda: codec.dumps(dict(value = object())))
+
+    def test_compatible(self):
+        value = dict(
+            date = datetime.datetime(2020, 1, 1, 12, 0, 0),
+            day = datetime.date(2020, 1, 1),
+            values = (1, 2),
+            name = appier.legacy.u("Eyjafjallajökull")
+        )
+        expected = dict(
+            date = "2020-01-01 12:00:00",
+            day = "2020-01-01",
+            values = [1, 2],
+            name = appier.legacy.u("Eyjafjallajökull")
+        )
+
+        for name, available in appier.codec.AVAILABLE.items():
+            if not available: continue
+            codec = appier.new_codec(name)
+            self.assertEqual(codec.loads(codec.dumps(value)), expected)
+
+    def test_loads(self):
+        codec = appier.JSONCodec()
+
+        result = codec.loads("{\"name\": \"name\"}")
+        self.assertEqual(result, dict(name = "name"))
+
+        result = codec.loads(b"{\"name\": \"name\"}")
+        self.assertEqual(result, dict(name = "name"))
+
+        self.assertRaises(ValueError, lambda: codec.loads("{\"name\""))
+
+    def test_codec(self):
+        codec = appier.get_codec()
+        self.assertEqual(codec.name, appier.CODEC)
+        self.assertEqual(appier.get_codec(), codec)
+
+        appier.set_codec("json")
+        self.assertNotEqual(appier.get_codec(), codec)
+        self.assertEqual(appier.get_codec().name, "json")
+
+        codec = appier.JSONCodec()
+        appier.set_codec(codec)
+        self.assertEqual(appier.get_codec(), codec)
+        self.assertEqual(appier.codec.dumps([1, 2]), "[1, 2]")
+        self.assertEqual(appier.codec.loads("[1, 2]"), [1, 2])
+
+        self.assertRaises(
+            appier.OperationalError,
+            lambda: appier.set_codec("invalid")
+        )
+
+        if appier.codec.AVAILABLE["orjson"]: return
+
+        self.assertRaises(
+            appier.OperationalError,
+            lambda: appier.new_codec("orjson")
+        )
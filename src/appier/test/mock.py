@@ -129,4 +129,14 @@ class Car(appier.Model):
 
     brand = appier.field()
 
+    price = appier.field(
+        type = float,
+        initial = 0
+    )
+
+    tags = appier.field(
+        type = list,
+        initial = appier.legacy.u("[]")
+    )
+
     variant = appier.field()
@@ -97,6 +97,77 @@ class ModelTest(unittest.TestCase):
         self.assertEqual(len(result), 1)
         self.assertEqual(result[0].age, 1)
 
+    def test_hydrate(self):
+        collection = mock.Person._collection()
+        collection.insert(dict(identifier = 1, name = "Name", age = "20"))
+        collection.insert(dict(identifier = 2, name = "Other", age = "invalid"))
+
+        for fill in (True, False):
+            result = mock.Person.find(sort = [("identifier", 1)], fill = fill)
+            self.assertEqual(len(result), 2)
+            self.assertEqual(isinstance(result[0], mock.Person), True)
+            self.assertEqual(result[0].age, 20)
+            self.assertEqual(result[1].age, None)
+            self.assertEqual(isinstance(result[0].father, appier.Reference), True)
+            self.assertEqual(result[0].father.is_resolved(), False)
+            self.assertEqual(result[0].cats.is_empty(), True)
+
+        person = mock.Person.get(identifier = 1)
+        self.assertEqual(person.age, 20)
+        self.assertEqual(person.name, "Name")
+        self.assertEqual(person.car, None)
+
+    def test_fill(self):
+        collection = mock.Car._collection()
+        collection.insert(dict(identifier = 1, name = "Car", brand = "Brand"))
+        collection.insert(dict(identifier = 2, name = "Other", brand = "Brand"))
+
+        for fill in (True, False):
+            car = mock.Car.get(identifier = 1, fill = fill)
+            self.assertEqual(car.price, 0.0)
+            self.assertEqual(type(car.price), float)
+            self.assertEqual(car.tags, [])
+
+        cars = mock.Car.find(sort = [("identifier", 1)])
+        self.assertEqual(cars[0].tags, [])
+        self.assertEqual(cars[0].tags is cars[1].tags, False)
+
+        def _build(cls, model, map):
+            del model["brand"]
+
+        mock.Car._build = classmethod(_build)
+        try:
+            car = mock.Car.get(identifier = 1)
+            self.assertEqual(car.brand, None)
+            self.assertEqual("brand" in car.model, True)
+        finally:
+            del mock.Car._build
+
+    def test_iter(self):
+        for index in range(5):
+            person = mock.Person()
+            person.name = "Name %d" % index
+            person.age = index
+            person.save()
+
+        result = mock.Person.iter(sort = [("identifier", 1)], batch = 2)
+        self.assertEqual(isinstance(result, list), False)
+        result = list(result)
+        self.assertEqual(len(result), 5)
+        self.assertEqual([person.age for person in result], [0, 1, 2, 3, 4])
+        self.assertEqual(isinstance(result[0], mock.Person), True)
+
+        result = mock.Person.find_iter(sort = [("identifier", 1)], batch = 2, batched = True)
+        result = list(result)
+        self.assertEqual([len(chunk) for chunk in result], [2, 2, 1])
+        self.assertEqual(result[2][0].name, "Name 4")
+
+        result = mock.Person.iter(age = 3, map = True)
+        result = list(result)
+        self.assertEqual(len(result), 1)
+        self.assertEqual(isinstance(result[0], dict), True)
+        self.assertEqual(result[0]["name"], "Name 3")
+
     def test_count(self):
         result = mock.Person.count()
         self.assertEqual(result, 0)
@@ -407,6 +478,64 @@ class ModelTest(unittest.TestCase):
         self.assertEqual(person.father.car.is_resolved(), True)
         self.assertEqual(person.father.car.name, "CarFather")
 
+    def test_eager_batch(self):
+        cars = []
+        for index in range(2):
+            car = mock.Car()
+            car.name = "Car %d" % index
+            car.save()
+            cars.append(car)
+
+        cat = mock.Cat()
+        cat.name = "Cat"
+        cat.save()
+
+        father = mock.Person()
+        father.name = "Father"
+        father.car = cars[1]
+        father.save()
+
+        for index in range(4):
+            person = mock.Person()
+            person.name = "Person %d" % index
+            person.car = cars[index % 2]
+            person.father = father
+            person.cats = [cat]
+            person.save()
+
+        adapter = appier.get_adapter()
+        collection = adapter.collection("car")
+        queries = []
+        find = collection.__class__.find
+
+        def counter(self, *args, **kwargs):
+            queries.append(self.name)
+            return find(self, *args, **kwargs)
+
+        collection.__class__.find = counter
+        try:
+            people = mock.Person.find(
+                name = {"$in" : ["Person %d" % index for index in range(4)]},
+                eager = ("car", "father.car", "cats"),
+                sort = [("identifier", 1)]
+            )
+        finally:
+            collection.__class__.find = find
+
+        self.assertEqual(len(people), 4)
+        self.assertEqual(queries.count("person"), 2)
+        self.assertEqual(queries.count("car"), 2)
+        self.assertEqual(queries.count("cat"), 1)
+        self.assertEqual(people[0].car.name, "Car 0")
+        self.assertEqual(people[1].car.name, "Car 1")
+        self.assertEqual(people[0].car.is_resolved(), True)
+        self.assertEqual(people[0].car._object is people[2].car._object, True)
+        self.assertEqual(people[0].father.name, "Father")
+        self.assertEqual(isinstance(people[0].father.car, mock.Car), True)
+        self.assertEqual(people[0].father.car.name, "Car 1")
+        self.assertEqual(people[3].cats[0].name, "Cat")
+        self.assertEqual(people[3].cats.is_resolved(), True)
+
     def test_wrap(self):
         person = mock.Person.wrap(dict(name = "Person"))
         self.assertEqual(person.name, "Person")
@@ -0,0 +1,163 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Hive Appier Framework
+# Copyright (c) 2008-2016 Hive Solutions Lda.
+#
+# This file is part of Hive Appier Framework.
+#
+# Hive Appier Framework is free software: you can redistribute it and/or modify
+# it under the terms of the Apache License as published by the Apache
+# Foundation, either version 2.0 of the License, or (at your option) any
+# later version.
+#
+# Hive Appier Framework is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# Apache License for more details.
+#
+# You should have received a copy of the Apache License along with
+# Hive Appier Framework. If not, see <http://www.apache.org/licenses/>.
+
+__author__ = "João Magalhães <joamag@hive.pt>"
+""" The author(s) of the module """
+
+__version__ = "1.0.0"
+""" The version of the module """
+
+__revision__ = "$LastChangedRevision$"
+""" The revision number of the module """
+
+__date__ = "$LastChangedDate$"
+""" The last change date of the module """
+
+__copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
+""" The copyright for the module """
+
+__license__ = "Apache License, Version 2.0"
+""" The license for the module """
+
+import unittest
+
+import appier
+
+class RouterTest(unittest.TestCase):
+
+    def test_match(self):
+        router = appier.Router([
+            self._route("GET", "/", "root"),
+            self._route(("GET", "POST"), "/items/<int:id>", "item"),
+            self._route("GET", "/<str:part>/static/.*", "part"),
+            self._route("GET", "/items/<str:name>/<regex('[a-z]+'):kind>", "kind"),
+            self._route("GET", "/static/.*", "static"),
+            self._route("POST", "/items", "create")
+        ])
+
+        route, groups = router.match("GET", "/")
+        self.assertEqual(route[2], "root")
+        self.assertEqual(groups, ())
+
+        route, groups = router.match("GET", "/items/12")
+        self.assertEqual(route[2], "item")
+        self.assertEqual(groups, ("12",))
+
+        route, groups = router.match("POST", "/items/12")
+        self.assertEqual(route[2], "item")
+        self.assertEqual(groups, ("12",))
+
+        route, groups = router.match("GET", "/items/name/kind")
+        self.assertEqual(route[2], "kind")
+        self.assertEqual(groups, ("name", "kind"))
+
+        route, groups = router.match("GET", "/static/base.css")
+        self.assertEqual(route[2], "static")
+        self.assertEqual(groups, ())
+
+        route, groups = router.match("GET", "/part/static/base.css")
+        self.assertEqual(route[2], "part")
+        self.assertEqual(groups, ("part",))
+
+        route, groups = router.match("POST", "/items")
+        self.assertEqual(route[2], "create")
+
+        route, groups = router.match("GET", "/items")
+        self.assertEqual(route, None)
+        self.assertEqual(groups, None)
+
+        route, groups = router.match("DELETE", "/")
+        self.assertEqual(route, None)
+        self.assertEqual(groups, None)
+
+    def test_order(self):
+        router = appier.Router([
+            self._route("GET", "/<str:name>", "dynamic"),
+            self._route("GET", "/static", "static"),
+            self._route("GET", "/other", "other")
+        ])
+
+        route, groups = router.match("GET", "/static")
+        self.assertEqual(route[2], "dynamic")
+        self.assertEqual(groups, ("static",))
+
+        router = appier.Router([
+            self._route("GET", "/static", "static"),
+            self._route("GET", "/<str:name>", "dynamic")
+        ])
+
+        route, groups = router.match("GET", "/static")
+        self.assertEqual(route[2], "static")
+        self.assertEqual(groups, ())
+
+        route, groups = router.match("GET", "/other")
+        self.assertEqual(route[2], "dynamic")
+        self.assertEqual(groups, ("other",))
+
+    def test_large(self):
+        routes = []
+        for index in range(150):
+            routes.append(self._route("GET", "/items/%d/<int:id>/<str:name>" % index, index))
+            routes.append(self._route("GET", "/<str:name>/%d/<int:id>" % index, -index))
+        router = appier.Router(routes)
+
+        for index in range(150):
+            route, groups = router.match("GET", "/items/%d/1/name" % index)
+            self.assertEqual(route[2], index)
+            self.assertEqual(groups, ("1", "name"))
+
+            route, groups = router.match("GET", "/name/%d/1" % index)
+            self.assertEqual(route[2], -index)
+            self.assertEqual(groups, ("name", "1"))
+
+        route, groups = router.match("GET", "/items/150/1/name")
+        self.assertEqual(route, None)
+
+    def test_binder(self):
+        def action(id, name, flag = None):
+            return id, name, flag
+
+        route = self._route("GET", "/items/<int:id>/<str:name>", action)
+        binder = appier.Binder(action, param_t = route[3]["param_t"])
+
+        self.assertEqual(binder.cast(("12", "name")), [12, "name"])
+        self.assertEqual(binder.bind(dict(flag = ["1"], other = ["2"])), dict(flag = "1"))
+
+        def action_kw(id, **kwargs):
+            return id, kwargs
+
+        binder = appier.Binder(action_kw, param_t = ((int, "id"),))
+
+        self.assertEqual(binder.cast(("1",)), [1])
+        self.assertEqual(binder.bind(dict(a = ["1"], b = ["2"])), dict(a = "1", b = "2"))
+
+        def action_invalid():
+            pass
+
+        self.assertRaises(
+            appier.OperationalError,
+            lambda: appier.Binder(action_invalid, param_t = ((int, "id"),))
+        )
+
+    def _route(self, method, expression, function):
+        route = appier.App.norm_route(method, expression, function)
+        del route[3]
+        return route
@@ -67,3 +67,9 @@ class SerializeTest(unittest.TestCase):
 
         result = appier.serialize_csv([dict(item = appier.legacy.u("你好世界"))])
         self.assertEqual(result, "item\r\n你好世界\r\n")
+
+        result = appier.serialize_csv(dict(item = value) for value in ("a", "b"))
+        self.assertEqual(result, "item\r\na\r\nb\r\n")
+
+        result = appier.serialize_csv(iter([]))
+        self.assertEqual(result, "")
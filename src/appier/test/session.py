@@ -37,11 +37,106 @@ __copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
 __license__ = "Apache License, Version 2.0"
 """ The license for the module """
 
+import os
+import shutil
 import datetime
+import tempfile
 import unittest
 
 import appier
 
+class MockRedis(object):
+    """
+    Minimal in memory implementation of the subset of the redis
+    client interface used by the redis session, registering the
+    name of every command that is executed.
+    """
+
+    def __init__(self):
+        self.values = dict()
+        self.sets = dict()
+        self.commands = []
+
+    def get(self, name):
+        self.commands.append("get")
+        return self.values.get(name, None)
+
+    def mget(self, names):
+        self.commands.append("mget")
+        return [self.values.get(name, None) for name in names]
+
+    def set(self, name, value, ex = None):
+        self.commands.append("set")
+        self.values[name] = value
+
+    def delete(self, *names):
+        self.commands.append("delete")
+        for name in names:
+            self.values.pop(name, None)
+            self.sets.pop(name, None)
+
+    def scan_iter(self, match = None, count = None):
+        self.commands.append("scan")
+        prefix = match[:-1]
+        names = list(self.values.keys()) + list(self.sets.keys())
+        return [name for name in names if name.startswith(prefix)]
+
+    def zrem(self, name, *values):
+        self.commands.append("zrem")
+        members = self.sets.get(name, {})
+        for value in values: members.pop(value, None)
+
+    def zremrangebyscore(self, name, min, max):
+        self.commands.append("zremrangebyscore")
+        members = self.sets.get(name, {})
+        for value, score in list(members.items()):
+            if score <= max: del members[value]
+
+    def zcard(self, name):
+        self.commands.append("zcard")
+        return len(self.sets.get(name, {}))
+
+    def execute_command(self, *args):
+        self.commands.append(args[0].lower())
+        name, score, value = args[1:]
+        self.sets.setdefault(name, {})[value] = score
+
+    def pipeline(self):
+        return MockPipeline(self)
+
+class MockPipeline(object):
+
+    def __init__(self, owner):
+        self.owner = owner
+        self.calls = []
+
+    def __getattr__(self, name):
+        method = getattr(self.owner, name)
+        def call(*args, **kwargs): self.calls.append((method, args, kwargs))
+        return call
+
+    def execute(self):
+        results = [method(*args, **kwargs) for method, args, kwargs in self.calls]
+        self.calls = []
+        return results
+
+class MockRequest(object):
+    """
+    Minimal request to be used with the client session, that
+    keeps the session (payload) in the cookies.
+    """
+
+    def __init__(self, secret = "secret"):
+        self.owner = self
+        self.secret = secret
+        self.cookies = dict()
+        self.set_cookie = None
+
+    def send(self):
+        request = MockRequest(secret = self.secret)
+        request.cookies["session"] = self.set_cookie.split("=", 1)[1]
+        return request
+
 class SessionTest(unittest.TestCase):
 
     def test_memory(self):
@@ -82,6 +177,199 @@ class SessionTest(unittest.TestCase):
         self.assertRaises(KeyError, lambda: session["first"])
         self.assertEqual(session.get("first"), None)
 
+    def test_sqlite(self):
+        path = tempfile.mkdtemp()
+        try:
+            appier.SqliteSession.open(file_path = os.path.join(path, "session.sqlite"))
+
+            session = appier.SqliteSession.new(address = "127.0.0.1")
+
+            session["first"] = 1
+            session["second"] = 2
+
+            session.flush()
+
+            self.assertNotEqual(session.sid, None)
+            self.assertEqual(session.is_dirty(), False)
+            self.assertEqual(appier.SqliteSession.count(), 1)
+
+            session = appier.SqliteSession.get_s(session.sid)
+
+            self.assertEqual(session["first"], 1)
+            self.assertEqual(session["second"], 2)
+            self.assertEqual(session.address, "127.0.0.1")
+            self.assertEqual(list(appier.SqliteSession.all().keys()), [session.sid])
+
+            del session["first"]
+            session.flush()
+
+            session = appier.SqliteSession.get_s(session.sid)
+
+            self.assertRaises(KeyError, lambda: session["first"])
+            self.assertEqual(session.get("first"), None)
+            self.assertEqual(session["second"], 2)
+
+            expire = datetime.timedelta(days = 0)
+            expired = [appier.SqliteSession.new(expire = expire) for _index in range(3)]
+
+            self.assertEqual(appier.SqliteSession.count(), 1)
+            self.assertEqual(appier.SqliteSession.get_s(expired[0].sid), None)
+            self.assertEqual(appier.SqliteSession.gc(count = 1), 1)
+            self.assertEqual(appier.SqliteSession.gc(), 1)
+            self.assertEqual(appier.SqliteSession.gc(), 0)
+
+            if not hasattr(os, "fork"): return
+
+            pid = os.fork()
+            if pid == 0:
+                try:
+                    child = appier.SqliteSession.get_s(session.sid)
+                    child["child"] = os.getpid()
+                    child.flush()
+                finally:
+                    os._exit(0)
+            os.waitpid(pid, 0)
+
+            session = appier.SqliteSession.get_s(session.sid)
+            self.assertEqual(session["child"], pid)
+            self.assertEqual(session["second"], 2)
+
+            appier.SqliteSession.empty()
+            self.assertEqual(appier.SqliteSession.count(), 0)
+        finally:
+            appier.SqliteSession.close()
+            shutil.rmtree(path)
+
+    def test_redis(self):
+        redis = MockRedis()
+        redis.values["other"] = "value"
+
+        previous = appier.RedisSession.REDIS
+        appier.RedisSession.REDIS = redis
+        try:
+            session = appier.RedisSession.new()
+            session["first"] = 1
+            session.flush()
+
+            self.assertEqual(appier.RedisSession.PREFIX + session.sid in redis.values, True)
+
+            session = appier.RedisSession.get_s(session.sid)
+            self.assertEqual(session["first"], 1)
+            self.assertEqual(session.is_stale(), False)
+
+            for _index in range(100): appier.RedisSession.new()
+
+            del redis.commands[:]
+            self.assertEqual(appier.RedisSession.count(), 101)
+            self.assertEqual(redis.commands, ["zremrangebyscore", "zcard"])
+
+            for _index in range(1000): appier.RedisSession.new()
+
+            del redis.commands[:]
+            self.assertEqual(appier.RedisSession.count(), 1101)
+            self.assertEqual(redis.commands, ["zremrangebyscore", "zcard"])
+
+            sessions = appier.RedisSession.all()
+            self.assertEqual(len(sessions), 1101)
+            self.assertEqual(sessions[session.sid]["first"], 1)
+            self.assertEqual(redis.commands.count("mget"), 12)
+            self.assertEqual(redis.commands.count("get"), 0)
+
+            expired = appier.RedisSession.new(expire = datetime.timedelta(seconds = -1))
+            self.assertEqual(appier.RedisSession.count(), 1101)
+            self.assertEqual(appier.RedisSession.get_s(expired.sid), None)
+
+            appier.RedisSession.expire(session.sid)
+            self.assertEqual(appier.RedisSession.count(), 1100)
+            self.assertEqual(appier.RedisSession.get_s(session.sid), None)
+
+            appier.RedisSession.empty()
+            self.assertEqual(appier.RedisSession.count(), 0)
+            self.assertEqual(redis.values, dict(other = "value"))
+        finally:
+            appier.RedisSession.REDIS = previous
+
+    def test_serializer(self):
+        serializer = appier.JSONSerializer()
+
+        session = appier.RedisSession(address = "127.0.0.1")
+        session["first"] = 1
+        session["second"] = dict(name = "second", values = [1, 2])
+
+        data = serializer.dumps(session)
+        self.assertEqual(type(data), bytes)
+        self.assertEqual(len(data) < len(appier.PickleSerializer().dumps(session)), True)
+
+        loaded = serializer.loads(data, appier.RedisSession)
+        self.assertEqual(loaded.__class__, appier.RedisSession)
+        self.assertEqual(loaded.sid, session.sid)
+        self.assertEqual(loaded.address, "127.0.0.1")
+        self.assertEqual(loaded.expire, session.expire)
+        self.assertEqual(loaded.lifetime, session.lifetime)
+        self.assertEqual(loaded.is_dirty(), False)
+        self.assertEqual(loaded["first"], 1)
+        self.assertEqual(loaded["second"], dict(name = "second", values = [1, 2]))
+
+        self.assertRaises(
+            appier.OperationalError,
+            lambda: serializer.dumps(appier.MemorySession(address = object()))
+        )
+
+        session["date"] = datetime.datetime.utcnow()
+        self.assertRaises(appier.OperationalError, lambda: serializer.dumps(session))
+
+        session["date"] = b"bytes" if appier.legacy.PYTHON_3 else object()
+        self.assertRaises(appier.OperationalError, lambda: serializer.dumps(session))
+
+        self.assertEqual(appier.new_serializer("json").__class__, appier.JSONSerializer)
+        self.assertRaises(appier.OperationalError, lambda: appier.new_serializer("other"))
+
+    def test_client(self):
+        request = MockRequest()
+
+        session = appier.ClientSession.new()
+        session["first"] = 1
+        session.flush(request = request)
+
+        self.assertNotEqual(request.set_cookie, None)
+
+        session = appier.ClientSession.get_s(session.sid, request = request.send())
+        self.assertEqual(session["first"], 1)
+
+        request.secret = "other"
+        self.assertRaises(
+            appier.SecurityError,
+            lambda: appier.ClientSession.get_s(session.sid, request = request.send())
+        )
+
+        self.assertEqual(appier.ClientSession._compare(b"digest", b"digest"), True)
+        self.assertEqual(appier.ClientSession._compare(b"digest", b"diGest"), False)
+        self.assertEqual(appier.ClientSession._compare(b"digest", b"other"), False)
+
+        date = datetime.datetime.utcnow()
+        request = MockRequest()
+        session = appier.ClientSession.new()
+        session["date"] = date
+        session.flush(request = request)
+
+        session = appier.ClientSession.get_s(session.sid, request = request.send())
+        self.assertEqual(session["date"], date)
+
+        appier.ClientSession.SERIALIZER = appier.JSONSerializer()
+        try:
+            request = MockRequest()
+            session = appier.ClientSession.new()
+            session["first"] = 1
+            session.flush(request = request)
+
+            session = appier.ClientSession.get_s(session.sid, request = request.send())
+            self.assertEqual(session["first"], 1)
+
+            self.assertRaises(appier.OperationalError, lambda: session.set("date", date))
+            self.assertEqual("date" in session, False)
+        finally:
+            appier.ClientSession.SERIALIZER = appier.PickleSerializer()
+
     def test_expire(self):
         expire = datetime.timedelta(days = 0)
         session = appier.MemorySession.new(expire = expire)
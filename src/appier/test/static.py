@@ -0,0 +1,330 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Hive Appier Framework
+# Copyright (c) 2008-2016 Hive Solutions Lda.
+#
+# This file is part of Hive Appier Framework.
+#
+# Hive Appier Framework is free software: you can redistribute it and/or modify
+# it under the terms of the Apache License as published by the Apache
+# Foundation, either version 2.0 of the License, or (at your option) any
+# later version.
+#
+# Hive Appier Framework is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# Apache License for more details.
+#
+# You should have received a copy of the Apache License along with
+# Hive Appier Framework. If not, see <http://www.apache.org/licenses/>.
+
+__author__ = "João Magalhães <joamag@hive.pt>"
+""" The author(s) of the module """
+
+__version__ = "1.0.0"
+""" The version of the module """
+
+__revision__ = "$LastChangedRevision$"
+""" The revision number of the module """
+
+__date__ = "$LastChangedDate$"
+""" The last change date of the module """
+
+__copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
+""" The copyright for the module """
+
+__license__ = "Apache License, Version 2.0"
+""" The license for the module """
+
+import os
+import zlib
+import shutil
+import tempfile
+import unittest
+
+import appier
+
+class StaticApp(appier.App):
+
+    def __init__(self, file_path, *args, **kwargs):
+        appier.App.__init__(self, *args, **kwargs)
+        self.file_path = file_path
+
+    def routes(self):
+        return [
+            (("GET",), "/file", self.file),
+            (("GET",), "/text", self.text)
+        ]
+
+    def file(self):
+        return self.send_path(self.file_path, url_path = "file.txt", cache = True)
+
+    def text(self, size = 10):
+        return "0123456789" * int(size)
+
+class Wrapper(object):
+
+    def __init__(self, file, block_size):
+        self.file = file
+        self.block_size = block_size
+
+    def __iter__(self):
+        return iter(lambda: self.file.read(self.block_size), b"")
+
+    def close(self):
+        self.file.close()
+
+class StaticTest(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.path, "file.txt")
+        self.data = b"".join(appier.legacy.bytes(str(index % 10)) for index in range(100000))
+        file = open(self.file_path, "wb")
+        try: file.write(self.data)
+        finally: file.close()
+        self.app = StaticApp(self.file_path)
+
+    def tearDown(self):
+        self.app.unload()
+        shutil.rmtree(self.path)
+
+    def test_range(self):
+        stream = appier.FileRange(self.file_path, 10, 100000 - 20, total = 100000)
+        self.assertEqual(stream.wrappable(), False)
+        self.assertEqual(b"".join(stream), self.data[10:-10])
+
+        stream = appier.FileRange(self.file_path, 10, 100000 - 10, total = 100000)
+        self.assertEqual(stream.wrappable(), True)
+        self.assertEqual(b"".join(stream), self.data[10:])
+
+        stream = appier.FileRange(
+            "virtual",
+            2,
+            3,
+            total = 10,
+            file = appier.legacy.BytesIO(b"0123456789")
+        )
+        self.assertEqual(stream.wrappable(), False)
+        self.assertEqual(b"".join(stream), b"234")
+
+    def test_stat(self):
+        stat_cache = appier.StatCache(interval = 60.0)
+        resource = stat_cache.get(self.file_path, "file.txt")
+        self.assertEqual(resource.exists, True)
+        self.assertEqual(resource.is_dir, False)
+        self.assertEqual(resource.size, 100000)
+        self.assertEqual(resource.type, "text/plain")
+        self.assertEqual(resource.headers(True, 60)[1], ("Cache-Control", "public, max-age=60"))
+
+        file = open(self.file_path, "ab")
+        try: file.write(b"extra")
+        finally: file.close()
+
+        self.assertEqual(stat_cache.get(self.file_path, "file.txt").size, 100000)
+        self.assertEqual(stat_cache.info()["hits"], 1)
+
+        stat_cache.clear()
+        self.assertEqual(stat_cache.get(self.file_path, "file.txt").size, 100005)
+
+        resource = stat_cache.get(self.path, "directory")
+        self.assertEqual(resource.exists, True)
+        self.assertEqual(resource.is_dir, True)
+
+        resource = stat_cache.get(os.path.join(self.path, "missing"), "missing")
+        self.assertEqual(resource.exists, False)
+
+        stat_cache = appier.StatCache(interval = 60.0, size = 2)
+        first = stat_cache.get(self.file_path, "first.txt")
+        second = stat_cache.get(self.file_path, "second.txt")
+        self.assertEqual(stat_cache.get(self.file_path, "first.txt"), first)
+        stat_cache.get(self.file_path, "third.txt")
+        self.assertEqual(stat_cache.info()["entries"], 2)
+        self.assertEqual(stat_cache.get(self.file_path, "first.txt"), first)
+        self.assertNotEqual(stat_cache.get(self.file_path, "second.txt"), second)
+
+        stat_cache = appier.StatCache(interval = 0)
+        stat_cache.get(self.file_path, "file.txt")
+        self.assertEqual(stat_cache.info()["entries"], 0)
+
+        expires = stat_cache.expires(3600)
+        self.assertEqual(expires.endswith(" GMT"), True)
+        self.assertEqual(stat_cache.expires(3600), expires)
+
+    def test_file_cache(self):
+        paths = []
+        for index in range(3):
+            file_path = os.path.join(self.path, "file%d.txt" % index)
+            file = open(file_path, "wb")
+            try: file.write(b"0123456789")
+            finally: file.close()
+            paths.append(file_path)
+
+        file_cache = appier.FileCache(size = 25, limit = 20)
+        self.assertEqual(file_cache.accepts(10), True)
+        self.assertEqual(file_cache.accepts(21), False)
+        self.assertEqual(appier.FileCache().accepts(10), False)
+
+        self.assertEqual(file_cache.get(paths[0], 1.0), b"0123456789")
+        self.assertEqual(file_cache.get(paths[1], 1.0), b"0123456789")
+        self.assertEqual(file_cache.get(paths[0], 1.0), b"0123456789")
+        self.assertEqual(file_cache.get(paths[2], 1.0), b"0123456789")
+
+        info = file_cache.info()
+        self.assertEqual(info["entries"], 2)
+        self.assertEqual(info["used"], 20)
+        self.assertEqual(info["hits"], 1)
+        self.assertEqual(info["misses"], 3)
+        self.assertEqual(info["evictions"], 1)
+        self.assertEqual(paths[1] in file_cache.entries, False)
+
+        file = open(paths[0], "wb")
+        try: file.write(b"changed")
+        finally: file.close()
+
+        self.assertEqual(file_cache.get(paths[0], 1.0), b"0123456789")
+        self.assertEqual(file_cache.get(paths[0], 2.0), b"changed")
+        self.assertEqual(file_cache.info()["used"], 17)
+
+        self.app.file_cache = appier.FileCache(size = 1048576, limit = 1048576)
+        status, headers, result = self._call(wrapper = True)
+        self.assertEqual(status, "200 OK")
+        self.assertEqual(isinstance(result, Wrapper), False)
+        self.assertEqual(b"".join(result), self.data)
+
+        status, headers, result = self._call(wrapper = True, range = "bytes=100-199")
+        self.assertEqual(status, "206 Partial Content")
+        self.assertEqual(b"".join(result), self.data[100:200])
+
+        info = self.app.file_cache.info()
+        self.assertEqual(info["hits"], 1)
+        self.assertEqual(info["misses"], 1)
+
+    def test_send_path(self):
+        status, headers, result = self._call()
+        self.assertEqual(status, "200 OK")
+        self.assertEqual(headers["Content-Length"], "100000")
+        self.assertEqual(headers["Accept-Ranges"], "bytes")
+        self.assertEqual(headers["Cache-Control"], "public, max-age=604800")
+        self.assertEqual(headers["Expires"].endswith(" GMT"), True)
+        self.assertEqual(isinstance(result, Wrapper), False)
+        self.assertEqual(b"".join(result), self.data)
+
+        status, headers, result = self._call(wrapper = True)
+        self.assertEqual(status, "200 OK")
+        self.assertEqual(isinstance(result, Wrapper), True)
+        self.assertEqual(b"".join(result), self.data)
+        result.close()
+
+        status, headers, result = self._call(wrapper = True, range = "bytes=100-199")
+        self.assertEqual(status, "206 Partial Content")
+        self.assertEqual(headers["Content-Range"], "bytes 100-199/100000")
+        self.assertEqual(headers["Content-Length"], "100")
+        self.assertEqual(isinstance(result, Wrapper), False)
+        self.assertEqual(b"".join(result), self.data[100:200])
+
+        status, headers, result = self._call(wrapper = True, range = "bytes=99000-")
+        self.assertEqual(status, "206 Partial Content")
+        self.assertEqual(isinstance(result, Wrapper), True)
+        self.assertEqual(b"".join(result), self.data[99000:])
+        result.close()
+
+        status, headers, result = self._call(wrapper = True, etag = headers["Etag"])
+        self.assertEqual(status, "304 Not Modified")
+
+    def test_encoding(self):
+        self.assertEqual(self.app.negotiate_encoding("text/plain", 2048, "gzip, deflate"), "gzip")
+        self.assertEqual(self.app.negotiate_encoding("text/plain", 2048, "deflate, gzip;q=0"), "deflate")
+        self.assertEqual(self.app.negotiate_encoding("text/plain", 2048, "*;q=0.5"), "gzip")
+        self.assertEqual(self.app.negotiate_encoding("text/plain", 2048, "br"), None)
+        self.assertEqual(self.app.negotiate_encoding("text/plain", 2048, ""), None)
+        self.assertEqual(self.app.negotiate_encoding("text/plain", 10, "gzip"), None)
+        self.assertEqual(self.app.negotiate_encoding("image/png", 2048, "gzip"), None)
+
+        status, headers, result = self._call(path = "/text", query = "size=1000", encoding = "gzip")
+        self.assertEqual(status, "200 OK")
+        self.assertEqual(headers["Content-Encoding"], "gzip")
+        self.assertEqual(headers["Vary"], "Accept-Encoding")
+        data = b"".join(result)
+        self.assertEqual(headers["Content-Length"], str(len(data)))
+        self.assertEqual(zlib.decompress(data, 31), b"0123456789" * 1000)
+
+        status, headers, result = self._call(path = "/text", query = "size=1000", encoding = "deflate")
+        self.assertEqual(headers["Content-Encoding"], "deflate")
+        self.assertEqual(zlib.decompress(b"".join(result)), b"0123456789" * 1000)
+
+        status, headers, result = self._call(path = "/text", encoding = "gzip")
+        self.assertEqual("Content-Encoding" in headers, False)
+        self.assertEqual(b"".join(result), b"0123456789" * 10)
+
+        status, headers, result = self._call(encoding = "gzip")
+        self.assertEqual(status, "200 OK")
+        self.assertEqual(headers["Content-Encoding"], "gzip")
+        self.assertEqual(headers["Etag"].endswith("-gzip"), True)
+        self.assertEqual(zlib.decompress(b"".join(result), 31), self.data)
+
+        status, headers, result = self._call(encoding = "gzip", etag = headers["Etag"])
+        self.assertEqual(status, "304 Not Modified")
+
+        status, headers, result = self._call(encoding = "gzip", range = "bytes=100-199")
+        self.assertEqual(status, "206 Partial Content")
+        self.assertEqual("Content-Encoding" in headers, False)
+        self.assertEqual(b"".join(result), self.data[100:200])
+
+        self.app.gzip_max = len(self.data) - 1
+        status, headers, result = self._call(wrapper = True, encoding = "gzip")
+        self.assertEqual("Content-Encoding" in headers, False)
+        self.assertEqual(headers["Content-Length"], str(len(self.data)))
+        self.assertEqual(isinstance(result, Wrapper), True)
+        self.assertEqual(b"".join(result), self.data)
+        result.close()
+
+        file = open(self.file_path + ".gz", "wb")
+        try: file.write(b"precompressed")
+        finally: file.close()
+        self.app.stat_cache.clear()
+
+        status, headers, result = self._call(wrapper = True, encoding = "gzip")
+        self.assertEqual(headers["Content-Encoding"], "gzip")
+        self.assertEqual(headers["Content-Length"], "13")
+        self.assertEqual(isinstance(result, Wrapper), True)
+        self.assertEqual(b"".join(result), b"precompressed")
+        result.close()
+
+        self.app.gzip = False
+        status, headers, result = self._call(encoding = "gzip")
+        self.assertEqual("Content-Encoding" in headers, False)
+        self.assertEqual(b"".join(result), self.data)
+
+    def _call(
+        self,
+        path = "/file",
+        query = "",
+        wrapper = False,
+        range = None,
+        etag = None,
+        encoding = None
+    ):
+        response = dict()
+
+        def start_response(status, headers, *args):
+            response["status"] = status
+            response["headers"] = dict(headers)
+
+        environ = dict(
+            REQUEST_METHOD = "GET",
+            PATH_INFO = path,
+            QUERY_STRING = query,
+            SCRIPT_NAME = "",
+            SERVER_NAME = "localhost",
+            SERVER_PORT = "80"
+        )
+        environ["wsgi.url_scheme"] = "http"
+        environ["wsgi.input"] = None
+        if wrapper: environ["wsgi.file_wrapper"] = Wrapper
+        if range: environ["HTTP_RANGE"] = range
+        if etag: environ["HTTP_IF_NONE_MATCH"] = etag
+        if encoding: environ["HTTP_ACCEPT_ENCODING"] = encoding
+        result = self.app.application(environ, start_response)
+        return response["status"], response["headers"], result
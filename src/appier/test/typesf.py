@@ -37,6 +37,9 @@ __copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
 __license__ = "Apache License, Version 2.0"
 """ The license for the module """
 
+import zlib
+import struct
+import tempfile
 import unittest
 
 import appier
@@ -124,3 +127,42 @@ class TypesfTest(unittest.TestCase):
         self.assertNotEqual(person.cats, "cars")
         self.assertEqual(isinstance(person.cats, appier.References), True)
         self.assertEqual(len(person.cats), 3)
+
+    def test_image(self):
+        data = self._png(4, 2)
+
+        contents = tempfile.TemporaryFile()
+        contents.write(data)
+        file_t = appier.FileTuple(("image.png", "image/png", contents))
+        self.assertEqual(file_t.is_spooled(), True)
+
+        try:
+            image = appier.image(width = 2)(file_t)
+        finally:
+            file_t.close()
+
+        self.assertEqual(type(image.data), bytes)
+        self.assertEqual(image.file_name, "image.png")
+        self.assertEqual(image.mime, "image/png")
+        self.assertEqual(image.size, len(image.data))
+        self.assertNotEqual(image.etag, None)
+
+        try: import PIL.Image
+        except ImportError: return
+
+        # in case the imaging library is available makes sure that the
+        # spooled image has been resized using the provided width
+        self.assertNotEqual(image.data, data)
+        self.assertEqual(image.width, 2)
+        self.assertEqual(image.height, 1)
+
+    def _png(self, width, height):
+        def chunk(kind, value):
+            crc = zlib.crc32(kind + value) & 0xffffffff
+            return struct.pack(">I", len(value)) + kind + value +\
+                struct.pack(">I", crc)
+
+        header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+        raw = (b"\x00" + b"\xff\x00\x00" * width) * height
+        return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) +\
+            chunk(b"IDAT", zlib.compress(raw)) + chunk(b"IEND", b"")
@@ -37,6 +37,7 @@ __copyright__ = "Copyright (c) 2008-2016 Hive Solutions Lda."
 __license__ = "Apache License, Version 2.0"
 """ The license for the module """
 
+import json
 import unittest
 
 import appier
@@ -102,3 +103,89 @@ class UtilTest(unittest.TestCase):
         self.assertEqual(result["a"], "hello")
         self.assertEqual(result["b"], "world")
         self.assertEqual(result["c"], "other")
+
+    def test_json_stream(self):
+        encoder = appier.JSONEncoder()
+        value = dict(
+            items = [dict(id = index, name = "name %d" % index) for index in range(100)],
+            nested = [[1, 2], (3, 4), dict(a = [5])],
+            text = "hello",
+            number = 1.5,
+            flag = True,
+            empty = None
+        )
+
+        result = "".join(encoder.iterencode_l(value, size = 64))
+        self.assertEqual(json.loads(result), json.loads(json.dumps(value)))
+        self.assertEqual(len(list(encoder.iterencode_l(value, size = 64))) > 1, True)
+
+        result = "".join(encoder.iterencode_l({1 : "a", 2.5 : "b", None : "c"}))
+        self.assertEqual(json.loads(result), {"1" : "a", "2.5" : "b", "null" : "c"})
+
+        result = "".join(encoder.iterencode_l((index for index in range(3))))
+        self.assertEqual(result, "[0, 1, 2]")
+
+        codec = appier.JSONCodec()
+        value = dict(items = [1, 2], nested = [[3]], text = "hello")
+        result = "".join(encoder.iterencode_l(value, codec = codec))
+        self.assertEqual(json.loads(result), json.loads(codec.dumps(value)))
+        self.assertEqual(result.count(", "), codec.dumps(value).count(", "))
+
+        stream = appier.JSONStream(dict(value = index) for index in range(2))
+        result = "".join(encoder.iterencode_l(dict(items = stream, more = [(x for x in (1,))])))
+        self.assertEqual(json.loads(result), dict(items = [dict(value = 0), dict(value = 1)], more = [[1]]))
+
+        self.assertEqual(encoder.encode(dict(items = (x for x in (1, 2)))), "{\"items\": [1, 2]}")
+        self.assertEqual(appier.is_lazy(stream), True)
+        self.assertEqual(appier.is_lazy([]), False)
+
+    def test_parse_multipart(self):
+        data = b"--boundary\r\n" +\
+            b"Content-Disposition: form-data; name=\"name\"\r\n\r\n" +\
+            b"value\r\n" +\
+            b"--boundary\r\n" +\
+            b"Content-Disposition: form-data; name=\"name\"\r\n\r\n" +\
+            b"other\r\n" +\
+            b"--boundary\r\n" +\
+            b"Content-Disposition: form-data; name=\"file\"; filename=\"file.txt\"\r\n" +\
+            b"Content-Type: text/plain\r\n\r\n" +\
+            b"contents\r\n--boundar\r\n" + b"x" * 100 + b"\r\n" +\
+            b"--boundary--\r\n"
+        contents = b"contents\r\n--boundar\r\n" + b"x" * 100
+
+        post, files, ordered = appier.parse_multipart(data, " boundary=boundary")
+        self.assertEqual(post, dict(name = ["value", "other"]))
+        self.assertEqual(list(files.keys()), ["file"])
+        self.assertEqual([name for name, _value in ordered], ["name", "file"])
+
+        file = files["file"][0]
+        self.assertEqual(file.name, "file.txt")
+        self.assertEqual(file.mime, "text/plain")
+        self.assertEqual(file.is_spooled(), False)
+        self.assertEqual(file.read(), contents)
+
+        for size in (1, 7, 64, 4096):
+            input = appier.legacy.BytesIO(data)
+            post, files, ordered = appier.parse_multipart(
+                input,
+                " boundary=boundary",
+                length = len(data),
+                size = size,
+                spool = 16
+            )
+            file = files["file"][0]
+            self.assertEqual(post, dict(name = ["value", "other"]))
+            self.assertEqual(file.is_spooled(), True)
+            self.assertEqual(file.read(), contents)
+            self.assertEqual(appier.File(file).data, contents)
+            file.close()
+
+        input = appier.legacy.BytesIO(data)
+        fields = appier.iter_multipart(input, " boundary=boundary", size = 16)
+        self.assertEqual(next(fields), ("name", "value", False))
+        self.assertEqual(input.tell() < len(data), True)
+
+        self.assertRaises(
+            appier.OperationalError,
+            lambda: appier.parse_multipart(data, " boundary=boundary", size = 64, limit = 128)
+        )
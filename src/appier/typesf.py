@@ -92,16 +92,17 @@ class File(Type):
         self.etag = etag
 
     def build_t(self, file_t):
-        name, content_type, data = file_t
+        # unpacks the file tuple reading the data in case it's stored in
+        # a (spooled) file, note that the base64 encoding of the data is only
+        # computed on demand (eg: persistence) as it's expensive for large files
+        name, content_type, data = self._unpack_t(file_t)
 
         is_valid = name and data
-        data_b64 = base64.b64encode(data) if is_valid else None
-        data_b64 = legacy.str(data_b64)
         size = len(data) if is_valid else 0
         etag = self._etag(data)
 
         self.data = data
-        self.data_b64 = data_b64
+        self.data_b64 = None
         self.file = None
         self.size = size
         self.file_name = name
@@ -138,12 +139,41 @@ class File(Type):
             mime = self.mime
         ) if self.is_valid() else None
 
+    @property
+    def data_b64(self):
+        if self._data_b64 == None and self.data:
+            self._data_b64 = legacy.str(base64.b64encode(self.data))
+        return self._data_b64
+
+    @data_b64.setter
+    def data_b64(self, value):
+        self._data_b64 = value
+
     def is_valid(self):
         return self.file_name or (self.data or self.data_b64)
 
     def is_empty(self):
         return self.size <= 0
 
+    def _unpack_t(self, file_t):
+        """
+        Unpacks the provided file tuple into its name, content type
+        and data components, ensuring that the data is returned as a
+        buffer even if it's stored in a (spooled) temporary file.
+
+        :type file_t: Tuple
+        :param file_t: The file tuple to be unpacked, may be either
+        a plain tuple or a file tuple with spooled contents.
+        :rtype: Tuple
+        :return: The tuple with the name, content type and the data
+        (as a buffer) of the file.
+        """
+
+        name, content_type, data = file_t
+        if isinstance(file_t, util.FileTuple): data = file_t.read()
+        elif hasattr(data, "read"): data.seek(0); data = data.read()
+        return name, content_type, data
+
     def _etag(self, data):
         if not data: return None
         hash = hashlib.md5(data)
@@ -163,8 +193,7 @@ class File(Type):
         finally: file.close()
 
         self.data = data
-        self.data_b64 = base64.b64encode(data)
-        self.data_b64 = legacy.str(self.data_b64)
+        self.data_b64 = None
         self.size = len(data)
         self.etag = self._etag(data)
 
@@ -267,7 +296,7 @@ def image(width = None, height = None, format = "png"):
     class _ImageFile(ImageFile):
 
         def build_t(self, file_t):
-            name, content_type, data = file_t
+            name, content_type, data = self._unpack_t(file_t)
             try: _data = self._resize(data)
             except: _data = data
             file_t = (name, content_type, _data)
@@ -45,7 +45,9 @@ import copy
 import uuid
 import types
 import locale
+import shutil
 import hashlib
+import tempfile
 import functools
 import threading
 import mimetypes
@@ -53,6 +55,7 @@ import contextlib
 import subprocess
 
 from . import smtp
+from . import codec
 from . import legacy
 from . import common
 from . import defines
@@ -77,6 +80,10 @@ SEQUENCE_TYPES = (list, tuple)
 """ The sequence defining the various types that are
 considered to be sequence based for python """
 
+MULTIPART_SIZE = 65536
+""" The size in bytes of the chunks that are read from the
+input in the (incremental) parsing of multipart data """
+
 defines = defines
 
 def to_limit(limit_s):
@@ -150,6 +157,19 @@ def is_iterable(object):
 
     return type(object) in defines.ITERABLES
 
+def is_lazy(value):
+    """
+    Determines if the provided value is a lazy iterable, meaning that
+    it should be serialized as a list by consuming it.
+
+    :type value: Object
+    :param value: The value to be verified.
+    :rtype: bool
+    :return: If the value is a lazy iterable (generator or stream).
+    """
+
+    return legacy.is_generator(value) or isinstance(value, JSONStream)
+
 def is_mobile(user_agent):
     """
     Verifies if the provided user agent string represent a
@@ -248,7 +268,7 @@ def request_json(request = None, encoding = "utf-8"):
     try:
         is_bytes = legacy.is_bytes(data)
         if is_bytes: data = data.decode(encoding)
-        data_j = json.loads(data)
+        data_j = codec.loads(data)
     except: data_j = {}
     request.properties["_data_j"] = data_j
 
@@ -479,6 +499,30 @@ def leafs(object):
     # to the caller method so that it may be used there
     return leafs_l
 
+def chunks(iterable, size):
+    """
+    Generator that splits the provided iterable into a series of
+    lists with (at most) the requested size, consuming the iterable
+    lazily so that only one chunk is kept in memory at a time.
+
+    :type iterable: Iterable
+    :param iterable: The iterable (eg: list, cursor, generator) that
+    is going to be split into chunks.
+    :type size: int
+    :param size: The maximum number of elements for each chunk.
+    :rtype: Generator
+    :return: The generator that yields the various chunks (lists),
+    the last chunk may contain less elements than the size.
+    """
+
+    chunk = []
+    for value in iterable:
+        chunk.append(value)
+        if len(chunk) < size: continue
+        yield chunk
+        chunk = []
+    if chunk: yield chunk
+
 def gen_token(limit = None):
     """
     Generates a random cryptographic ready token according
@@ -715,21 +759,33 @@ def parse_cookie(data):
     # proper and easy access is possible to the cookie
     return cookie_m
 
-def parse_multipart(data, boundary):
+def parse_multipart(data, boundary, length = -1, size = MULTIPART_SIZE, spool = None, limit = None):
     """
-    Parses the provided data buffer as a set of multipart data
-    the content type is not verified inside this method.
+    Parses the provided data buffer (or file like object) as a set
+    of multipart data the content type is not verified inside this method.
 
     The function returns a tuple containing both a map of "basic"
     form parameters, a map containing the set of file tuples and
     a sequence containing the name and values tuples in order.
 
-    :type data: String
+    :type data: String/File
     :param data: The string containing the complete set of data
-    that is going to be processed as multipart.
+    that is going to be processed as multipart or the file like
+    object (eg: wsgi input) from which the data is going to be read.
     :type boundary: String
     :param boundary: The string containing the basic boundary header
     value, should be provided from the caller function.
+    :type length: int
+    :param length: The number of bytes to be read from the file like
+    object (content length), a negative value reads until exhaustion.
+    :type size: int
+    :param size: The size in bytes of the chunks read from the data.
+    :type spool: int
+    :param spool: The size in bytes above which the file parts are
+    spooled into temporary files instead of being kept in memory.
+    :type limit: int
+    :param limit: The maximum number of bytes that may be read, in
+    case the data is larger an exception is raised (413 code).
     :rtype: Tuple
     :return: A tuple containing both the map of post attributes,
     the map of file attributes and a list with the various name and
@@ -740,96 +796,18 @@ def parse_multipart(data, boundary):
     post = dict()
     files = dict()
 
-    boundary = boundary.strip()
-    boundary_base = "--" + boundary[9:]
-    boundary_value = legacy.bytes(boundary_base + "\r\n")
-    boundary_extra = legacy.bytes(boundary_base + "--" + "\r\n")
-    boundary_extra_l = len(boundary_extra)
-    parts = data.split(boundary_value)
-    parts[-1] = parts[-1][:boundary_extra_l * -1]
-
-    for part in parts:
-        if not part: continue
-        part_s = part.split(b"\r\n\r\n", 1)
-        headers = part_s[0]
-        if len(part_s) > 1: contents = part_s[1]
-        else: contents = None
-
-        # strips the current headers string and then splits it around
-        # the various lines that define the various headers
-        headers_data = headers.strip()
-        headers_lines = headers_data.split(b"\r\n")
-
-        # creates the initial headers map of the headers that contains
-        # the association between the byte based key and the data value
-        # then retrieves the tuple of values and resets the map as it's
-        # going to be changed and normalized with the new values
-        headers = dict([line.split(b":", 1) for line in headers_lines])
-        headers_t = legacy.eager(headers.items())
-        headers.clear()
-
-        # runs the normalization process using the header tuples, this
-        # should create a map of headers with the key as a normal string
-        # and the values encoded as byte based strings (contain data)
-        # note that the headers are defined
-        for key, value in headers_t:
-            key = legacy.str(key).lower()
-            value = value.strip()
-            headers[key] = value
-
-        # tries to retrieve the content disposition header for the current
-        # part and in case there's none it's not possible to process the
-        # current part (this header is considered required)
-        disposition = headers.get("content-disposition", None)
-        if not disposition: continue
-
-        # creates the dictionary that will hold the various parts of the
-        # content disposition header that are going to be extracted for
-        # latter processing, this is required to make some decisions on
-        # the type of part that is currently being processed
-        parts = dict()
-        parts_data = disposition.split(b";")
-        for value in parts_data:
-            value_s = value.split(b"=", 1)
-            key = legacy.str(value_s[0]).strip().lower()
-            if len(value_s) > 1: value = value_s[1].strip()
-            else: value = None
-            parts[key] = value
-
-        # retrieves the various characteristics values from the headers
-        # and from the content disposition of the current part, these
-        # values are going to be used to decide on whether the current
-        # part is a file or a normal key value attribute
-        content_type = headers.get("content-type", None)
-        name = parts.get("name", b"\"undefined\"")[1:-1]
-        filename = parts.get("filename", b"")[1:-1]
-
-        # decodes the various content disposition values into an unicode
-        # based string so that may be latter be used safely inside the
-        # application environment(as expected by the current structure)
-        if content_type: content_type = content_type.decode("utf-8")
-        name = name.decode("utf-8")
-        filename = filename.decode("utf-8")
-
-        # in case the currently discovered contents are valid they
-        # must be stripped from the last two bytes so that the real
-        # value is retrieved from the provided contents
-        contents = contents if contents == None else contents[:-2]
-
-        # verifies if the file name is included in the parts unpacked
-        # from the content type in case it does this is considered to be
-        # file part otherwise it's a normal key value part
-        if "filename" in parts: is_file = True
-        else: is_file = False
-
-        if is_file:
-            target = files
-            file_tuple = (filename, content_type, contents)
-            value = FileTuple(file_tuple)
-        else:
-            target = post
-            value = contents if contents == None else contents.decode("utf-8")
-
+    is_stream = hasattr(data, "read")
+    input = data if is_stream else legacy.BytesIO(data)
+
+    for name, value, is_file in iter_multipart(
+        input,
+        boundary,
+        length = length,
+        size = size,
+        spool = spool,
+        limit = limit
+    ):
+        target = files if is_file else post
         sequence = target.get(name, [])
         sequence.append(value)
         tuple_s = (name, sequence)
@@ -839,6 +817,207 @@ def parse_multipart(data, boundary):
 
     return (post, files, ordered)
 
+def iter_multipart(input, boundary, length = -1, size = MULTIPART_SIZE, spool = None, limit = None):
+    """
+    Incrementally parses the multipart data read from the provided
+    file like object (eg: wsgi input) in fixed size chunks, yielding
+    each of the fields (as a name, value and file flag tuple) as soon
+    as it has been completely received.
+
+    The file parts larger than the spool size are written to temporary
+    files (as they arrive) and are yielded as file tuples that contain
+    the file object instead of the complete data buffer.
+
+    :type input: File
+    :param input: The file like object from which the multipart
+    data is going to be read (in chunks).
+    :type boundary: String
+    :param boundary: The string containing the basic boundary header
+    value, should be provided from the caller function.
+    :type length: int
+    :param length: The number of bytes to be read from the input
+    (content length), a negative value reads until exhaustion.
+    :type size: int
+    :param size: The size in bytes of the chunks read from the input.
+    :type spool: int
+    :param spool: The size in bytes above which the file parts are
+    spooled into temporary files, if not set no spooling occurs.
+    :type limit: int
+    :param limit: The maximum number of bytes that may be read, in
+    case the data is larger an exception is raised (413 code).
+    :rtype: Generator
+    :return: Generator that yields the name, value and file flag
+    tuples of the fields in the order they have been sent.
+    """
+
+    # builds the delimiter (boundary) line value and the separator that
+    # marks the end of the contents of a part (and start of the next one)
+    boundary = boundary.strip()
+    delimiter = legacy.bytes("--" + boundary[9:])
+    separator = b"\r\n" + delimiter
+    delimiter_l = len(delimiter)
+    separator_l = len(separator)
+
+    buffer = b""
+    state = "boundary"
+    part = None
+    read = 0
+
+    while True:
+        # reads the next chunk from the input, respecting the length of the
+        # data that has been provided and the maximum allowed size of it
+        count = size if length < 0 else min(size, length - read)
+        chunk = input.read(count) if count > 0 else b""
+        read += len(chunk)
+        if limit and read > limit: raise exceptions.OperationalError(
+            message = "Request body too large",
+            code = 413
+        )
+        buffer += chunk
+
+        while True:
+            if state == "boundary":
+                # tries to find the delimiter line in the buffer, discarding
+                # the preamble and waiting for more data if it's not complete
+                index = buffer.find(delimiter)
+                if index == -1:
+                    buffer = buffer[1 - delimiter_l:]
+                    break
+                if len(buffer) < index + delimiter_l + 2: break
+                if buffer[index + delimiter_l:index + delimiter_l + 2] == b"--": return
+                end = buffer.find(b"\r\n", index + delimiter_l)
+                if end == -1: break
+                buffer = buffer[end + 2:]
+                state = "headers"
+            elif state == "headers":
+                # waits for the complete set of headers of the part and then
+                # parses them, in case the part is not valid (no disposition)
+                # its contents are going to be ignored
+                index = buffer.find(b"\r\n\r\n")
+                if index == -1: break
+                part = _multipart_part(buffer[:index])
+                buffer = buffer[index + 4:]
+                state = "contents"
+            else:
+                # writes the contents of the part up to the separator, or in
+                # case it has not been received yet all but the trailing bytes
+                # (that may be part of a separator split between chunks)
+                index = buffer.find(separator)
+                if index == -1:
+                    keep = separator_l - 1
+                    if len(buffer) > keep:
+                        _multipart_write(part, buffer[:-keep], spool)
+                        buffer = buffer[-keep:]
+                    break
+                _multipart_write(part, buffer[:index], spool)
+                buffer = buffer[index + 2:]
+                state = "boundary"
+                if part: yield _multipart_value(part)
+                part = None
+
+        if not chunk: break
+
+def _multipart_part(headers_data):
+    # strips the current headers string and then splits it around
+    # the various lines that define the various headers
+    headers_data = headers_data.strip()
+    headers_lines = headers_data.split(b"\r\n")
+
+    # creates the initial headers map of the headers that contains
+    # the association between the byte based key and the data value
+    # then retrieves the tuple of values and resets the map as it's
+    # going to be changed and normalized with the new values
+    headers = dict([line.split(b":", 1) for line in headers_lines if b":" in line])
+    headers_t = legacy.eager(headers.items())
+    headers.clear()
+
+    # runs the normalization process using the header tuples, this
+    # should create a map of headers with the key as a normal string
+    # and the values encoded as byte based strings (contain data)
+    # note that the headers are defined
+    for key, value in headers_t:
+        key = legacy.str(key).lower()
+        value = value.strip()
+        headers[key] = value
+
+    # tries to retrieve the content disposition header for the current
+    # part and in case there's none it's not possible to process the
+    # current part (this header is considered required)
+    disposition = headers.get("content-disposition", None)
+    if not disposition: return None
+
+    # creates the dictionary that will hold the various parts of the
+    # content disposition header that are going to be extracted for
+    # latter processing, this is required to make some decisions on
+    # the type of part that is currently being processed
+    parts = dict()
+    parts_data = disposition.split(b";")
+    for value in parts_data:
+        value_s = value.split(b"=", 1)
+        key = legacy.str(value_s[0]).strip().lower()
+        if len(value_s) > 1: value = value_s[1].strip()
+        else: value = None
+        parts[key] = value
+
+    # retrieves the various characteristics values from the headers
+    # and from the content disposition of the current part, these
+    # values are going to be used to decide on whether the current
+    # part is a file or a normal key value attribute
+    content_type = headers.get("content-type", None)
+    name = parts.get("name", b"\"undefined\"")[1:-1]
+    filename = parts.get("filename", b"")[1:-1]
+
+    # decodes the various content disposition values into an unicode
+    # based string so that may be latter be used safely inside the
+    # application environment(as expected by the current structure)
+    if content_type: content_type = content_type.decode("utf-8")
+    name = name.decode("utf-8")
+    filename = filename.decode("utf-8")
+
+    # verifies if the file name is included in the parts unpacked
+    # from the content type in case it does this is considered to be
+    # file part otherwise it's a normal key value part
+    is_file = "filename" in parts
+
+    return dict(
+        name = name,
+        filename = filename,
+        content_type = content_type,
+        is_file = is_file,
+        chunks = [],
+        size = 0,
+        file = None
+    )
+
+def _multipart_write(part, data, spool):
+    # in case there's no valid part (ignored part) or no data to be
+    # written there's nothing remaining to be done
+    if not part or not data: return
+
+    # updates the size of the part and in case it's a file part that is
+    # larger than the spool size creates the temporary file for it, moving
+    # the chunks that have been buffered (in memory) until now into it
+    part["size"] += len(data)
+    is_spool = part["is_file"] and not spool == None and part["size"] > spool
+    if is_spool and not part["file"]:
+        part["file"] = tempfile.TemporaryFile()
+        for chunk in part["chunks"]: part["file"].write(chunk)
+        del part["chunks"][:]
+
+    if part["file"]: part["file"].write(data)
+    else: part["chunks"].append(data)
+
+def _multipart_value(part):
+    name = part["name"]
+    contents = b"".join(part["chunks"])
+
+    if not part["is_file"]: return (name, contents.decode("utf-8"), False)
+
+    if part["file"]: part["file"].seek(0)
+    contents = part["file"] or contents
+    file_tuple = (part["filename"], part["content_type"], contents)
+    return (name, FileTuple(file_tuple), True)
+
 def decode_params(params):
     """
     Decodes the complete set of parameters defined in the
@@ -1008,7 +1187,7 @@ def delayed(function):
 
     return _delayed
 
-def route(url, method = "GET", async = False, json = False):
+def route(url, method = "GET", async = False, json = False, cache = None):
 
     def decorator(function, *args, **kwargs):
         if is_detached(function): delay(function, *args, **kwargs)
@@ -1017,13 +1196,14 @@ def route(url, method = "GET", async = False, json = False):
             url,
             function,
             async = async,
-            json = json
+            json = json,
+            cache = cache
         )
         return function
 
     def delay(function, *args, **kwargs):
         global CREATION_COUNTER
-        route = (url, method, async, json)
+        route = (url, method, async, json, cache)
         if not hasattr(function, "_routes"): function._routes = []
         function._routes.append(route)
         function.creation_counter = CREATION_COUNTER
@@ -1216,13 +1396,34 @@ class FileTuple(tuple):
 
     def read(self, count = None):
         contents = self[2]
-        return contents
+        if not self.is_spooled(): return contents
+        contents.seek(0)
+        return contents.read()
 
     def save(self, path):
         contents = self[2]
         file = open(path, "wb")
-        try: file.write(contents)
-        finally: file.close()
+        try:
+            if self.is_spooled(): contents.seek(0); shutil.copyfileobj(contents, file)
+            else: file.write(contents)
+        finally:
+            file.close()
+
+    def close(self):
+        if not self.is_spooled(): return
+        self[2].close()
+
+    def is_spooled(self):
+        """
+        Determines if the contents of the file are stored in a
+        (spooled) temporary file instead of a memory buffer, this
+        is the case for the large files of multipart uploads.
+
+        :rtype: bool
+        :return: If the contents of the file tuple are a file.
+        """
+
+        return hasattr(self[2], "read")
 
     @property
     def name(self):
@@ -1260,5 +1461,103 @@ class JSONEncoder(json.JSONEncoder):
 
     def default(self, obj, **kwargs):
         if hasattr(obj, "json_v"): return obj.json_v()
+        if is_lazy(obj): return list(obj)
         if self.permissive: return str(obj)
         return json.JSONEncoder.default(self, obj, **kwargs)
+
+    def iterencode_l(self, obj, size = 32768, codec = None):
+        """
+        Encodes the provided object incrementally, yielding the (string)
+        chunks of the serialized value (with roughly the provided size)
+        as the structure is walked, so that the complete serialized value
+        is never kept in memory at once.
+
+        The top level map, the lists and the lazy iterables (eg: generators
+        of models) are walked, while the remaining values are encoded by
+        the (fast) base encoder, in batches in case they're list items.
+
+        In case a codec is provided the values are encoded by it (and
+        its separators are used) instead, so that the streamed value is
+        the same as the one of the (buffered) encoding by the codec.
+
+        :type obj: Object
+        :param obj: The object to be encoded, may be a lazy iterable.
+        :type size: int
+        :param size: The (approximate) size of each of the chunks.
+        :type codec: JSONCodec
+        :param codec: The codec to be used in the encoding of the values,
+        if not provided the encoder itself is used.
+        :rtype: Generator
+        :return: The generator that yields the chunks of the JSON string.
+        """
+
+        if codec: encode, separators = codec.dumps, codec.separators
+        else: encode, separators = self.encode, (self.item_separator, self.key_separator)
+
+        buffer = []
+        buffer_l = 0
+        for part in self._iterencode_l(obj, 0, encode, separators):
+            buffer.append(part)
+            buffer_l += len(part)
+            if buffer_l < size: continue
+            yield "".join(buffer)
+            buffer = []
+            buffer_l = 0
+        if buffer: yield "".join(buffer)
+
+    def _iterencode_l(self, obj, depth, encode, separators, batch = 128):
+        item_separator, key_separator = separators
+        if hasattr(obj, "json_v"): obj = obj.json_v()
+        if isinstance(obj, dict) and depth == 0:
+            yield "{"
+            for index, (key, value) in enumerate(legacy.iteritems(obj)):
+                if index: yield item_separator
+                if not type(key) in legacy.STRINGS: key = encode(key).strip("\"")
+                yield encode(key) + key_separator
+                for part in self._iterencode_l(value, depth + 1, encode, separators):
+                    yield part
+            yield "}"
+        elif isinstance(obj, (list, tuple)) or is_lazy(obj):
+            # walks the items of the sequence, buffering the "simple" ones so
+            # that they're encoded in batches by the base encoder (removing the
+            # enclosing brackets) and walking the nested sequences recursively
+            yield "["
+            items = []
+            count = 0
+            for item in obj:
+                is_nested = isinstance(item, (list, tuple)) or is_lazy(item)
+                if not is_nested: items.append(item)
+                if not is_nested and len(items) < batch: continue
+                if items:
+                    if count: yield item_separator
+                    yield encode(items)[1:-1]
+                    count += len(items)
+                    items = []
+                if not is_nested: continue
+                if count: yield item_separator
+                for part in self._iterencode_l(item, depth + 1, encode, separators):
+                    yield part
+                count += 1
+            if items:
+                if count: yield item_separator
+                yield encode(items)[1:-1]
+            yield "]"
+        else:
+            yield encode(obj)
+
+class JSONStream(object):
+    """
+    Wrapper around a (lazy) iterable, eg: a generator of models, that
+    may be returned by an action method so that the items are serialized
+    (and sent) as a JSON list incrementally, as they're produced.
+
+    In case the encoded flag is set the iterable yields the (already)
+    encoded chunks of the JSON string instead of the items.
+    """
+
+    def __init__(self, iterable, encoded = False):
+        self.iterable = iterable
+        self.encoded = encoded
+
+    def __iter__(self):
+        return iter(self.iterable)